@@ -1,8 +1,11 @@
-from fastapi import APIRouter, status, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status, HTTPException
 
 from app.models.examples import ExampleGroup
 from app.schemas.examples import GroupIn, GroupOut
-from app.services.examples import GroupService
+from app.services.examples import GroupService, group_name_filter
+from app.services.loaders import Loaders, batch_ids
 
 # ========================================
 # 说明: 定义项目HTTP请求相关的路由；
@@ -29,7 +32,27 @@ async def example_create_group(group: GroupIn):
             )
 async def example_get_groups():
     # TODO 示例：获取用户组列表
-    return [GroupOut.from_orm(group) for group in await ExampleGroup.all()]
+    return [GroupOut.from_orm(group) for group in await GroupService.get_groups()]
+
+
+@router.get("/availability",
+            summary="示例：用户组名是否可用",
+            description="示例：用户组名可用性检查（布隆过滤器判断一定不存在时不访问数据库）",
+            responses={status.HTTP_200_OK: {"描述": "用户组名是否可用"}, }
+            )
+async def example_group_name_availability(name: str):
+    # TODO 示例：用户组名是否可用
+    return {"name": name, "available": await GroupService.is_group_name_available(name)}
+
+
+@router.get("/batch", response_model=list[Optional[GroupOut]],
+            summary="示例：批量获取用户组",
+            description="示例：按 ID 批量获取用户组（ids=1,2,3），合并为一次查询，结果顺序与 ids 一致，不存在的 ID 返回 null",
+            responses={status.HTTP_200_OK: {"描述": "批量获取用户组"}, }
+            )
+async def example_get_groups_batch(ids: list[int] = Depends(batch_ids), loaders: Loaders = Depends()):
+    # TODO 示例：批量获取用户组
+    return [GroupOut.from_orm(group) if group else None for group in await loaders.groups.load_many(ids)]
 
 
 @router.get("/{group_id}", response_model=GroupOut,
@@ -39,7 +62,7 @@ async def example_get_groups():
             )
 async def example_get_group(group_id: int):
     # TODO 示例：获取指定 ID 用户组
-    return await ExampleGroup.filter(id=group_id).first()
+    return await GroupService.get_group(group_id)
 
 
 @router.put("/{group_id}", response_model=GroupOut,
@@ -52,8 +75,11 @@ async def example_update_group(group_id: int, group_in: GroupIn):
     group = await ExampleGroup.get(id=group_id)
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户组不存在，请联系管理员！")
-    group = group.update_from_dict(group_in.dict(exclude_unset=True))
+    data = group_in.dict(exclude_unset=True)
+    group = group.update_from_dict(data)
     await group.save()
+    if "name" in data:
+        await group_name_filter.add(group.name)
     return GroupOut.from_orm(group)
 
 
@@ -67,5 +93,5 @@ async def example_delete_group(group_id: int):
     group = await ExampleGroup.get(id=group_id)
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户组不存在，请联系管理员！")
-    await group.delete()
+    await GroupService.delete_group(group)
     return {"detail": "用户组删除成功"}
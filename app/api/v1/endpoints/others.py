@@ -1,13 +1,14 @@
 import datetime
+from typing import Optional
 
 from fastapi import APIRouter, status
 
+from app.core.db import get_pool_metrics
 from app.core.logger import LOG
 from app.core.redis import get_redis_client
-from app.core.utils import run_celery_task
-from app.core.websockets import ExampleWebsocket
-from app.services.examples import UserService
-from app.tasks import tasks
+from app.core.scheduler import scheduler
+from app.core.task_idempotency import get_task_idempotency_metrics, run_celery_task_once
+from app.services.examples import GroupService, UserService, group_name_filter, username_filter
 
 # ========================================
 # 说明: 定义项目HTTP请求相关的路由；
@@ -19,14 +20,62 @@ router = APIRouter()
 # TODO：================= Celery Task =======================#
 @router.get("/tasks",
             summary="示例：异步任务",
-            description="示例：异步任务",
+            description="示例：异步任务，指定 idempotency_key 时，有效期内的重复提交合并为首次提交的任务",
             status_code=status.HTTP_200_OK,
             responses={404: {"描述": "异步任务"}, }
             )
-async def example_exec_tasks():
-    # TODO 示例：异步任务
-    run_celery_task(tasks.eg_task)
-    return {"Exec tasks": "ok"}
+async def example_exec_tasks(idempotency_key: Optional[str] = None):
+    # TODO 示例：异步任务（延迟导入任务模块，Web 进程首次投递时才加载 Celery）
+    from app.tasks import tasks
+    result = await run_celery_task_once(tasks.eg_task, idempotency_key=idempotency_key)
+    return {"Exec tasks": "ok", "task_id": getattr(result, "id", None)}
+
+
+@router.get("/tasks/idempotency/metrics",
+            summary="示例：异步任务幂等命中统计",
+            description="示例：重复提交合并次数、Worker 跳过已完成任务次数",
+            status_code=status.HTTP_200_OK,
+            responses={404: {"描述": "异步任务幂等命中统计"}, }
+            )
+async def example_task_idempotency_metrics():
+    # TODO 示例：异步任务幂等命中统计
+    return await get_task_idempotency_metrics()
+
+
+@router.get("/tasks/batch",
+            summary="示例：批量任务",
+            description="示例：高频事件写入批量任务队列，按条数或时间阈值聚合后由 Worker 批量处理",
+            status_code=status.HTTP_200_OK,
+            responses={404: {"描述": "批量任务"}, }
+            )
+async def example_exec_batch_tasks():
+    # TODO 示例：批量任务
+    from app.tasks import tasks
+    pending = await tasks.eg_batch_task.enqueue({"event": "example", "ts": datetime.datetime.now().timestamp()})
+    return {"Exec batch tasks": "ok", "pending": pending}
+
+
+@router.get("/scheduler",
+            summary="示例：进程内定时调度状态",
+            description="示例：当前实例是否为 Leader，各定时任务执行次数及触发延迟（抖动）统计",
+            status_code=status.HTTP_200_OK,
+            responses={404: {"描述": "进程内定时调度状态"}, }
+            )
+async def example_scheduler_status():
+    # TODO 示例：进程内定时调度状态
+    return scheduler.report()
+
+
+# TODO：================= PostgreSQL =======================#
+@router.get("/db/pool",
+            summary="示例：数据库连接池指标",
+            description="示例：连接池大小、使用中连接数、获取连接等待时间、预编译语句缓存命中率",
+            status_code=status.HTTP_200_OK,
+            responses={404: {"描述": "数据库连接池指标"}, }
+            )
+async def example_db_pool_metrics():
+    # TODO 示例：数据库连接池指标
+    return get_pool_metrics()
 
 
 # TODO：================= Redis =======================#
@@ -68,6 +117,29 @@ async def example_exec_redis_with_lock2():
     return {"Exec redis (lock)": "ok"}
 
 
+@router.post("/redis/bloom/rebuild",
+             summary="示例：重建可用性检查布隆过滤器",
+             description="示例：流式扫描用户表、用户组表，全量重建用户名/用户组名布隆过滤器（清除已删除值造成的误判）",
+             status_code=status.HTTP_200_OK,
+             responses={404: {"描述": "重建布隆过滤器"}, }
+             )
+async def example_rebuild_bloom_filters():
+    # TODO 示例：重建布隆过滤器
+    return {"username": await UserService.rebuild_username_filter(),
+            "group_name": await GroupService.rebuild_group_name_filter()}
+
+
+@router.get("/redis/bloom/stats",
+            summary="示例：可用性检查布隆过滤器统计",
+            description="示例：已添加条数、删除次数、检查次数、实际误判率及估算误判率",
+            status_code=status.HTTP_200_OK,
+            responses={404: {"描述": "布隆过滤器统计"}, }
+            )
+async def example_bloom_filter_stats():
+    # TODO 示例：布隆过滤器统计
+    return [await username_filter.stats(), await group_name_filter.stats()]
+
+
 # TODO：================= Websocket =======================#
 @router.get(f"/ws/push",
             summary="示例：模拟 ws 推送",
@@ -77,6 +149,7 @@ async def example_exec_redis_with_lock2():
             )
 async def example_exec_ws_push():
     # TODO 示例：模拟 ws 推送
+    from app.core.websockets import ExampleWebsocket
     await ExampleWebsocket().broadcast_to_channel(channel=ExampleWebsocket.channel,
                                                   message=f"TODO 示例（WS 推送）：当前时间（周期任务）: {datetime.datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
     return {"Push ws": "ok"}
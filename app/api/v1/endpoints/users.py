@@ -1,8 +1,14 @@
-from fastapi import APIRouter, status, HTTPException
+from datetime import datetime
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+
+from app.core.passwords import PasswordHasher
+from app.core.rate_limit import RateLimit, by_user
 from app.models.examples import ExampleUser
-from app.schemas.examples import UserUpdate, UserOut, UserIn
-from app.services.examples import UserService
+from app.schemas.examples import UserUpdate, UserOut, UserIn, UserLogin, UserSearchOut
+from app.services.examples import UserService, user_activity, username_filter
+from app.services.loaders import Loaders, batch_ids
 
 # ========================================
 # 说明: 定义项目HTTP请求相关的路由；
@@ -14,15 +20,28 @@ router = APIRouter()
 # TODO：================= 用户 API 接口 =======================#
 @router.post("/", response_model=UserOut,
              summary="示例：创建用户",
-             description="示例：创建用户 API 接口",
-             responses={200: {"描述": "用户注册成功"}, }
+             description="示例：创建用户 API 接口（每个 IP 每分钟最多 20 次，超出返回 429）",
+             responses={200: {"描述": "用户注册成功"}, },
+             dependencies=[Depends(RateLimit("create_user", "20/minute"))]
              )
 async def example_create_user(user: UserIn):
-    # TODO 示例：创建用户，Service 层，封装复杂业务逻辑
+    # TODO 示例：创建用户，Service 层，封装复杂业务逻辑；按 IP 限流
     exam_user_obj = await UserService.create_user(user)
     return exam_user_obj
 
 
+@router.post("/login", response_model=UserOut,
+             summary="示例：用户登录",
+             description="示例：校验用户名密码（密码哈希在进程池中执行，不阻塞事件循环）",
+             status_code=status.HTTP_200_OK)
+async def example_login(user_in: UserLogin):
+    # TODO 示例：用户登录
+    user = await UserService.authenticate(user_in.username, user_in.password)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
+    return UserOut.from_orm(user)
+
+
 @router.get("/", response_model=list[UserOut],
             summary="示例：获取用户列表",
             description="示例：获取用户列表",
@@ -30,7 +49,48 @@ async def example_create_user(user: UserIn):
 async def example_get_users():
     # TODO 示例：获取用户列表
     # 其他方式：return await Users_Pydantic.from_queryset(ExampleUser.all())
-    return [UserOut.from_orm(user) for user in await ExampleUser.all()]
+    return [UserOut.from_orm(user) for user in await UserService.get_users()]
+
+
+@router.get("/search", response_model=UserSearchOut,
+            summary="示例：检索用户",
+            description="示例：按用户组、状态、创建时间范围过滤（按创建时间倒序，next_cursor 分页），"
+                        "q 模糊匹配用户名/昵称/邮箱（pg_trgm，按相似度排序，返回前 limit 条）",
+            status_code=status.HTTP_200_OK)
+async def example_search_users(q: Optional[str] = Query(None, min_length=2, max_length=100),
+                               group_id: Optional[int] = None,
+                               is_active: Optional[bool] = None,
+                               is_superuser: Optional[bool] = None,
+                               created_after: Optional[datetime] = None,
+                               created_before: Optional[datetime] = None,
+                               cursor: Optional[str] = None,
+                               limit: int = Query(50, ge=1, le=200)):
+    # TODO 示例：检索用户
+    try:
+        users, next_cursor = await UserService.search_users(
+            q, cursor=cursor, limit=limit, group_id=group_id, is_active=is_active, is_superuser=is_superuser,
+            created_after=created_after, created_before=created_before)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return UserSearchOut(items=[UserOut.from_orm(user) for user in users], next_cursor=next_cursor)
+
+
+@router.get("/availability",
+            summary="示例：用户名是否可用",
+            description="示例：用户名可用性检查（布隆过滤器判断一定不存在时不访问数据库）",
+            status_code=status.HTTP_200_OK)
+async def example_username_availability(username: str):
+    # TODO 示例：用户名是否可用
+    return {"username": username, "available": await UserService.is_username_available(username)}
+
+
+@router.get("/batch", response_model=list[Optional[UserOut]],
+            summary="示例：批量获取用户",
+            description="示例：按 ID 批量获取用户（ids=1,2,3），合并为一次查询，结果顺序与 ids 一致，不存在的 ID 返回 null",
+            status_code=status.HTTP_200_OK)
+async def example_get_users_batch(ids: list[int] = Depends(batch_ids), loaders: Loaders = Depends()):
+    # TODO 示例：批量获取用户
+    return [UserOut.from_orm(user) if user else None for user in await loaders.users.load_many(ids)]
 
 
 @router.get("/{user_id}", response_model=UserOut,
@@ -45,15 +105,23 @@ async def example_get_user(user_id: int):
 @router.put("/{user_id}",
             response_model=UserOut,
             summary="示例：根据用户 ID 检索用户",
-            description="示例：根据用户 ID 检索 API 接口",
-            status_code=status.HTTP_200_OK)
+            description="示例：根据用户 ID 检索 API 接口（每个用户每分钟最多更新 60 次，超出返回 429）",
+            status_code=status.HTTP_200_OK,
+            dependencies=[Depends(RateLimit("update_user", "60/minute", key=by_user))])
 async def example_update_user(user_id: int, user_in: UserUpdate):
-    # TODO 示例：更新用户
+    # TODO 示例：更新用户；按用户限流
     user = await ExampleUser.get(id=user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在，请联系管理员！")
-    user = user.update_from_dict(user_in.dict(exclude_unset=True))
-    await user.save()
+    data = user_in.dict(exclude_unset=True)
+    if data.get("password"):
+        data["password"] = await PasswordHasher().hash(data["password"])
+    user = user.update_from_dict(data)
+    # 只写入请求中的字段，避免用读取时的旧值覆盖写回缓冲刷入的 last_login
+    await user.save(update_fields=[*data, "updated_at"])
+    if "username" in data:
+        await username_filter.add(user.username)
+    user_activity.apply(user)
     return UserOut.from_orm(user)
 
 
@@ -67,5 +135,5 @@ async def example_delete_user(user_id: int):
     user = await ExampleUser.get(id=user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在，请联系管理员！")
-    await user.delete()
+    await UserService.delete_user(user)
     return {"detail": "用户删除成功"}
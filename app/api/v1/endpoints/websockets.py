@@ -1,6 +1,6 @@
 from fastapi import APIRouter, WebSocket
 
-from app.core.websockets import ExampleWebsocket, ExampleUserWebsocket, WebsocketConsumer
+from app.core.websockets import ExampleGroupWebsocket, ExampleWebsocket, ExampleUserWebsocket, WebsocketConsumer
 
 # ========================================
 # 说明: 定义项目 Websocket 相关的路由；
@@ -15,8 +15,15 @@ async def websocket_endpoint(websocket: WebSocket):
     await WebsocketConsumer(ExampleWebsocket).connect(websocket)
 
 
+@router.websocket("/groups/{group_id}")
+async def websocket_endpoint(websocket: WebSocket, group_id: int):
+    # TODO 示例：用户组及组内用户数据变更推送（PostgreSQL LISTEN/NOTIFY），对应 ExampleGroupWebsocket 单例实现
+    channel = ExampleGroupWebsocket.channel.format(group_id)
+    await WebsocketConsumer(ExampleGroupWebsocket).connect(websocket, channel)
+
+
 @router.websocket("/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    # TODO 示例： 不同用户ID不同消息频道，对应 ExampleUserWebsocket 单例实现
+    # TODO 示例： 不同用户ID不同消息频道，对应 ExampleUserWebsocket 单例实现；该用户的数据变更同样推送到此频道
     channel = ExampleUserWebsocket.channel.format(user_id)
     await WebsocketConsumer(ExampleUserWebsocket).connect(websocket, channel)
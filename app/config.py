@@ -7,6 +7,27 @@ from pydantic.v1 import BaseSettings
 # 说明: 项目配置文件
 # ========================================
 
+def build_db_connections(host: str, port: str, replicas: str, credentials: dict) -> dict:
+    """
+    构建 Tortoise 数据库连接配置：default 为主库，replica_<n> 为只读副本（与主库共用账号、库名及连接池配置）
+    :param host: 主库地址
+    :param port: 主库端口
+    :param replicas: 只读副本列表，格式 "host:port,host:port"
+    :param credentials: 公共连接参数
+    :return:
+    """
+    db_connections = {}
+    for alias, address in [("default", f"{host}:{port}")] + [
+            (f"replica_{i}", replica.strip()) for i, replica in enumerate(replicas.split(",")) if replica.strip()]:
+        replica_host, _, replica_port = address.partition(":")
+        db_connections[alias] = {
+            # asyncpg 引擎 + 连接池/预编译语句缓存指标采集，见 app.core.db
+            "engine": "app.core.db",
+            "credentials": {"host": replica_host, "port": replica_port or port, **credentials},
+        }
+    return db_connections
+
+
 class Settings(BaseSettings):
     # 项目配置
     PROJECT_NAME: str = "fastapi-common-tmpl"
@@ -14,6 +35,7 @@ class Settings(BaseSettings):
     VERSION: str = "v1"
     DEBUG: bool = environ.get("DEBUG") == "true"
     TEST: bool = False  # environ.get("ENV") not in ["PROD", "DEV"]
+    ENV: str = environ.get("ENV") or "DEV"
 
     # 数据库配置
     POSTGRES_HOST: str = environ.get("POSTGRES_HOST") or "127.0.0.1"  # postgres
@@ -21,9 +43,27 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = environ.get("POSTGRES_USER") or "example"
     POSTGRES_PWD: str = environ.get("POSTGRES_PWD") or "example123"
     POSTGRES_DB: str = environ.get("POSTGRES_DB") or "example"
-    DB_POOL_MAX: int = environ.get("DB_POOL_MAX") or 20
-    DB_POOL_CONN_LIFE: int = environ.get("DB_POOL_CONN_LIFE") or 600
+    # 连接池（asyncpg）：最小/最大连接数，启动时预先建立 DB_POOL_MIN 个连接
+    DB_POOL_MIN: int = int(environ.get("DB_POOL_MIN") or 5)
+    DB_POOL_MAX: int = int(environ.get("DB_POOL_MAX") or 20)
+    # 关闭池中非活动连接的秒数，小于等于 0 则禁用此机制
+    DB_POOL_CONN_LIFE: float = float(environ.get("DB_POOL_CONN_LIFE") or 600)
+    # 单个连接执行多少次查询后被替换
+    DB_POOL_MAX_QUERIES: int = int(environ.get("DB_POOL_MAX_QUERIES") or 50000)
+    # 预编译语句缓存（每个连接）：缓存条数（0 禁用）、缓存有效期（秒）、可缓存的最大 SQL 长度
+    DB_STATEMENT_CACHE_SIZE: int = int(environ.get("DB_STATEMENT_CACHE_SIZE") or 100)
+    DB_STATEMENT_CACHE_LIFETIME: int = int(environ.get("DB_STATEMENT_CACHE_LIFETIME") or 300)
+    DB_STATEMENT_CACHE_MAX_SQL_SIZE: int = int(environ.get("DB_STATEMENT_CACHE_MAX_SQL_SIZE") or 15 * 1024)
+    # 单条 SQL 默认超时时间（秒），0 表示不限制
+    DB_COMMAND_TIMEOUT: float = float(environ.get("DB_COMMAND_TIMEOUT") or 0)
+    # 只读副本（可选）："host:port,host:port"，配置后读请求路由到副本（见 app.core.db.ReplicaRouter）
+    # 本地验证可指向同一个 PostgreSQL（如 127.0.0.1:5432），作为第二个连接
+    POSTGRES_REPLICAS: str = environ.get("POSTGRES_REPLICAS") or ""
+    # 写入后读主库的粘滞时间（秒）：同一请求/客户端在该时间内的读取仍走主库，保证读己之写
+    DB_REPLICA_STICKY_SECONDS: float = float(environ.get("DB_REPLICA_STICKY_SECONDS") or 5)
     TIMEZONE: str = environ.get("TIMEZONE") or "Asia/Shanghai"
+    # 启动时是否自动生成表结构：生产环境（ENV=PROD）默认关闭，表结构由 init_data.py 中的迁移统一维护
+    DB_GENERATE_SCHEMAS: bool = (environ.get("DB_GENERATE_SCHEMAS") or ("false" if ENV == "PROD" else "true")) == "true"
 
     # Redis 配置
     REDIS_HOST: str = environ.get("REDIS_HOST") or "127.0.0.1"  # redis
@@ -33,25 +73,124 @@ class Settings(BaseSettings):
     # 0 库用于后端，1 库用于celery broker
     BASE_REDIS: str = f"redis://{REDIS_USER}:{REDIS_PWD}@{REDIS_HOST}:{REDIS_PORT}/"
 
+    # Celery 任务在投递进程内同步执行（不经过 Broker，本地调试及基准测试使用）
+    CELERY_TASK_ALWAYS_EAGER: bool = (environ.get("CELERY_TASK_ALWAYS_EAGER") or "false") == "true"
+
+    # Celery 异步（协程）任务默认超时时间（秒），0 表示不限制
+    CELERY_ASYNC_TASK_TIMEOUT: float = float(environ.get("CELERY_ASYNC_TASK_TIMEOUT") or 300)
+
+    # Celery 任务幂等键有效期（秒）：有效期内相同幂等键的重复提交合并为首次提交的任务
+    TASK_IDEMPOTENCY_TTL: int = int(environ.get("TASK_IDEMPOTENCY_TTL") or 3600)
+
+    # 进程内定时调度：是否启用、Leader 租约时长（秒）
+    SCHEDULER_ENABLED: bool = (environ.get("SCHEDULER_ENABLED") or "true") == "true"
+    SCHEDULER_LEASE: float = float(environ.get("SCHEDULER_LEASE") or 15)
+
+    # 日志：输出格式（json / text）、每个调用位置每秒最多输出条数（0 不限流）、
+    # 按 logger 名称前缀抽样 WARNING 以下日志（"app.core.redis:0.1,app.api:0.5"）、日志队列长度（满时丢弃）
+    LOG_FORMAT: str = environ.get("LOG_FORMAT") or "json"
+    LOG_RATE_LIMIT: int = int(environ.get("LOG_RATE_LIMIT") or 50)
+    LOG_SAMPLING: str = environ.get("LOG_SAMPLING") or ""
+    LOG_QUEUE_SIZE: int = int(environ.get("LOG_QUEUE_SIZE") or 10000)
+
+    # 请求耗时统计：是否输出每个请求的耗时日志、慢查询阈值（毫秒）
+    REQUEST_TIMING_LOG: bool = (environ.get("REQUEST_TIMING_LOG") or "true") == "true"
+    SLOW_QUERY_THRESHOLD: float = float(environ.get("SLOW_QUERY_THRESHOLD") or 200)
+
+    # 用户名/用户组名可用性检查（Redis 布隆过滤器）：容量、目标误判率
+    BLOOM_CAPACITY: int = int(environ.get("BLOOM_CAPACITY") or 1000000)
+    BLOOM_ERROR_RATE: float = float(environ.get("BLOOM_ERROR_RATE") or 0.01)
+
+    # 数据变更推送（PostgreSQL LISTEN/NOTIFY -> WebSocket）：是否启用、合并窗口（秒，窗口内同一行的多次变更合并为一次推送）、
+    # 单条 WebSocket 消息最大字节数（超出时拆分）、待推送变更上限（超出时丢弃并通知客户端重新拉取）
+    CHANGE_FEED_ENABLED: bool = (environ.get("CHANGE_FEED_ENABLED") or "true") == "true"
+    CHANGE_FEED_COALESCE: float = float(environ.get("CHANGE_FEED_COALESCE") or 0.05)
+    CHANGE_FEED_MAX_MESSAGE_BYTES: int = int(environ.get("CHANGE_FEED_MAX_MESSAGE_BYTES") or 64 * 1024)
+    CHANGE_FEED_MAX_PENDING: int = int(environ.get("CHANGE_FEED_MAX_PENDING") or 10000)
+
+    # 高频字段延迟写入（如 last_login）：写入周期（秒）、缓冲条数达到上限时立即写入、单条 UPDATE 最多行数
+    WRITE_BEHIND_INTERVAL: float = float(environ.get("WRITE_BEHIND_INTERVAL") or 5)
+    WRITE_BEHIND_MAX_PENDING: int = int(environ.get("WRITE_BEHIND_MAX_PENDING") or 10000)
+    WRITE_BEHIND_BATCH_SIZE: int = int(environ.get("WRITE_BEHIND_BATCH_SIZE") or 1000)
+
+    # HTTP 幂等请求（Idempotency-Key）：响应缓存有效期（秒）、处理中标记过期时间（秒）、重复请求等待首次请求完成的最长时间（秒）
+    IDEMPOTENCY_TTL: int = int(environ.get("IDEMPOTENCY_TTL") or 86400)
+    IDEMPOTENCY_LOCK_TIMEOUT: int = int(environ.get("IDEMPOTENCY_LOCK_TIMEOUT") or 60)
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(environ.get("IDEMPOTENCY_WAIT_TIMEOUT") or 10)
+
+    # 密码哈希（scrypt）：工作因子 N（2 的幂）/ r / p、进程池大小、进程池忙时排队数、最长排队时间（秒）
+    PASSWORD_SCRYPT_N: int = int(environ.get("PASSWORD_SCRYPT_N") or 2 ** 14)
+    PASSWORD_SCRYPT_R: int = int(environ.get("PASSWORD_SCRYPT_R") or 8)
+    PASSWORD_SCRYPT_P: int = int(environ.get("PASSWORD_SCRYPT_P") or 1)
+    PASSWORD_HASH_WORKERS: int = int(environ.get("PASSWORD_HASH_WORKERS") or 2)
+    PASSWORD_HASH_QUEUE_SIZE: int = int(environ.get("PASSWORD_HASH_QUEUE_SIZE") or 64)
+    PASSWORD_HASH_TIMEOUT: float = float(environ.get("PASSWORD_HASH_TIMEOUT") or 5)
+
+    # 自适应并发限制（按路由分组）：是否启用、初始/最小/最大并发上限、等待队列长度、最长排队时间（秒）、
+    # 窗口耗时中位数超过基线多少倍时收缩上限、请求头 X-Request-Timeout 缺省时的请求截止时长（秒，0 不限制）
+    CONCURRENCY_ENABLED: bool = (environ.get("CONCURRENCY_ENABLED") or "true") == "true"
+    CONCURRENCY_INITIAL_LIMIT: int = int(environ.get("CONCURRENCY_INITIAL_LIMIT") or DB_POOL_MAX)
+    CONCURRENCY_MIN_LIMIT: int = int(environ.get("CONCURRENCY_MIN_LIMIT") or 2)
+    CONCURRENCY_MAX_LIMIT: int = int(environ.get("CONCURRENCY_MAX_LIMIT") or 200)
+    CONCURRENCY_QUEUE_SIZE: int = int(environ.get("CONCURRENCY_QUEUE_SIZE") or 100)
+    CONCURRENCY_QUEUE_TIMEOUT: float = float(environ.get("CONCURRENCY_QUEUE_TIMEOUT") or 5)
+    CONCURRENCY_LATENCY_TOLERANCE: float = float(environ.get("CONCURRENCY_LATENCY_TOLERANCE") or 2)
+    REQUEST_DEFAULT_TIMEOUT: float = float(environ.get("REQUEST_DEFAULT_TIMEOUT") or 0)
+
+    # 限流（Redis 令牌桶，规则格式 "次数/周期"）：是否启用、/api/ 下每个客户端 IP 的默认限制（为空不启用）、
+    # 进程内预过滤放行比例（占容量，0 关闭预过滤，每次检查均访问 Redis）、每个 WebSocket 连接的入站消息限制（为空不限制）
+    RATE_LIMIT_ENABLED: bool = (environ.get("RATE_LIMIT_ENABLED") or "true") == "true"
+    RATE_LIMIT_DEFAULT: str = environ.get("RATE_LIMIT_DEFAULT") or ""
+    RATE_LIMIT_LOCAL_FRACTION: float = float(environ.get("RATE_LIMIT_LOCAL_FRACTION") or 0.1)
+    RATE_LIMIT_WEBSOCKET: str = environ.get("RATE_LIMIT_WEBSOCKET") or "20/second"
+
+    # 服务进程（python -m app.server）：监听地址及端口、Worker 数（0 按 cgroup CPU 配额）、fork 前预加载应用、预加载后冻结 GC、
+    # Worker 处理多少个请求后回收（0 不限制，另加 0 ~ JITTER 随机数错开各 Worker 的回收时间）、常驻内存超过多少 MB 后回收（0 不限制）、
+    # 回收时等待 WebSocket 连接断开的最长时间（秒）、优雅退出时等待处理中请求的最长时间（秒）
+    SERVER_HOST: str = environ.get("SERVER_HOST") or "0.0.0.0"
+    SERVER_PORT: int = int(environ.get("SERVER_PORT") or 9000)
+    SERVER_WORKERS: int = int(environ.get("SERVER_WORKERS") or 0)
+    SERVER_PRELOAD: bool = (environ.get("SERVER_PRELOAD") or "true") == "true"
+    SERVER_GC_FREEZE: bool = (environ.get("SERVER_GC_FREEZE") or "true") == "true"
+    SERVER_MAX_REQUESTS: int = int(environ.get("SERVER_MAX_REQUESTS") or 0)
+    SERVER_MAX_REQUESTS_JITTER: int = int(environ.get("SERVER_MAX_REQUESTS_JITTER") or 0)
+    SERVER_MAX_RSS_MB: int = int(environ.get("SERVER_MAX_RSS_MB") or 0)
+    SERVER_DRAIN_TIMEOUT: float = float(environ.get("SERVER_DRAIN_TIMEOUT") or 30)
+    SERVER_GRACEFUL_TIMEOUT: float = float(environ.get("SERVER_GRACEFUL_TIMEOUT") or 30)
+
+    # Prometheus 指标：连接池指标刷新周期（秒）；多进程部署需设置环境变量 PROMETHEUS_MULTIPROC_DIR
+    METRICS_REFRESH_INTERVAL: float = float(environ.get("METRICS_REFRESH_INTERVAL") or 5)
+
+    # 采样分析器：是否启用（关闭时不注册中间件及接口）、接口/请求头 X-Profile-Token 令牌、
+    # 请求随机抽样比例（0 ~ 1）、采样间隔（秒）、结果保存目录
+    PROFILER_ENABLED: bool = (environ.get("PROFILER_ENABLED") or "false") == "true"
+    PROFILER_TOKEN: str = environ.get("PROFILER_TOKEN") or ""
+    PROFILER_SAMPLE_RATE: float = float(environ.get("PROFILER_SAMPLE_RATE") or 0)
+    PROFILER_INTERVAL: float = float(environ.get("PROFILER_INTERVAL") or 0.005)
+    PROFILER_OUTPUT_DIR: str = environ.get("PROFILER_OUTPUT_DIR") or "/tmp/profiles"
+
+    # 健康检查配置：后台探测周期（秒）、单个依赖检查超时时间（秒）
+    HEALTH_CHECK_INTERVAL: float = float(environ.get("HEALTH_CHECK_INTERVAL") or 10)
+    HEALTH_CHECK_TIMEOUT: float = float(environ.get("HEALTH_CHECK_TIMEOUT") or 2)
+
     BASE_POSTGRES = f'postgres://{POSTGRES_USER}:{POSTGRES_PWD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}'
     TORTOISE_ORM = {
-        "connections": {
-            "default": {
-                "engine": "tortoise.backends.asyncpg",
-                "credentials": {
-                    "database": POSTGRES_DB,
-                    "host": POSTGRES_HOST,
-                    "password": POSTGRES_PWD,
-                    "port": POSTGRES_PORT,
-                    "user": POSTGRES_USER,
-                    "maxsize": DB_POOL_MAX,  # 最大连接数
-                    # "minsize": 1, # 最小连接数
-                    # 关闭池中非活动连接的秒数。通过 0 则禁用此机制。
-                    # "max_inactive_connection_lifetime": 60 * 5,
-                    "ssl": False
-                },
-            }
-        },
+        "connections": build_db_connections(POSTGRES_HOST, POSTGRES_PORT, POSTGRES_REPLICAS, {
+            "database": POSTGRES_DB,
+            "password": POSTGRES_PWD,
+            "user": POSTGRES_USER,
+            "minsize": min(DB_POOL_MIN, DB_POOL_MAX),  # 最小连接数
+            "maxsize": DB_POOL_MAX,  # 最大连接数
+            "max_queries": DB_POOL_MAX_QUERIES,
+            "max_inactive_connection_lifetime": max(DB_POOL_CONN_LIFE, 0),
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "max_cached_statement_lifetime": DB_STATEMENT_CACHE_LIFETIME,
+            "max_cacheable_statement_size": DB_STATEMENT_CACHE_MAX_SQL_SIZE,
+            "command_timeout": DB_COMMAND_TIMEOUT or None,
+            "ssl": False
+        }),
+        # 配置只读副本时启用读写路由
+        "routers": ["app.core.db.ReplicaRouter"] if POSTGRES_REPLICAS else [],
         "apps": {
             "models": {
                 "models": ["aerich.models",
@@ -0,0 +1,179 @@
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+from app.core.utils import async_task, run_celery_task
+
+
+# ========================================
+# 说明: Celery 批量任务（高频事件聚合）
+#    * 生产者只向 Redis 列表追加轻量事件（RPUSH），不再为每个事件投递一条 Celery 消息
+#    * 积攒达到 size 条，或首条事件等待超过 max_wait 秒时，才投递一次 flush 任务
+#    * Worker 按 size 分块处理；分块先原子转移到 processing 列表，处理完成后确认删除，
+#      Worker 异常退出时超过 visibility_timeout 的分块会被重新放回待处理队列（至少一次语义）
+#    * 处理函数返回失败条目（索引 -> 错误），失败条目写入 failed 列表并记录日志；无效索引（非整数、越界）记录日志后忽略
+# ========================================
+
+
+# 从待处理队列取出最多 size 条，原子转移到本批次 processing 列表，并登记处理截止时间
+CLAIM_LUA = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('LTRIM', KEYS[1], #items, -1)
+redis.call('RPUSH', KEYS[3], unpack(items))
+redis.call('ZADD', KEYS[2], ARGV[2], KEYS[3])
+return items
+"""
+
+# 将超过处理截止时间（Worker 异常退出等）的批次按原顺序放回待处理队列头部
+RECOVER_LUA = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+local count = 0
+for _, key in ipairs(expired) do
+    local items = redis.call('LRANGE', key, 0, -1)
+    for i = #items, 1, -1 do
+        redis.call('LPUSH', KEYS[1], items[i])
+    end
+    count = count + #items
+    redis.call('DEL', key)
+    redis.call('ZREM', KEYS[2], key)
+end
+return count
+"""
+
+
+class BatchTask:
+    """
+    批量任务：处理函数签名 async def handler(items: list) -> Optional[dict[int, Any]]，返回值为失败条目（索引 -> 错误）;
+    处理函数整体抛出异常时，本批次不确认，待超时后重新投递;
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[Optional[Dict[int, Any]]]],
+                 name: str, size: int = 500, max_wait: float = 1.0,
+                 visibility_timeout: int = 300, failed_max: int = 10000):
+        self.handler = handler
+        self.name = name
+        self.size = size
+        self.max_wait = max_wait
+        self.visibility_timeout = visibility_timeout
+        self.failed_max = failed_max
+        self.pending_key = f"batch:{name}:pending"
+        self.inflight_key = f"batch:{name}:inflight"
+        self.failed_key = f"batch:{name}:failed"
+        # 注册 Celery 任务：Worker 侧执行 flush
+        self.flush_task = async_task(name=f"{name}.flush")(self.flush)
+
+    async def enqueue(self, *items: Any) -> int:
+        """
+        追加事件（JSON 可序列化），按阈值触发 flush 任务
+        :param items: 事件
+        :return: 追加后待处理队列长度，Redis 不可用时返回 0
+        """
+        if not items:
+            return 0
+        length = 0
+        async with get_redis_client() as rs:
+            length = await rs.rpush(self.pending_key, *(json.dumps(item, ensure_ascii=False) for item in items))
+        if not length:
+            LOG.error(f"Failed to enqueue batch items: {self.name}")
+            return 0
+        previous = length - len(items)
+        if length // self.size > previous // self.size:
+            # 新跨过一个 size 阈值：立即触发
+            run_celery_task(self.flush_task)
+        elif previous == 0:
+            # 队列由空变为非空：max_wait 秒后触发，保证零散事件也能及时处理
+            run_celery_task(self.flush_task, countdown=self.max_wait)
+        return length
+
+    def _valid_failures(self, failures: Any, count: int) -> Dict[int, Any]:
+        """
+        校验处理函数返回的失败条目：非字典或索引无效（非整数、越界）时记录日志并跳过，
+        避免处理函数已产生副作用后抛出异常，导致整批未确认、超时后重复处理
+        :param failures: 处理函数返回值
+        :param count: 本批次条目数
+        :return:
+        """
+        if not failures:
+            return {}
+        if not isinstance(failures, dict):
+            LOG.error(f"Batch handler returned invalid failures: {self.name}, type={type(failures).__name__}")
+            return {}
+        valid, invalid = {}, []
+        for index, error in failures.items():
+            if type(index) is int and 0 <= index < count:
+                valid[index] = error
+            else:
+                invalid.append(index)
+        if invalid:
+            LOG.error(f"Batch handler returned invalid failure indexes: {self.name}, indexes={invalid!r}, "
+                      f"batch_size={count}")
+        return valid
+
+    async def _process(self, rs, batch_key: str, raw_items: List[str]) -> int:
+        """
+        处理单个批次，确认完成并记录失败条目
+        :return: 失败条目数
+        """
+        items = [json.loads(raw) for raw in raw_items]
+        failures = self._valid_failures(await self.handler(items), len(items))
+        async with rs.pipeline(transaction=True) as pipe:
+            for index, error in failures.items():
+                LOG.warning(f"Batch item failed: {self.name}, item={raw_items[index]}, error={error!r}")
+                pipe.lpush(self.failed_key, json.dumps({"item": items[index], "error": repr(error),
+                                                        "failed_at": time.time()}, ensure_ascii=False))
+            if failures:
+                pipe.ltrim(self.failed_key, 0, self.failed_max - 1)
+            pipe.delete(batch_key)
+            pipe.zrem(self.inflight_key, batch_key)
+            await pipe.execute()
+        return len(failures)
+
+    async def flush(self) -> Dict[str, int]:
+        """
+        Worker 侧：回收超时批次，然后按 size 分块处理待处理队列直至为空
+        :return: 本次处理统计
+        """
+        stats = {"batches": 0, "processed": 0, "failed": 0, "recovered": 0}
+        async with get_redis_client() as rs:
+            recover = rs.register_script(RECOVER_LUA)
+            claim = rs.register_script(CLAIM_LUA)
+            stats["recovered"] = await recover(keys=[self.pending_key, self.inflight_key], args=[time.time()])
+            while True:
+                batch_key = f"batch:{self.name}:processing:{uuid.uuid4().hex}"
+                raw_items = await claim(keys=[self.pending_key, self.inflight_key, batch_key],
+                                        args=[self.size, time.time() + self.visibility_timeout])
+                if not raw_items:
+                    break
+                stats["failed"] += await self._process(rs, batch_key, raw_items)
+                stats["batches"] += 1
+                stats["processed"] += len(raw_items)
+        return stats
+
+
+def batch_task(size: int = 500, max_wait: float = 1.0, visibility_timeout: int = 300):
+    """
+    批量任务装饰器：
+
+        @batch_task(size=500, max_wait=1.0)
+        async def example_batch_task(items: list) -> Optional[dict]:
+            ...
+
+        await example_batch_task.enqueue({"id": 1})
+
+    :param size: 单批最大条数，积攒达到该条数时立即触发处理
+    :param max_wait: 首条事件最长等待时间（秒）
+    :param visibility_timeout: 批次处理超时时间（秒），超时未确认的批次会重新投递
+    :return: BatchTask
+    """
+
+    def decorator(func):
+        return BatchTask(func, name=f"{func.__module__}.{func.__name__}", size=size,
+                         max_wait=max_wait, visibility_timeout=visibility_timeout)
+
+    return decorator
@@ -0,0 +1,204 @@
+import hashlib
+import math
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+
+# ========================================
+# 说明: Redis 布隆过滤器（位图，所有 Worker 共享）
+#    * 位数组大小 m 及哈希函数个数 k 按容量 BLOOM_CAPACITY、目标误判率 BLOOM_ERROR_RATE 计算（100 万条 / 1% 约 1.2MB）
+#    * 判断"一定不存在"时无需访问数据库；"可能存在"时由调用方查询数据库确认
+#    * 增量维护：创建/改名时 add；布隆过滤器不支持删除，删除只计数（已删除的值仍判为"可能存在"，仅增加误判），
+#      由全量重建（流式扫描表，写入临时键后 RENAME 原子替换，重建期间新增的值同时写入临时键）清除
+#    * 统计：检查次数、一定不存在次数、误判次数（可能存在但数据库中不存在）、实际误判率及按位数组填充率估算的误判率
+#    * 过滤器未构建或 Redis 不可用时返回"未知"，调用方直接查询数据库
+#    * 添加失败（Redis 不可用）时删除过滤器，重建前返回"未知"，避免已提交的值被判为一定不存在；
+#      删除也失败时本进程在后续检查 / 添加时重试删除，期间返回"未知"。绕过服务层写入（批量导入等）后需删除或重建过滤器
+# ========================================
+
+# 设置位：KEYS[1] 过滤器，KEYS[2] 重建中的临时过滤器，KEYS[3] 统计；ARGV 为位偏移量
+# 只写入已存在的位图：过滤器未构建时不创建（否则未包含已有数据的位图会把已存在的值误判为一定不存在）
+ADD_LUA = """
+local added = 0
+for k = 1, 2 do
+    if redis.call('EXISTS', KEYS[k]) == 1 then
+        for i = 1, #ARGV do
+            redis.call('SETBIT', KEYS[k], ARGV[i], 1)
+        end
+        added = 1
+    end
+end
+if added == 1 then
+    redis.call('HINCRBY', KEYS[3], 'items', 1)
+end
+return added
+"""
+
+# 开始重建：原子地重新创建临时过滤器（预分配位数组，ARGV[2] 秒后过期，进程异常退出时自动清理），
+# 避免删除与创建之间的并发 add 因临时键不存在而未写入
+BUILD_LUA = """
+redis.call('DEL', KEYS[1])
+redis.call('SETBIT', KEYS[1], ARGV[1], 0)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# 检查：过滤器不存在返回 -1，全部位为 1 返回 1（可能存在），否则返回 0（一定不存在）
+CHECK_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+redis.call('HINCRBY', KEYS[2], 'checks', 1)
+for i = 1, #ARGV do
+    if redis.call('GETBIT', KEYS[1], ARGV[i]) == 0 then
+        redis.call('HINCRBY', KEYS[2], 'negatives', 1)
+        return 0
+    end
+end
+return 1
+"""
+
+
+class RedisBloomFilter:
+    """
+    基于 Redis 位图的布隆过滤器
+    """
+
+    def __init__(self, name: str, capacity: int = settings.BLOOM_CAPACITY,
+                 error_rate: float = settings.BLOOM_ERROR_RATE):
+        self.name = name
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.key = f"bloom:{name}"
+        self.build_key = f"bloom:{name}:build"
+        self.stats_key = f"bloom:{name}:stats"
+        # 本进程添加失败且尚未成功删除过滤器
+        self._stale = False
+
+    def offsets(self, value: str) -> List[int]:
+        """
+        k 个位偏移量（双重哈希：h1 + i * h2）
+        :param value:
+        :return:
+        """
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    async def add(self, value: str) -> None:
+        """
+        添加（创建/改名后调用）
+        :param value:
+        :return:
+        """
+        added = False
+        if not self._stale:
+            async with get_redis_client() as rs:
+                await rs.eval(ADD_LUA, 3, self.key, self.build_key, self.stats_key, *self.offsets(value))
+                added = True
+        if not added:
+            await self.invalidate()
+
+    async def invalidate(self) -> bool:
+        """
+        删除过滤器（含重建中的临时键），重建前检查返回"未知"
+        :return: 是否删除成功（失败时本进程后续检查返回"未知"并重试删除）
+        """
+        deleted = False
+        async with get_redis_client() as rs:
+            await rs.delete(self.key, self.build_key)
+            deleted = True
+        self._stale = not deleted
+        if deleted:
+            LOG.warning(f"Bloom filter invalidated, rebuild required: {self.name}")
+        else:
+            LOG.error(f"Bloom filter invalidation failed, will retry: {self.name}")
+        return deleted
+
+    async def might_contain(self, value: str) -> Optional[bool]:
+        """
+        是否可能存在
+        :param value:
+        :return: False 一定不存在；True 可能存在；None 未知（过滤器未构建或 Redis 不可用）
+        """
+        if self._stale and not await self.invalidate():
+            return None
+        result = -1
+        async with get_redis_client() as rs:
+            result = await rs.eval(CHECK_LUA, 2, self.key, self.stats_key, *self.offsets(value))
+        return None if result == -1 else bool(result)
+
+    async def record_false_positive(self) -> None:
+        """
+        记录一次误判（可能存在，但数据库中不存在）
+        :return:
+        """
+        async with get_redis_client() as rs:
+            await rs.hincrby(self.stats_key, "false_positives", 1)
+
+    async def record_delete(self) -> None:
+        """
+        记录一次删除（布隆过滤器无法删除，已删除的值在重建前仍判为可能存在）
+        :return:
+        """
+        async with get_redis_client() as rs:
+            await rs.hincrby(self.stats_key, "deleted", 1)
+
+    async def rebuild(self, chunks: AsyncIterator[Iterable[str]]) -> Dict[str, float]:
+        """
+        全量重建：逐块写入临时键，完成后原子替换
+        :param chunks: 按块产出全部值（流式扫描表）
+        :return: 重建统计
+        """
+        start = time.perf_counter()
+        items, renamed = 0, False
+        async with get_redis_client() as rs:
+            await rs.eval(BUILD_LUA, 1, self.build_key, self.size - 1, 3600)
+            async for chunk in chunks:
+                pipe = rs.pipeline(transaction=False)
+                for value in chunk:
+                    pipe.execute_command("BITFIELD", self.build_key,
+                                         *(arg for offset in self.offsets(value) for arg in ("SET", "u1", offset, 1)))
+                    items += 1
+                await pipe.execute()
+            await rs.rename(self.build_key, self.key)
+            renamed = True
+            self._stale = False
+            await rs.delete(self.stats_key)
+            await rs.hset(self.stats_key, mapping={"items": items, "rebuilt_at": int(time.time())})
+        elapsed = time.perf_counter() - start
+        if not renamed:
+            # Redis 错误已由 get_redis_client 记录，原过滤器保持不变
+            LOG.error(f"Bloom filter rebuild failed: {self.name}, items={items}, elapsed={elapsed:.2f}s")
+            raise RuntimeError(f"Bloom filter rebuild failed: {self.name}")
+        LOG.info(f"Bloom filter rebuilt: {self.name}, items={items}, elapsed={elapsed:.2f}s")
+        return {"items": items, "elapsed": round(elapsed, 3)}
+
+    async def stats(self) -> Dict[str, float]:
+        """
+        统计：容量、位数组大小、哈希函数个数、已添加条数、删除次数、检查次数、误判次数、实际误判率、估算误判率
+        :return:
+        """
+        values, bits = {}, 0
+        async with get_redis_client() as rs:
+            values = await rs.hgetall(self.stats_key)
+            bits = await rs.bitcount(self.key)
+        counts = {name: int(values.get(name, 0))
+                  for name in ("items", "deleted", "checks", "negatives", "false_positives", "rebuilt_at")}
+        absent = counts["negatives"] + counts["false_positives"]
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "size_bits": self.size,
+            "hashes": self.hashes,
+            **counts,
+            "fill_ratio": round(bits / self.size, 6),
+            # 实际误判率：数据库中不存在的值中被判为可能存在的比例
+            "observed_fpr": round(counts["false_positives"] / absent, 6) if absent else None,
+            "estimated_fpr": round((bits / self.size) ** self.hashes, 6),
+        }
@@ -1,11 +1,37 @@
-from celery import Celery
+from celery import Celery, Task
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+from app.core.logger import LOG
+from app.core.task_idempotency import IDEMPOTENCY_HEADER, is_task_done, mark_task_done
+from app.core.utils import AsyncLoopCreator
 
 # ========================================
 # 说明: Celery App
 # ========================================
 
-app = Celery("ExampleCelery")
+
+class IdempotentTask(Task):
+    """
+    默认任务基类：消息头携带幂等键时，已完成的任务直接跳过，执行成功后写入完成标记（见 app.core.task_idempotency）;
+    未携带幂等键的任务（绝大多数）只多一次字典查找;
+    """
+
+    def __call__(self, *args, **kwargs):
+        idempotency_key = self.request.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return super().__call__(*args, **kwargs)
+        if AsyncLoopCreator.run(is_task_done(idempotency_key)):
+            LOG.info(f"Skip completed task: {self.name}, {idempotency_key}")
+            return None
+        result = super().__call__(*args, **kwargs)
+        AsyncLoopCreator.run(mark_task_done(idempotency_key))
+        return result
+
+
+app = Celery("ExampleCelery", task_cls=IdempotentTask)
 app.config_from_object('app.core.celery_config')
+# 设为进程级默认 App：current_app 按线程记录，首次在其他线程（如健康探测）中加载时主线程仍为未配置的默认 App
+app.set_default()
 app.autodiscover_tasks(['app.tasks.tasks', 'app.tasks.scheduler_tasks'])
 
 
@@ -15,3 +41,12 @@ def do_health_check():
     # 内置：TODO 健康检查
     """
     print('健康检查: Celery 健康检查正常！')
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def shutdown_async_loop(**kwargs):
+    """
+    Worker 退出时关闭共享事件循环及其数据库连接（prefork 子进程触发 worker_process_shutdown，eventlet/solo 触发 worker_shutdown）
+    """
+    AsyncLoopCreator.shutdown()
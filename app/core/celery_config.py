@@ -12,6 +12,7 @@ result_serializer = 'json'
 timezone = settings.TIMEZONE
 broker_url = settings.BASE_REDIS + '1'
 task_default_queue = 'example'
+task_always_eager = settings.CELERY_TASK_ALWAYS_EAGER
 
 # 配置任务路由
 # task_routes = {
@@ -25,8 +26,10 @@ beat_schedule = {
         'task': 'app.tasks.scheduler_tasks.get_current_time',
         'schedule': crontab(minute='*/1'),  # Every minute
     },
-    'push_websocket_data': {
-        'task': 'app.tasks.scheduler_tasks.push_websocket_data',
-        'schedule': 5,
+    # push_websocket_data 已迁移至进程内定时调度（app.core.scheduler），不再经过 beat
+    # 批量任务兜底：回收超时未确认的批次并处理遗留事件
+    'eg_batch_task_flush': {
+        'task': 'app.tasks.tasks.eg_batch_task.flush',
+        'schedule': 60,
     },
 }
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import asyncpg
+
+from app import settings
+from app.core.logger import LOG
+from app.core.metrics import CHANGE_FEED_EVENTS, CHANGE_FEED_MESSAGES
+from app.core.utils import SingletonMeta
+from app.core.websockets import ExampleGroupWebsocket, ExampleUserWebsocket, WebSocketManager
+
+# ========================================
+# 说明: 数据变更推送（PostgreSQL LISTEN/NOTIFY -> WebSocket），替代客户端轮询 REST 接口
+#    * example_user / example_group 上的触发器在增删改后执行 pg_notify('example_changes', ...)（见迁移 1_*_change_feed），
+#      事务提交后才会送达，回滚的变更不推送；批量 SQL、延迟写入（write-behind）等不经过 Service 层的修改同样覆盖
+#    * 每个进程一个独立的 asyncpg 连接执行 LISTEN（不占用连接池），断线后指数退避重连，
+#      重连成功后向本进程所有订阅者推送 {"type": "resync"}（断线期间的变更可能丢失，客户端需重新拉取）
+#    * 每个进程只推送到本进程内的 WebSocket 连接（各进程均收到同一通知，不再经过 Redis Pub/Sub，避免重复推送）：
+#      用户变更 -> ExampleUserWebsocket 用户频道及所属用户组的 ExampleGroupWebsocket 频道；用户组变更 -> 用户组频道
+#    * 合并：收到通知后等待 CHANGE_FEED_COALESCE 秒，窗口内同一行的多次变更合并为最后一次，按频道打包为一条消息
+#    * 拆分：单条消息超过 CHANGE_FEED_MAX_MESSAGE_BYTES 时拆分为多条；单个变更超出时按 {"type": "chunk"} 分片发送
+#    * 待推送变更超过 CHANGE_FEED_MAX_PENDING（推送跟不上通知）时丢弃并推送 resync
+# ========================================
+
+PG_CHANNEL = "example_changes"
+# 无通知时的连接探测周期（秒）：网络中断时连接不会收到关闭事件，需主动探测
+KEEPALIVE_INTERVAL = 30
+
+# 表名 -> (模型, 主频道对应的 WebSocket 管理类)
+_TABLES = {
+    "example_user": ("ExampleUser", ExampleUserWebsocket),
+    "example_group": ("ExampleGroup", ExampleGroupWebsocket),
+}
+_OPS = {"INSERT": "created", "UPDATE": "updated", "DELETE": "deleted"}
+
+
+def _pack(channel_changes: List[str], max_bytes: int) -> Iterator[str]:
+    """
+    将同一频道的变更（已序列化）打包为不超过 max_bytes 的消息
+    :param channel_changes: 变更 JSON 列表
+    :param max_bytes: 单条消息最大字节数
+    :return:
+    """
+    head, tail = '{"type": "changes", "changes": [', ']}'
+    batch, size = [], len(head) + len(tail)
+    for change in channel_changes:
+        change_size = len(change.encode())
+        if size + change_size + 2 > max_bytes and batch:
+            yield head + ", ".join(batch) + tail
+            batch, size = [], len(head) + len(tail)
+        if len(head) + len(tail) + change_size > max_bytes:
+            # 单个变更超出上限：分片发送，客户端按 id 拼接 data 后解析
+            chunk_id = uuid.uuid4().hex
+            # 按字符切分：每个字符编码（UTF-8 / JSON 转义）后最多 4 字节，预留 200 字节给分片信息
+            size_per_chunk = max((max_bytes - 200) // 4, 1)
+            parts = [change[i:i + size_per_chunk] for i in range(0, len(change), size_per_chunk)]
+            for index, part in enumerate(parts):
+                yield json.dumps({"type": "chunk", "id": chunk_id, "index": index, "total": len(parts),
+                                  "data": part}, ensure_ascii=False)
+            continue
+        batch.append(change)
+        size += change_size + 2
+    if batch:
+        yield head + ", ".join(batch) + tail
+
+
+class ChangeFeedListener(metaclass=SingletonMeta):
+    """
+    PostgreSQL 数据变更监听（每个进程一个实例）
+    """
+
+    def __init__(self, coalesce: float = settings.CHANGE_FEED_COALESCE,
+                 max_message_bytes: int = settings.CHANGE_FEED_MAX_MESSAGE_BYTES,
+                 max_pending: int = settings.CHANGE_FEED_MAX_PENDING):
+        self.coalesce = coalesce
+        self.max_message_bytes = max_message_bytes
+        self.max_pending = max_pending
+        # (表名, 主键) -> 合并后的变更
+        self._pending: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._resync = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    def start(self) -> None:
+        """
+        启动后台监听任务
+        :return:
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        停止后台监听任务并关闭监听连接
+        :return:
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    async def _connect() -> asyncpg.Connection:
+        credentials = settings.TORTOISE_ORM["connections"]["default"]["credentials"]
+        return await asyncpg.connect(host=credentials["host"], port=credentials["port"],
+                                     user=credentials["user"], password=credentials["password"],
+                                     database=credentials["database"])
+
+    def _on_notify(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        """
+        收到通知：写入待推送变更（同一行合并），唤醒推送
+        """
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            LOG.warning(f"Invalid change notification: {payload[:200]}")
+            return
+        CHANGE_FEED_EVENTS.labels(event.get("table", ""), event.get("op", "")).inc()
+        key = (event.get("table"), event.get("id"))
+        previous = self._pending.get(key)
+        if previous is not None:
+            # 窗口内先创建后修改仍为创建；记录最早的原用户组，以便通知移出的用户组
+            if previous["op"] == "INSERT" and event["op"] == "UPDATE":
+                event["op"] = "INSERT"
+            event["old_group_id"] = previous.get("old_group_id") or event.get("old_group_id")
+        elif len(self._pending) >= self.max_pending:
+            self._pending.clear()
+            self._resync = True
+            LOG.warning(f"Change feed overflow (>{self.max_pending} pending), clients will resync")
+        self._pending[key] = event
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        delay, reconnect = 1.0, False
+        while True:
+            try:
+                conn = await self._connect()
+            except (OSError, asyncpg.PostgresError) as e:
+                LOG.warning(f"Change feed connect failed: {e!r}, retry in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+                continue
+            try:
+                if not await conn.fetchval("SELECT EXISTS(SELECT 1 FROM pg_trigger "
+                                           "WHERE tgname = 'example_user_notify_change')"):
+                    LOG.warning("Change feed triggers not installed, run init_data.py (aerich upgrade)")
+                await conn.add_listener(PG_CHANNEL, self._on_notify)
+                self.connected = True
+                delay = 1.0
+                LOG.info(f"Change feed listening on {PG_CHANNEL}")
+                if reconnect:
+                    self._resync = True
+                    self._wakeup.set()
+                reconnect = True
+                await self._dispatch_loop(conn)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                LOG.warning(f"Change feed connection lost: {e!r}, reconnecting")
+            finally:
+                self.connected = False
+                conn.terminate()
+
+    async def _dispatch_loop(self, conn: asyncpg.Connection) -> None:
+        while not conn.is_closed():
+            try:
+                async with asyncio.timeout(KEEPALIVE_INTERVAL):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                await conn.execute("SELECT 1", timeout=KEEPALIVE_INTERVAL)
+                continue
+            # 合并窗口：期间到达的通知并入同一批
+            await asyncio.sleep(self.coalesce)
+            self._wakeup.clear()
+            events, self._pending = self._pending, {}
+            resync, self._resync = self._resync, False
+            try:
+                await self.dispatch(list(events.values()), resync)
+            except Exception as e:
+                LOG.error(f"Change feed dispatch failed: {e!r}")
+
+    async def dispatch(self, events: List[Dict[str, Any]], resync: bool = False) -> int:
+        """
+        推送一批变更到本进程内订阅了相关频道的 WebSocket 连接
+        :param events: 合并后的变更通知
+        :param resync: 是否通知所有订阅者重新拉取
+        :return: 推送的消息数
+        """
+        managers = [manager() for _, manager in _TABLES.values()]
+        messages = 0
+        if resync:
+            for manager in managers:
+                for channel in list(manager.channels):
+                    await manager.send_local(channel, '{"type": "resync"}')
+                    messages += 1
+        # 频道 -> (管理类, 变更列表)；只处理本进程内有订阅者的频道，无订阅者时不查询、不序列化
+        targets: Dict[str, Tuple[WebSocketManager, List[Dict[str, Any]]]] = {}
+        group_manager = ExampleGroupWebsocket()
+        for event in events:
+            if event.get("table") not in _TABLES:
+                continue
+            _, manager_class = _TABLES[event["table"]]
+            manager = manager_class()
+            channels = [(manager, manager.channel.format(event["id"]))]
+            if event["table"] == "example_user":
+                channels += [(group_manager, group_manager.channel.format(group_id))
+                             for group_id in {event.get("group_id"), event.get("old_group_id")} if group_id]
+            for manager, channel in channels:
+                if channel in manager.channels:
+                    targets.setdefault(channel, (manager, []))[1].append(event)
+        if not targets:
+            return messages
+        await self._load_missing_rows([event for _, channel_events in targets.values() for event in channel_events])
+        for channel, (manager, channel_events) in targets.items():
+            changes = [json.dumps({"table": event["table"], "op": _OPS.get(event["op"], event["op"]),
+                                   "id": event["id"], "data": event.get("row")}, ensure_ascii=False, default=str)
+                       for event in channel_events]
+            for message in _pack(changes, self.max_message_bytes):
+                await manager.send_local(channel, message)
+                CHANGE_FEED_MESSAGES.labels(type(manager).__name__).inc()
+                messages += 1
+        return messages
+
+    @staticmethod
+    async def _load_missing_rows(events: List[Dict[str, Any]]) -> None:
+        """
+        超出 NOTIFY 负载上限的变更只携带主键：按表批量查询（每张表一次 WHERE id IN (...)）
+        :param events:
+        :return:
+        """
+        from app.models import examples
+
+        missing: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {}
+        for event in events:
+            if "row" not in event and event["op"] != "DELETE":
+                missing.setdefault(event["table"], {}).setdefault(event["id"], []).append(event)
+        for table, by_id in missing.items():
+            model = getattr(examples, _TABLES[table][0])
+            fields = [name for name in model._meta.db_fields if name != "password"]
+            for row in await model.filter(id__in=list(by_id)).values(*fields):
+                for event in by_id.get(row["id"], ()):
+                    event["row"] = row
@@ -0,0 +1,235 @@
+import asyncio
+import collections
+import json
+import math
+import time
+from typing import Deque, Dict, List, Optional
+
+from app import settings
+from app.core.logger import LOG
+from app.core.metrics import CONCURRENCY_LIMIT, CONCURRENCY_REJECTED
+
+# ========================================
+# 说明: 自适应并发限制及过载保护（load shedding）
+#    * 按路由分组（/api/<版本>/examples/<分组>/...，如 users、groups）分别限制并发处理中的请求数，其他路径不限制
+#    * 并发上限按 AIMD 自适应：按窗口（window 个请求）统计处理耗时中位数，超过长期基线（各窗口中位数的 EWMA）的
+#      CONCURRENCY_LATENCY_TOLERANCE 倍或请求超时被取消时乘性减小（每个窗口至多一次），上限被用满且耗时正常时加性增大；
+#      单个请求的尾部耗时不触发收缩，数据库变慢时上限随之收缩，请求在队列中等待而不是堆积在连接池上
+#    * 超出上限的请求进入有界等待队列（CONCURRENCY_QUEUE_SIZE），队列已满立即返回 503 + Retry-After
+#    * 截止时间：请求头 X-Request-Timeout（秒，客户端等待时长）或 REQUEST_DEFAULT_TIMEOUT；
+#      排队超过截止时间（或 CONCURRENCY_QUEUE_TIMEOUT）返回 503，处理超过截止时间取消处理函数并返回 504，
+#      不再为已经放弃等待的客户端继续占用数据库连接
+# ========================================
+
+TIMEOUT_HEADER = b"x-request-timeout"
+API_PREFIX = f"/api/{settings.VERSION}/examples/"
+
+
+class Rejected(Exception):
+    """
+    请求被拒绝（队列已满或排队超时）
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 自适应并发限制 + 有界 FIFO 等待队列（单事件循环内使用，无需加锁）
+    """
+
+    def __init__(self, name: str, initial: int = settings.CONCURRENCY_INITIAL_LIMIT,
+                 min_limit: int = settings.CONCURRENCY_MIN_LIMIT, max_limit: int = settings.CONCURRENCY_MAX_LIMIT,
+                 queue_size: int = settings.CONCURRENCY_QUEUE_SIZE,
+                 tolerance: float = settings.CONCURRENCY_LATENCY_TOLERANCE,
+                 backoff: float = 0.9, window: int = 100):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        # 当前窗口的处理耗时；基线耗时：各窗口耗时中位数的 EWMA（缓慢跟随服务能力变化），首个窗口结束前为 None
+        self.window = window
+        self._window: List[float] = []
+        self._baseline: Optional[float] = None
+        # 当前窗口内是否已收缩过上限
+        self._decreased = False
+        # 平均耗时（EWMA），用于估算 Retry-After
+        self._avg_rtt = 0.0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._gauge = CONCURRENCY_LIMIT.labels(name)
+        self._gauge.set(self.limit)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil((len(self._waiters) + 1) * self._avg_rtt / self.limit))
+
+    async def acquire(self, timeout: float) -> None:
+        """
+        获取处理名额：未达上限立即返回，否则排队等待
+        :param timeout: 最长排队时间（秒）
+        :return:
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Rejected("queue_full", self._retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except TimeoutError:
+            # 超时与被唤醒同时发生时，名额已分配给当前请求
+            if waiter.done() and not waiter.cancelled():
+                return
+            raise Rejected("queue_timeout", self._retry_after())
+        except asyncio.CancelledError:
+            # 名额已分配给当前请求，但恢复执行前被取消（如服务关闭）：归还名额，否则该名额永久占用
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self, rtt: float, dropped: bool = False) -> None:
+        """
+        释放名额并按本次处理耗时调整上限，唤醒等待中的请求
+        :param rtt: 处理耗时（秒，不含排队）
+        :param dropped: 是否因超时被取消
+        :return:
+        """
+        saturated = self.in_flight >= self.limit
+        self.in_flight -= 1
+        self._avg_rtt += (rtt - self._avg_rtt) * 0.1
+        self._window.append(rtt)
+        congested = dropped
+        if len(self._window) >= self.window:
+            self._window.sort()
+            median = self._window[len(self._window) // 2]
+            congested = congested or (self._baseline is not None and median > self._baseline * self.tolerance)
+            self._baseline = median if self._baseline is None else self._baseline + (median - self._baseline) * 0.05
+            self._window.clear()
+        if congested and not self._decreased:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._decreased = True
+        elif saturated and not congested:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if not self._window:
+            self._decreased = False
+        self._gauge.set(self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        # 按 FIFO 顺序将空闲名额分配给等待中的请求
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def route_group(path: str) -> Optional[str]:
+    """
+    路由分组：/api/<版本>/examples/<分组>/...，其他路径（健康检查、指标等）返回 None，不做限制
+    :param path:
+    :return:
+    """
+    if not path.startswith(API_PREFIX):
+        return None
+    return path[len(API_PREFIX):].split("/", 1)[0] or None
+
+
+def get_limiter(group: str) -> AdaptiveLimiter:
+    limiter = _limiters.get(group)
+    if limiter is None:
+        limiter = _limiters[group] = AdaptiveLimiter(group)
+    return limiter
+
+
+def request_timeout(headers: Dict[bytes, bytes]) -> float:
+    """
+    请求截止时长（秒）：请求头 X-Request-Timeout，缺省或无效时使用 REQUEST_DEFAULT_TIMEOUT，0 表示不限制
+    :param headers:
+    :return:
+    """
+    try:
+        value = float(headers[TIMEOUT_HEADER])
+        return value if value > 0 else settings.REQUEST_DEFAULT_TIMEOUT
+    except (KeyError, ValueError):
+        return settings.REQUEST_DEFAULT_TIMEOUT
+
+
+async def _send_error(send, status_code: int, detail: str, headers: list = ()) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status_code,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    自适应并发限制 ASGI 中间件（CONCURRENCY_ENABLED=true 时注册）
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        group = route_group(scope["path"]) if scope["type"] == "http" else None
+        if group is None:
+            return await self.app(scope, receive, send)
+        limiter = get_limiter(group)
+        loop = asyncio.get_running_loop()
+        timeout = request_timeout(dict(scope["headers"]))
+        deadline = loop.time() + timeout if timeout else None
+        queue_timeout = min(timeout, settings.CONCURRENCY_QUEUE_TIMEOUT) if timeout else \
+            settings.CONCURRENCY_QUEUE_TIMEOUT
+        try:
+            await limiter.acquire(queue_timeout)
+        except Rejected as e:
+            CONCURRENCY_REJECTED.labels(group, e.reason).inc()
+            return await _send_error(send, 503, "Server overloaded, retry later",
+                                     [(b"retry-after", str(e.retry_after).encode())])
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        start = time.perf_counter()
+        dropped = False
+        timer = asyncio.timeout_at(deadline)
+        try:
+            async with timer:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            # 仅处理截止时间到期，处理函数自身抛出的 TimeoutError 照常向外传递
+            if not timer.expired():
+                raise
+            dropped = True
+            CONCURRENCY_REJECTED.labels(group, "deadline").inc()
+            LOG.warning(f"Request deadline exceeded, handler cancelled: {scope['method']} {scope['path']}, "
+                        f"timeout={timeout}s")
+            if not started:
+                await _send_error(send, 504, "Request deadline exceeded")
+        finally:
+            limiter.release(time.perf_counter() - start, dropped)
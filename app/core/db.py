@@ -0,0 +1,240 @@
+import contextlib
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import asyncpg
+from starlette.requests import cookie_parser
+from tortoise import connections
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from tortoise.backends.base.client import BaseTransactionWrapper
+
+from app import settings
+from app.core.instrumentation import record_db
+from app.core.logger import LOG
+
+
+# ========================================
+# 说明: PostgreSQL 连接池及读写路由
+#    * Tortoise 引擎（TORTOISE_ORM.connections.*.engine = "app.core.db"），在 asyncpg 引擎基础上采集连接池指标
+#    * 获取连接等待时间、预编译语句缓存命中率（按进程统计）
+#    * SQL 执行次数及耗时计入当前请求统计，慢查询记录日志（见 app.core.instrumentation）
+#    * 启动预热：提前建立 minsize 个连接，避免首批请求承担建连开销
+#    * 读写路由（配置 POSTGRES_REPLICAS 时启用）：仅 HTTP 请求（DBRoutingMiddleware）内的读取负载均衡到只读副本，
+#      写入及读己之写留在主库；请求之外（迁移、Celery 任务、后台任务等）均读主库
+# ========================================
+
+_stats = {
+    "acquire_count": 0,
+    "acquire_wait_total": 0.0,
+    "acquire_wait_max": 0.0,
+    "statement_cache_hits": 0,
+    "statement_cache_misses": 0,
+}
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """
+    统计预编译语句缓存命中情况及 SQL 执行耗时的 asyncpg 连接
+    """
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        if args:
+            # 带参数的执行经由 _do_execute 统计
+            return await super().execute(query, *args, timeout=timeout)
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, timeout=timeout)
+        finally:
+            record_db(query, time.perf_counter() - start)
+
+    async def _do_execute(self, query, executor, timeout, retry=True, **kwargs):
+        if not retry:
+            # 预编译语句失效后的内部重试，已由外层调用统计
+            return await super()._do_execute(query, executor, timeout, retry=retry, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await super()._do_execute(query, executor, timeout, retry=retry, **kwargs)
+        finally:
+            record_db(query, time.perf_counter() - start)
+
+    async def _get_statement(self, query, timeout, *, named=False, use_cache=True,
+                             ignore_custom_codec=False, record_class=None):
+        if use_cache and self._stmt_cache_enabled:
+            key = (query, record_class or self._protocol.get_record_class(), ignore_custom_codec)
+            if self._stmt_cache.get(key, promote=False) is not None:
+                _stats["statement_cache_hits"] += 1
+            else:
+                _stats["statement_cache_misses"] += 1
+        return await super()._get_statement(query, timeout, named=named, use_cache=use_cache,
+                                            ignore_custom_codec=ignore_custom_codec,
+                                            record_class=record_class)
+
+
+class InstrumentedPool(asyncpg.Pool):
+    """
+    统计获取连接等待时间的 asyncpg 连接池（事务与普通查询均经过 _acquire）
+    """
+
+    async def _acquire(self, timeout):
+        start = time.perf_counter()
+        try:
+            return await super()._acquire(timeout)
+        finally:
+            wait = time.perf_counter() - start
+            _stats["acquire_count"] += 1
+            _stats["acquire_wait_total"] += wait
+            _stats["acquire_wait_max"] = max(_stats["acquire_wait_max"], wait)
+
+
+class InstrumentedAsyncpgDBClient(AsyncpgDBClient):
+    connection_class = InstrumentedConnection
+
+    async def create_pool(self, **kwargs) -> asyncpg.Pool:
+        # 与 asyncpg.create_pool 默认值保持一致，credentials 中的同名参数优先
+        params = {
+            "max_queries": 50000,
+            "max_inactive_connection_lifetime": 300.0,
+            "setup": None,
+            "init": None,
+            "record_class": asyncpg.Record,
+            **kwargs,
+        }
+        return await InstrumentedPool(None, **params)
+
+
+client_class = InstrumentedAsyncpgDBClient
+
+
+async def warm_up_pools() -> None:
+    """
+    预热连接池：为每个数据库连接创建连接池（asyncpg 创建时即建立 min_size 个连接）
+    :return:
+    """
+    for conn in connections.all():
+        if isinstance(conn, AsyncpgDBClient) and conn._pool is None:
+            start = time.perf_counter()
+            await conn.create_connection(with_db=True)
+            LOG.info(f"Database pool warmed up: {conn.connection_name}, size={conn._pool.get_size()}, "
+                     f"cost={(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """
+    连接池指标：各连接池大小/空闲/使用中连接数，获取连接等待时间，预编译语句缓存命中率
+    :return:
+    """
+    pools = {}
+    for conn in connections.all():
+        pool = getattr(conn, "_pool", None)
+        if pool is None:
+            continue
+        size, idle = pool.get_size(), pool.get_idle_size()
+        pools[conn.connection_name] = {
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+        }
+    count = _stats["acquire_count"]
+    lookups = _stats["statement_cache_hits"] + _stats["statement_cache_misses"]
+    return {
+        "pools": pools,
+        "acquire": {
+            "count": count,
+            "wait_avg_ms": round(_stats["acquire_wait_total"] / count * 1000, 3) if count else 0,
+            "wait_max_ms": round(_stats["acquire_wait_max"] * 1000, 3),
+        },
+        "statement_cache": {
+            "hits": _stats["statement_cache_hits"],
+            "misses": _stats["statement_cache_misses"],
+            "hit_ratio": round(_stats["statement_cache_hits"] / lookups, 4) if lookups else None,
+        },
+    }
+
+
+# TODO：================= 读写路由 =======================#
+
+REPLICA_ALIASES = [alias for alias in settings.TORTOISE_ORM["connections"] if alias.startswith("replica_")]
+STICKY_COOKIE = "db_sticky"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# 当前上下文（请求）的读取是否可使用副本（仅由 DBRoutingMiddleware 开启）；写入后读主库的截止时间
+_read_replica: ContextVar[bool] = ContextVar("db_read_replica", default=False)
+_sticky_until: ContextVar[float] = ContextVar("db_sticky_until", default=0.0)
+
+
+@contextlib.contextmanager
+def force_primary():
+    """
+    上下文内的读取强制使用主库（需要读到所有已提交数据时，如全量重建布隆过滤器）
+    :return:
+    """
+    token = _read_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Tortoise 读写路由（TORTOISE_ORM.routers）：
+        * 写：主库（default），并在当前上下文开启 DB_REPLICA_STICKY_SECONDS 秒的读主库粘滞窗口;
+        * 读：请求之外 / 强制读主库 / 粘滞窗口内 / 事务内 读主库，否则选择使用中连接数最少的副本（轮询打破平局）;
+    """
+
+    def __init__(self):
+        self._cycle = itertools.cycle(REPLICA_ALIASES)
+
+    def db_for_read(self, model) -> Optional[str]:
+        if not REPLICA_ALIASES or not _read_replica.get() or time.monotonic() < _sticky_until.get():
+            return None
+        if isinstance(connections.get("default"), BaseTransactionWrapper):
+            # 事务内的读取必须使用同一个事务连接
+            return None
+        best, best_load = None, None
+        for _ in REPLICA_ALIASES:
+            alias = next(self._cycle)
+            pool = connections.get(alias)._pool
+            load = pool.get_size() - pool.get_idle_size() if pool is not None else 0
+            if best is None or load < best_load:
+                best, best_load = alias, load
+        return best
+
+    def db_for_write(self, model) -> Optional[str]:
+        _sticky_until.set(time.monotonic() + settings.DB_REPLICA_STICKY_SECONDS)
+        return None
+
+
+class DBRoutingMiddleware:
+    """
+    读己之写 ASGI 中间件（配置只读副本时注册）：
+        * 非安全方法（POST/PUT/DELETE 等）整个请求读主库，成功后下发粘滞 Cookie;
+        * 携带粘滞 Cookie 或请求头 X-Read-Primary: 1 / true 的请求读主库，其他请求的读取可使用副本;
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        write = scope["method"] not in SAFE_METHODS
+        headers = dict(scope["headers"])
+        primary = write or headers.get(b"x-read-primary", b"").strip().lower() in (b"1", b"true") or \
+            cookie_parser(headers.get(b"cookie", b"").decode("latin-1")).get(STICKY_COOKIE) == "1"
+
+        async def send_wrapper(message):
+            if write and message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = f"{STICKY_COOKIE}=1; Max-Age={int(settings.DB_REPLICA_STICKY_SECONDS)}; Path=/; HttpOnly"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        token = _read_replica.set(not primary)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _read_replica.reset(token)
@@ -0,0 +1,149 @@
+import asyncio
+import datetime
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from tortoise import connections
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+from app.core.utils import SingletonMeta
+
+
+# ========================================
+# 说明: 服务健康检查
+#    * 后台定时探测 Redis、PostgreSQL、Celery，并缓存探测结果
+#    * 存活探针（liveness）常数时间返回，就绪探针（readiness）只读取缓存结果，不再在请求内访问依赖服务
+# ========================================
+
+
+class HealthProber(metaclass=SingletonMeta):
+    """
+    后台健康探测器（单例）：按 interval 周期探测各依赖服务，并缓存每个依赖的状态与延迟;
+    """
+
+    def __init__(self, interval: float = settings.HEALTH_CHECK_INTERVAL,
+                 timeout: float = settings.HEALTH_CHECK_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.checks: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "redis": self._check_redis,
+            "postgres": self._check_postgres,
+            "celery": self._check_celery,
+        }
+        if settings.TEST:
+            # 单测环境下 Celery 任务同步执行（见 run_celery_task），无需探测 Worker
+            self.checks.pop("celery")
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def _check_redis() -> None:
+        """
+        Redis：PING
+        :return:
+        """
+        pong = False
+        async with get_redis_client() as rs:
+            pong = await rs.ping()
+        if not pong:
+            raise RuntimeError("Redis ping failed")
+
+    @staticmethod
+    async def _check_postgres() -> None:
+        """
+        PostgreSQL：SELECT 1（主库及全部只读副本）
+        :return:
+        """
+        for conn in connections.all():
+            await conn.execute_query("SELECT 1")
+
+    async def _check_celery(self) -> int:
+        """
+        Celery：通过 control ping 广播确认至少有一个 Worker 在线并能消费控制消息，不再投递真实任务;
+        control.ping 为阻塞调用，放到线程中执行，避免阻塞事件循环;
+        :return: 在线 Worker 数量
+        """
+        replies = await asyncio.to_thread(self._celery_ping)
+        if not replies:
+            raise RuntimeError("No celery worker replied")
+        return len(replies)
+
+    def _celery_ping(self) -> list:
+        # 延迟导入 Celery App：仅在首次探测时（后台线程中）加载
+        from app.core.celery import app as celery_app
+        return celery_app.control.ping(timeout=self.timeout)
+
+    async def _run_check(self, name: str, check: Callable[[], Awaitable[Any]]) -> None:
+        """
+        执行单个依赖检查，记录状态、延迟及检查时间
+        :param name: 依赖名称
+        :param check: 检查函数
+        :return:
+        """
+        start = time.perf_counter()
+        result = {"status": "ok", "detail": None}
+        try:
+            detail = await asyncio.wait_for(check(), timeout=self.timeout + 1)
+            result["detail"] = detail
+        except Exception as e:
+            LOG.warning(f"Health check failed: {name}, {e!r}")
+            result = {"status": "error", "detail": repr(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["checked_at"] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        result["_monotonic"] = time.monotonic()
+        self.results[name] = result
+
+    async def probe(self) -> None:
+        """
+        并发执行一轮全部依赖检查
+        :return:
+        """
+        await asyncio.gather(*(self._run_check(name, check) for name, check in self.checks.items()))
+
+    async def _run_forever(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """
+        启动后台探测任务（应用 lifespan 启动时调用）
+        :return:
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """
+        停止后台探测任务（应用 lifespan 关闭时调用）
+        :return:
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        就绪状态：所有依赖最近一次检查成功，且结果未过期（超过 3 个探测周期视为过期）
+        :return:
+        """
+        if len(self.results) < len(self.checks):
+            return False
+        now = time.monotonic()
+        return all(r["status"] == "ok" and now - r["_monotonic"] <= self.interval * 3
+                   for r in self.results.values())
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各依赖的缓存检查结果（不包含内部字段）
+        :return:
+        """
+        return {name: {k: v for k, v in r.items() if not k.startswith("_")}
+                for name, r in self.results.items()}
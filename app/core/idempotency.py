@@ -0,0 +1,167 @@
+import asyncio
+import base64
+import hashlib
+import json
+from typing import Dict
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+
+# ========================================
+# 说明: HTTP 幂等请求（请求头 Idempotency-Key）
+#    * 适用于 /api/ 下的 POST / PUT / PATCH 请求，未携带请求头的请求不受影响
+#    * 首次请求：SET NX 写入处理中标记（IDEMPOTENCY_LOCK_TIMEOUT 秒后过期，防止进程异常退出后永久占用），
+#      执行完成后将状态码、响应头及响应体写入 Redis（IDEMPOTENCY_TTL 秒）；
+#      5xx、暂时性错误（408 / 409 / 425 / 429 或带 Retry-After 的响应，如路由限流）或异常时删除标记，允许重试
+#    * 重复请求：直接返回缓存的响应（响应头 Idempotent-Replayed: true），不再访问 PostgreSQL；
+#      首次请求仍在处理中时等待其完成（同进程等待内存 Future，跨进程轮询 Redis），
+#      等待超过 IDEMPOTENCY_WAIT_TIMEOUT 秒返回 409 + Retry-After
+#    * 幂等键按 请求方法 + 路径 + 查询参数 + Idempotency-Key 区分；同一幂等键对应的请求体不一致时返回 422
+#    * Redis 不可用时按普通请求处理（不保证幂等）
+# ========================================
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+METHODS = {"POST", "PUT", "PATCH"}
+KEY = "http:idem:{}"
+MAX_KEY_LENGTH = 255
+# 暂时性错误（请求未被处理，稍后重试可能成功），不缓存
+TRANSIENT_STATUSES = {408, 409, 425, 429}
+
+# Redis 不可用（get_redis_client 记录错误日志后不再向外抛出异常）
+_UNAVAILABLE = object()
+
+
+async def _send_json(send, status_code: int, detail: str, headers: list = ()) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+    await send({"type": "http.response.start", "status": status_code,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, record: dict) -> None:
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    await send({"type": "http.response.start", "status": record["status"],
+                "headers": headers + [(REPLAYED_HEADER, b"true")]})
+    await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
+
+
+class IdempotencyMiddleware:
+    """
+    幂等请求 ASGI 中间件
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # 本进程处理中的幂等键 -> 完成后的响应记录（None 表示未缓存，需重新竞争）
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+        idempotency_key = dict(scope["headers"]).get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key too long (max {MAX_KEY_LENGTH})")
+
+        # 读取完整请求体（计算指纹），再原样交给下游
+        chunks, more_body = [], True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        target = b"%s %s?%s" % (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""))
+        key = KEY.format(hashlib.sha256(b"%s %s" % (target, idempotency_key)).hexdigest())
+        fingerprint = hashlib.sha256(body).hexdigest()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        delay = 0.02
+        while True:
+            record = await self._claim(key, fingerprint)
+            if record is _UNAVAILABLE:
+                LOG.warning(f"Redis unavailable, idempotency disabled for {scope['method']} {scope['path']}")
+                return await self.app(scope, replay_receive, send)
+            if record is None:
+                return await self._execute(key, fingerprint, scope, replay_receive, send)
+            if record["fingerprint"] != fingerprint:
+                return await _send_json(send, 422, "Idempotency-Key reused with a different request body")
+            if record["state"] == "done":
+                return await _replay(send, record)
+            # 首次请求处理中：等待完成
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return await _send_json(send, 409, "A request with the same Idempotency-Key is in progress",
+                                        [(b"retry-after", b"1")])
+            future = self._inflight.get(key)
+            if future is not None:
+                try:
+                    record = await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    continue
+                if record is not None:
+                    return await _replay(send, record)
+                continue
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+    @staticmethod
+    async def _claim(key: str, fingerprint: str):
+        """
+        写入处理中标记
+        :return: None 表示获得执行权；已存在时返回已有记录；Redis 不可用时返回 _UNAVAILABLE
+        """
+        result = _UNAVAILABLE
+        async with get_redis_client() as rs:
+            pending = json.dumps({"state": "pending", "fingerprint": fingerprint})
+            if await rs.set(key, pending, nx=True, ex=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                result = None
+            else:
+                value = await rs.get(key)
+                # 恰好过期或被删除：视为可重新竞争，返回一个处理中记录，由调用方稍后重试
+                result = json.loads(value) if value else {"state": "pending", "fingerprint": fingerprint}
+        return result
+
+    async def _execute(self, key: str, fingerprint: str, scope, receive, send) -> None:
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        status_code, headers, chunks = 500, [], []
+
+        async def send_wrapper(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(name.decode("latin-1"), value.decode("latin-1"))
+                           for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        record = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+            if status_code < 500 and status_code not in TRANSIENT_STATUSES and \
+                    not any(name.lower() == "retry-after" for name, _ in headers):
+                record = {"state": "done", "fingerprint": fingerprint, "status": status_code, "headers": headers,
+                          "body": base64.b64encode(b"".join(chunks)).decode()}
+        finally:
+            async with get_redis_client() as rs:
+                if record is not None:
+                    await rs.set(key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL)
+                else:
+                    await rs.delete(key)
+            self._inflight.pop(key, None)
+            future.set_result(record)
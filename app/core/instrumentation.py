@@ -0,0 +1,142 @@
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from app import settings
+from app.core.logger import LOG, get_logger, request_id
+
+
+# ========================================
+# 说明: 请求级耗时统计
+#    * RequestTimingMiddleware 为每个 HTTP 请求创建统计上下文（ContextVar，请求内派生的子任务共享同一份统计）
+#    * asyncpg 连接（app.core.db.InstrumentedConnection）及 Redis 客户端（app.core.redis）执行命令时累加次数与耗时
+#    * 响应头 Server-Timing 输出 db / redis / app（处理函数自身耗时）/ total，并输出结构化日志
+#    * 超过 SLOW_QUERY_THRESHOLD 毫秒的 SQL 记录慢查询日志（SQL 结构 + 参数个数，不记录参数值）
+#    * 请求 ID：沿用请求头 X-Request-ID 或生成新 ID，附加到请求内产生的日志及响应头 X-Request-ID
+# ========================================
+
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+_SQL_SPACES = re.compile(r"\s+")
+_SQL_PARAM = re.compile(r"\$(\d+)")
+# 请求日志：不参与按调用位置限流，可通过 LOG_SAMPLING="app.access:0.1" 抽样
+ACCESS_LOG = get_logger("app.access")
+
+
+class RequestStats:
+    __slots__ = ("db_count", "db_time", "redis_count", "redis_time")
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.redis_count = 0
+        self.redis_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    """
+    当前请求的统计，非请求上下文（后台任务、Celery Worker 等）返回 None
+    :return:
+    """
+    return _request_stats.get()
+
+
+def sql_shape(query: str, max_length: int = 500) -> str:
+    """
+    SQL 结构：合并空白字符，字面量替换为 ?
+    :param query:
+    :param max_length: 最大长度
+    :return:
+    """
+    shape = _SQL_SPACES.sub(" ", _SQL_LITERAL.sub("?", query)).strip()
+    return shape if len(shape) <= max_length else shape[:max_length] + "..."
+
+
+def record_db(query: str, elapsed: float) -> None:
+    """
+    记录一次 SQL 执行
+    :param query: SQL（参数个数按 $n 占位符计算）
+    :param elapsed: 耗时（秒）
+    :return:
+    """
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_count += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD:
+        args_count = max(map(int, _SQL_PARAM.findall(query)), default=0)
+        LOG.warning(f"Slow query: {elapsed * 1000:.1f}ms, args={args_count}, sql={sql_shape(query)}",
+                    extra={"duration_ms": round(elapsed * 1000, 3), "args_count": args_count})
+
+
+def record_redis(count: int, elapsed: float) -> None:
+    """
+    记录 Redis 命令执行（pipeline 按命令条数计）
+    :param count: 命令条数
+    :param elapsed: 耗时（秒）
+    :return:
+    """
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.redis_count += count
+        stats.redis_time += elapsed
+
+
+class RequestTimingMiddleware:
+    """
+    请求耗时统计 ASGI 中间件：响应头 Server-Timing、X-Request-ID，请求结束后输出结构化日志;
+    Server-Timing 统计截止到响应头发送时刻，日志统计截止到响应结束;
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _server_timing(stats: RequestStats, total: float) -> bytes:
+        app_time = max(total - stats.db_time - stats.redis_time, 0)
+        return (f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_count} queries", '
+                f'redis;dur={stats.redis_time * 1000:.2f};desc="{stats.redis_count} commands", '
+                f'app;dur={app_time * 1000:.2f}, total;dur={total * 1000:.2f}').encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        rid = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        rid_token = request_id.set(rid)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", self._server_timing(stats, time.perf_counter() - start)),
+                    (b"x-request-id", rid.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            if settings.REQUEST_TIMING_LOG:
+                total = time.perf_counter() - start
+                fields = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "total_ms": round(total * 1000, 3),
+                    "app_ms": round(max(total - stats.db_time - stats.redis_time, 0) * 1000, 3),
+                    "db_count": stats.db_count,
+                    "db_ms": round(stats.db_time * 1000, 3),
+                    "redis_count": stats.redis_count,
+                    "redis_ms": round(stats.redis_time * 1000, 3),
+                }
+                ACCESS_LOG.info(" ".join(f"{name}={value}" for name, value in fields.items()), extra=fields)
+            request_id.reset(rid_token)
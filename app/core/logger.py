@@ -1,19 +1,197 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
 
 from app import settings
 
 # ========================================
 # 说明: 日志关联配置
+#    * 业务代码只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）格式化并写入 stdout，
+#      stdout 阻塞（如容器日志驱动背压）时不会阻塞事件循环；队列满时丢弃并计数
+#    * 输出格式：LOG_FORMAT=json（结构化，包含 extra 字段）或 text
+#    * 限流：同一调用位置（文件 + 行号）每秒最多输出 LOG_RATE_LIMIT 条，超出部分丢弃，恢复后输出被抑制的条数；
+#      请求日志（app.access）不限流
+#    * 抽样：LOG_SAMPLING 按 logger 名称前缀配置 WARNING 以下日志的保留比例，如 "app.core.redis:0.1,app.api:0.5"
+#    * 请求关联：request_id（见 app.core.instrumentation.RequestTimingMiddleware）自动附加到请求内产生的日志
 # ========================================
 
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord 标准属性，其余属性视为 extra 字段输出
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    JSON 格式：每条日志一行
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        if record.lineno:
+            data.update(module=record.module, func=record.funcName, line=record.lineno)
+        if getattr(record, "request_id", None):
+            data["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    在产生日志的线程/协程中附加 request_id（后台线程无法读取 ContextVar）
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按调用位置限流 + 按 logger 名称抽样（ERROR 及以上不限流，WARNING 及以上不抽样）
+    """
+
+    def __init__(self, rate: float, sampling: Dict[str, float], exempt: Tuple[str, ...] = ("app.access",)):
+        super().__init__()
+        self.rate = rate
+        self.exempt = exempt
+        # 最长前缀优先匹配
+        self.sampling = sorted(sampling.items(), key=lambda item: len(item[0]), reverse=True)
+        # 调用位置 -> [当前窗口（秒）, 窗口内条数, 被抑制条数]
+        self._windows: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def _sample_rate(self, name: str) -> float:
+        for prefix, rate in self.sampling:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sampling and random.random() >= self._sample_rate(record.name):
+            return False
+        if not self.rate or record.levelno >= logging.ERROR or record.name in self.exempt:
+            return True
+        key = (record.name, record.pathname, record.lineno) if record.lineno else (record.name, record.msg)
+        now = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != now:
+                suppressed = window[2] if window else 0
+                self._windows[key] = window = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            window[1] += 1
+            if window[1] > self.rate:
+                window[2] += 1
+                return False
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    非阻塞入队：队列满时丢弃并计数；保留异常堆栈文本及 extra 字段，由后台线程格式化
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            AsyncQueueHandler.dropped += 1
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    具名 logger（日志经由根 logger 的队列输出），用于按模块抽样高频日志，一般传入 __name__
+    :param name:
+    :return:
+    """
+    return logging.getLogger(name)
+
+
+def _parse_sampling(value: str) -> Dict[str, float]:
+    sampling = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.rpartition(":")
+        sampling[name] = float(rate)
+    return sampling
+
+
+def _build_stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(process)d - %(module)s - %(funcName)s - line:%(lineno)d - %(levelname)s - "
+            "[%(request_id)s] %(message)s"))
+    return handler
+
+
+def _start_listener() -> QueueListener:
+    queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=False)
+    listener.start()
+    return listener
+
+
+def _restart_listener_in_child() -> None:
+    # fork（如 Celery prefork）后子进程没有父进程的后台线程，重新创建队列及写入线程
+    global _listener
+    _listener = _start_listener()
+
+
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
-ch = logging.StreamHandler()
-formatter = logging.Formatter(
-    "%(asctime)s - %(process)d - %(module)s - %(funcName)s - line:%(lineno)d - %(levelname)s - %(message)s"
-)
 
-ch.setFormatter(formatter)
-logger.addHandler(ch)
+stream_handler = _build_stream_handler()
+queue_handler = AsyncQueueHandler(queue.Queue())
+queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, _parse_sampling(settings.LOG_SAMPLING)))
+queue_handler.addFilter(ContextFilter())
+logger.addHandler(queue_handler)
+
+
+def flush_logs() -> None:
+    """
+    停止后台写入线程，写完队列中剩余日志（进程退出前调用；multiprocessing fork 的子进程以 os._exit 退出，不执行 atexit）
+    :return:
+    """
+    _listener.stop()
+
+
+_listener = _start_listener()
+# 进程退出前写完队列中剩余日志
+atexit.register(flush_logs)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
 
 LOG = logger
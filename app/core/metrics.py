@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Union
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from starlette.requests import Request
+from starlette.responses import Response
+from tortoise import connections
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import _pools
+
+
+# ========================================
+# 说明: Prometheus 指标
+#    * HTTP：按路由模板统计请求耗时直方图、处理中请求数
+#    * 连接池：PostgreSQL / Redis 连接池连接数（后台按 METRICS_REFRESH_INTERVAL 周期刷新）
+#    * WebSocket：各管理类的连接数、频道数，Pub/Sub 收发消息数
+#    * 变更推送：PostgreSQL LISTEN/NOTIFY 收到的变更事件数、推送的 WebSocket 消息数
+#    * Celery：任务投递次数
+#    * 并发限制：各路由分组的自适应并发上限、被拒绝/取消的请求数
+#    * 限流：各规则的检查次数（进程内预过滤放行 / Redis 放行 / 拒绝 / Redis 不可用）
+#    * 进程内存：各 Worker 的 rss / pss / uss（与连接池指标同周期刷新，fork 前预加载应用时 uss 反映写时复制后的独占内存）
+#    * 多进程（python -m app.server / uvicorn --workers N）：设置环境变量 PROMETHEUS_MULTIPROC_DIR（空目录，启动前清空），
+#      各 Worker 写入共享目录，/metrics 汇总所有 Worker 的指标
+# ========================================
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（秒）", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "处理中的 HTTP 请求数", multiprocess_mode="livesum")
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "PostgreSQL 连接池连接数", ["database", "state"], multiprocess_mode="livesum")
+REDIS_POOL_CONNECTIONS = Gauge(
+    "redis_pool_connections", "Redis 连接池连接数", ["state"], multiprocess_mode="livesum")
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections", "WebSocket 连接数", ["manager"], multiprocess_mode="livesum")
+WEBSOCKET_CHANNELS = Gauge(
+    "websocket_channels", "WebSocket 频道数", ["manager"], multiprocess_mode="livesum")
+PUBSUB_MESSAGES = Counter(
+    "websocket_pubsub_messages", "WebSocket Redis Pub/Sub 消息数", ["manager", "direction"])
+CHANGE_FEED_EVENTS = Counter(
+    "change_feed_events", "收到的数据变更通知数（LISTEN/NOTIFY）", ["table", "op"])
+CHANGE_FEED_MESSAGES = Counter(
+    "change_feed_messages", "变更推送的 WebSocket 消息数", ["manager"])
+CELERY_TASKS_DISPATCHED = Counter(
+    "celery_tasks_dispatched", "Celery 任务投递次数", ["task"])
+CONCURRENCY_LIMIT = Gauge(
+    "http_concurrency_limit", "路由分组自适应并发上限", ["group"], multiprocess_mode="livesum")
+CONCURRENCY_REJECTED = Counter(
+    "http_concurrency_rejected", "过载保护拒绝/取消的请求数", ["group", "reason"])
+RATE_LIMIT_CHECKS = Counter(
+    "rate_limit_checks", "限流检查次数", ["limit", "result"])
+PROCESS_MEMORY = Gauge(
+    "process_memory_bytes", "进程内存（字节）", ["type"], multiprocess_mode="liveall")
+
+
+class MetricsMiddleware:
+    """
+    HTTP 指标 ASGI 中间件：路由模板取自 FastAPI 匹配的路由（scope["route"]），未匹配的请求统一记为 <unmatched>
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # 缓存各标签组合的子指标，避免每个请求执行 labels() 查找
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            key = (scope["method"], route.path if route is not None else "<unmatched>", status_code)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = HTTP_REQUEST_DURATION.labels(key[0], key[1], str(key[2]))
+            child.observe(elapsed)
+
+
+def refresh_pool_gauges() -> None:
+    """
+    刷新当前进程的 PostgreSQL / Redis 连接池指标
+    :return:
+    """
+    for conn in connections.all():
+        pool = getattr(conn, "_pool", None)
+        if pool is None:
+            continue
+        size, idle = pool.get_size(), pool.get_idle_size()
+        DB_POOL_CONNECTIONS.labels(conn.connection_name, "idle").set(idle)
+        DB_POOL_CONNECTIONS.labels(conn.connection_name, "in_use").set(size - idle)
+    redis_pools = list(_pools.values())
+    REDIS_POOL_CONNECTIONS.labels("idle").set(sum(len(p._available_connections) for p in redis_pools))
+    REDIS_POOL_CONNECTIONS.labels("in_use").set(sum(len(p._in_use_connections) for p in redis_pools))
+
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """
+    进程内存（字节，读取 /proc/<pid>/smaps_rollup，非 Linux 返回空字典）
+    rss：常驻内存，包含与主进程共享的页面；pss：共享页面按共享进程数分摊；uss：独占内存（含写时复制的页面）
+    :param pid: 进程号，默认当前进程
+    :return:
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.endswith("kB\n"):
+                    fields[key] = int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0),
+            "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+
+def refresh_process_gauges() -> None:
+    """
+    刷新当前进程的内存指标
+    :return:
+    """
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.labels(kind).set(value)
+
+
+async def run_pool_gauge_refresher(interval: float = settings.METRICS_REFRESH_INTERVAL) -> None:
+    """
+    周期刷新连接池及进程内存指标（应用 lifespan 中以后台任务运行，多进程模式下每个 Worker 各自刷新）
+    :param interval: 刷新周期（秒）
+    :return:
+    """
+    while True:
+        try:
+            refresh_pool_gauges()
+            refresh_process_gauges()
+        except Exception as e:
+            LOG.error(f"Failed to refresh pool metrics: {e!r}")
+        await asyncio.sleep(interval)
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    多进程模式：Worker 退出时清理该进程的 live* 指标（应用 lifespan 关闭时调用；Worker 异常退出时由主进程调用）
+    :param pid: 进程号，默认当前进程
+    :return:
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def metrics(request: Request) -> Response:
+    """
+    Prometheus 指标（同步函数，在线程池中读取多进程指标文件，不阻塞事件循环）
+    :param request:
+    :return:
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app import settings
+from app.core.logger import LOG
+from app.core.utils import SingletonMeta
+
+# ========================================
+# 说明: 密码哈希（scrypt，标准库 hashlib，无额外依赖）
+#    * 格式：scrypt$<n>$<r>$<p>$<salt>$<hash>，工作因子（PASSWORD_SCRYPT_N / R / P）随哈希值保存，调整参数后旧哈希仍可校验
+#    * 哈希/校验为 CPU 密集型操作，在有界进程池（PASSWORD_HASH_WORKERS，随应用 lifespan 启动/关闭）中执行，不阻塞事件循环
+#    * 背压：执行中及排队的任务最多 PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE 个，超出时等待空位，
+#      等待超过 PASSWORD_HASH_TIMEOUT 秒抛出 PasswordHasherBusy（503 + Retry-After）
+#    * 校验通过且工作因子与当前配置不一致（或历史明文密码）时返回新哈希，由调用方透明更新（rehash-on-verify）
+#    * 进程池未启动（Celery Worker、脚本等）时在线程中执行
+# ========================================
+
+ALGORITHM = "scrypt"
+SALT_SIZE = 16
+HASH_SIZE = 32
+
+
+class PasswordHasherBusy(Exception):
+    """
+    密码哈希进程池繁忙（排队超时）
+    """
+
+    def __init__(self, retry_after: int = 1):
+        self.retry_after = retry_after
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem 需大于 128 * n * r（OpenSSL 默认上限 32MB）
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=HASH_SIZE,
+                          maxmem=256 * n * r + 1024 * 1024)
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_password(password: str, n: int = settings.PASSWORD_SCRYPT_N, r: int = settings.PASSWORD_SCRYPT_R,
+                  p: int = settings.PASSWORD_SCRYPT_P, salt: Optional[bytes] = None) -> str:
+    """
+    计算密码哈希（同步，CPU 密集型）
+    :param password: 明文密码
+    :param n: CPU/内存开销因子（2 的幂）
+    :param r: 块大小
+    :param p: 并行度
+    :param salt: 盐，默认随机生成
+    :return: scrypt$<n>$<r>$<p>$<salt>$<hash>
+    """
+    salt = salt or os.urandom(SALT_SIZE)
+    return f"{ALGORITHM}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def needs_rehash(encoded: str) -> bool:
+    """
+    哈希值的算法或工作因子与当前配置不一致
+    :param encoded:
+    :return:
+    """
+    return not encoded.startswith(
+        f"{ALGORITHM}${settings.PASSWORD_SCRYPT_N}${settings.PASSWORD_SCRYPT_R}${settings.PASSWORD_SCRYPT_P}$")
+
+
+def verify_password(password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+    """
+    校验密码（同步，CPU 密集型）
+    :param password: 明文密码
+    :param encoded: 已保存的哈希值
+    :return: (是否一致, 需要更新时的新哈希值)
+    """
+    parts = encoded.split("$")
+    if parts[0] == ALGORITHM and len(parts) == 6:
+        n, r, p = map(int, parts[1:4])
+        ok = hmac.compare_digest(_scrypt(password, _unb64(parts[4]), n, r, p), _unb64(parts[5]))
+    else:
+        # 兼容历史明文密码：校验通过后更新为哈希值
+        ok = hmac.compare_digest(password.encode(), encoded.encode())
+    return ok, hash_password(password) if ok and needs_rehash(encoded) else None
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+class PasswordHasher(metaclass=SingletonMeta):
+    """
+    进程池密码哈希服务（单例）
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS,
+                 queue_size: int = settings.PASSWORD_HASH_QUEUE_SIZE,
+                 timeout: float = settings.PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(workers + queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn：子进程不继承父进程的事件循环、后台线程及连接
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self) -> None:
+        """
+        启动进程池并预热全部子进程
+        :return:
+        """
+        if self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers)))
+        LOG.info(f"Password hasher started: workers={self.workers}, pids={sorted(set(pids))}")
+
+    async def stop(self) -> None:
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    async def _run(self, func, *args):
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._slots.acquire()
+        except TimeoutError:
+            raise PasswordHasherBusy(retry_after=max(1, round(self.timeout)))
+        try:
+            executor = self._executor
+            if executor is None:
+                return await asyncio.to_thread(func, *args)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # 子进程异常退出（如 OOM），重建进程池后重试一次；并发请求同时失败时只由首个请求重建
+                if self._executor is executor:
+                    LOG.error("Password hasher pool broken, recreating")
+                    self._executor = self._create_executor()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                if self._executor is None:
+                    return await asyncio.to_thread(func, *args)
+                return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        计算密码哈希
+        :param password:
+        :return:
+        """
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        """
+        校验密码
+        :param password:
+        :param encoded:
+        :return: (是否一致, 需要更新时的新哈希值)
+        """
+        return await self._run(verify_password, password, encoded)
@@ -0,0 +1,244 @@
+import asyncio
+import collections
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from typing import Counter, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+
+from app import settings
+from app.core.logger import LOG
+
+
+# ========================================
+# 说明: 采样分析器（按需开启，PROFILER_ENABLED=false 时不注册中间件及接口，无任何额外开销）
+#    * 后台线程按 PROFILER_INTERVAL 周期采样事件循环线程的调用栈（sys._current_frames），不修改被测代码
+#    * 单个请求：请求头 X-Profile-Token 与 PROFILER_TOKEN 一致，或按 PROFILER_SAMPLE_RATE 随机抽样；
+#      仅统计事件循环正在执行该请求所在协程任务时的样本，结果保存到 PROFILER_OUTPUT_DIR，响应头 X-Profile 返回文件名
+#    * 时间窗口：POST /debug/profile?seconds=10 采样当前 Worker 一段时间内的全部调用栈，直接返回结果
+#    * 输出格式：collapsed（flamegraph.pl / speedscope 均可直接打开）或 speedscope JSON
+# ========================================
+
+TOKEN_HEADER = "x-profile-token"
+FORMAT_HEADER = "x-profile-format"
+FORMATS = {"collapsed": ".collapsed.txt", "speedscope": ".speedscope.json"}
+
+Frame = Tuple[str, str, int]
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+class SamplingProfiler:
+    """
+    统计采样分析器：在独立线程中周期采样目标线程的调用栈;
+    指定 task 时仅统计目标线程事件循环当前正在执行该任务时的样本;
+    """
+
+    def __init__(self, interval: float = settings.PROFILER_INTERVAL, thread_id: Optional[int] = None,
+                 task: Optional[asyncio.Task] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.task = task
+        self.loop = task.get_loop() if task is not None else None
+        self.stacks: Counter[Tuple[Frame, ...]] = collections.Counter()
+        self.duration = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        if self.task is not None and asyncio.tasks._current_tasks.get(self.loop) is not self.task:
+            return
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(_frame_key(frame))
+            frame = frame.f_back
+        if stack:
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def to_collapsed(self) -> str:
+        """
+        collapsed stacks：每行 "frame;frame;frame 样本数"
+        :return:
+        """
+        lines = []
+        for stack, count in self.stacks.items():
+            names = (f"{name} ({_short_path(filename)}:{line})".replace(";", ":") for name, filename, line in stack)
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name: str) -> dict:
+        """
+        speedscope 文件格式（sampled profile），权重单位为秒
+        :param name: profile 名称
+        :return:
+        """
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.PROJECT_NAME,
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": name, "unit": "seconds", "startValue": 0,
+                          "endValue": sum(weights), "samples": samples, "weights": weights}],
+        }
+
+    def dump(self, name: str, fmt: str) -> str:
+        return json.dumps(self.to_speedscope(name)) if fmt == "speedscope" else self.to_collapsed()
+
+
+def _short_path(filename: str) -> str:
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+def _profile_filename(name: str, fmt: str) -> str:
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{secrets.token_hex(3)}-" \
+           f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)[:80]}{FORMATS[fmt]}"
+
+
+def _save(profiler: SamplingProfiler, filename: str, name: str, fmt: str) -> None:
+    """
+    保存到 PROFILER_OUTPUT_DIR
+    :return:
+    """
+    os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILER_OUTPUT_DIR, filename), "w", encoding="utf-8") as f:
+        f.write(profiler.dump(name, fmt))
+
+
+def _authorized(token: Optional[str]) -> bool:
+    return bool(settings.PROFILER_TOKEN) and token is not None and \
+        secrets.compare_digest(token.encode(), settings.PROFILER_TOKEN.encode())
+
+
+def _check_token(request: Request) -> None:
+    if not _authorized(request.headers.get(TOKEN_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profile token")
+
+
+class ProfilerMiddleware:
+    """
+    单请求采样 ASGI 中间件（仅 PROFILER_ENABLED=true 时注册）
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        token = headers.get(TOKEN_HEADER.encode())
+        if scope["path"].startswith("/debug/profile") or not (
+                _authorized(token.decode() if token else None) or random.random() < settings.PROFILER_SAMPLE_RATE):
+            return await self.app(scope, receive, send)
+        fmt = headers.get(FORMAT_HEADER.encode(), b"collapsed").decode()
+        fmt = fmt if fmt in FORMATS else "collapsed"
+        name = f"{scope['method']} {scope['path']}"
+        filename = _profile_filename(name, fmt)
+        profiler = SamplingProfiler(task=asyncio.current_task()).start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile", filename.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            await asyncio.to_thread(_save, profiler, filename, name, fmt)
+            LOG.info(f"Request profiled: {name}, samples={sum(profiler.stacks.values())}, file={filename}")
+
+
+# TODO：================= 接口（需携带请求头 X-Profile-Token） =======================#
+
+async def profile_window(request: Request, seconds: float = 10, fmt: str = "collapsed"):
+    """
+    采样当前 Worker 事件循环线程 seconds 秒（最长 60 秒），返回并保存结果
+    :param request:
+    :param seconds: 采样时长（秒）
+    :param fmt: collapsed / speedscope
+    :return:
+    """
+    _check_token(request)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported format: {fmt}")
+    name = f"worker-{os.getpid()}-{seconds:g}s"
+    filename = _profile_filename(name, fmt)
+    profiler = SamplingProfiler().start()
+    try:
+        await asyncio.sleep(min(max(seconds, 0), 60))
+    finally:
+        profiler.stop()
+    await asyncio.to_thread(_save, profiler, filename, name, fmt)
+    headers = {"X-Profile": filename}
+    if fmt == "speedscope":
+        return JSONResponse(profiler.to_speedscope(name), headers=headers)
+    return PlainTextResponse(profiler.to_collapsed(), headers=headers)
+
+
+async def list_profiles(request: Request):
+    """
+    已保存的采样结果（按时间倒序）
+    :param request:
+    :return:
+    """
+    _check_token(request)
+    if not os.path.isdir(settings.PROFILER_OUTPUT_DIR):
+        return []
+    return sorted(os.listdir(settings.PROFILER_OUTPUT_DIR), reverse=True)
+
+
+async def get_profile(request: Request, filename: str):
+    """
+    下载已保存的采样结果
+    :param request:
+    :param filename: 文件名（响应头 X-Profile）
+    :return:
+    """
+    _check_token(request)
+    path = os.path.join(settings.PROFILER_OUTPUT_DIR, os.path.basename(filename))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path))
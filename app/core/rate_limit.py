@@ -0,0 +1,232 @@
+import hashlib
+import json
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from redis.exceptions import NoScriptError
+from starlette.requests import HTTPConnection
+
+from app import settings
+from app.core.metrics import RATE_LIMIT_CHECKS
+from app.core.redis import get_redis_client
+
+# ========================================
+# 说明: 分布式限流（Redis 令牌桶，所有 Worker 共享）
+#    * 规则格式 "次数/周期"，周期为 second / minute / hour / day 或秒数（如 "20/minute"、"5/10"）：
+#      桶容量为次数（允许的突发），令牌按 次数 / 周期 的速率补充
+#    * 每次检查执行一次 Lua 脚本（EVALSHA，脚本未缓存时回退 EVAL）：按 Redis 服务器时间补充令牌并扣减，
+#      返回是否放行、剩余令牌数及需等待的秒数；各 Worker 时钟不一致不影响计数，键在桶补满所需的时间后过期
+#    * 进程内预过滤：上次检查时全局剩余令牌超过容量一半的调用方，1 秒内本进程累计不超过 容量 × RATE_LIMIT_LOCAL_FRACTION 个令牌的请求
+#      直接放行、不访问 Redis，记为欠账，在该调用方下一次访问 Redis 时一并扣减；
+#      最坏情况下全局多放行 Worker 数 × 容量 × RATE_LIMIT_LOCAL_FRACTION 次，设为 0 关闭预过滤
+#    * 使用方式：路由依赖 Depends(RateLimit(...)) 按 IP / 用户 / 路由限流；
+#      RateLimitMiddleware 按 IP 限制 /api/ 下的所有请求（RATE_LIMIT_DEFAULT）
+#    * WebSocket 入站消息：每个连接一个进程内令牌桶（连接只存在于一个 Worker，无需 Redis），见 app.core.websockets
+#    * 超出限制返回 429 + Retry-After；Redis 不可用时放行（不限流）
+# ========================================
+
+# KEYS[1] 令牌桶；ARGV[1] 容量，ARGV[2] 每秒补充令牌数，ARGV[3] 本次消耗，ARGV[4] 进程内预过滤放行的欠账（只扣减，不影响本次是否放行）
+# 返回 {是否放行, 剩余令牌数, 需等待秒数}，小数以字符串返回（Lua 数字转换为 Redis 整数时截断）
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+tokens = math.max(0, tokens - tonumber(ARGV[4]))
+local allowed, wait = 0, 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens), tostring(wait)}
+"""
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_LUA.encode()).hexdigest()
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+# 预过滤：全局剩余令牌数的有效期（秒），本进程最多记录的调用方数（超出时淘汰最早记录的调用方，其未扣减的欠账随之丢弃）
+LOCAL_TTL = 1.0
+MAX_LOCAL_KEYS = 10000
+
+
+def parse_rate(spec: str) -> Tuple[int, float]:
+    """
+    解析限流规则
+    :param spec: "次数/周期"，如 "20/minute"、"5/10"
+    :return: (桶容量, 每秒补充令牌数)
+    """
+    count, _, period = spec.partition("/")
+    seconds = PERIODS.get(period.strip()) or float(period)
+    if int(count) <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {spec}")
+    return int(count), int(count) / seconds
+
+
+class TokenBucket:
+    """
+    进程内令牌桶（单事件循环内使用，无需加锁），用于 WebSocket 连接的入站消息
+    """
+
+    def __init__(self, spec: str):
+        self.capacity, self.rate = parse_rate(spec)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def consume(self, cost: int = 1) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class RateLimiter:
+    """
+    Redis 令牌桶限流器（带进程内预过滤），每条规则一个实例
+    """
+
+    def __init__(self, name: str, spec: str, local_fraction: float = settings.RATE_LIMIT_LOCAL_FRACTION):
+        self.name = name
+        self.capacity, self.rate = parse_rate(spec)
+        self.local_budget = self.capacity * local_fraction
+        # 调用方 -> [上次检查时的全局剩余令牌数, 预过滤放行的欠账, 上次检查时间]
+        self._local: Dict[str, List[float]] = {}
+        self._checks = {result: RATE_LIMIT_CHECKS.labels(name, result)
+                        for result in ("local", "allowed", "rejected", "error")}
+
+    async def _eval(self, identity: str, cost: int, debt: float) -> Optional[list]:
+        key = f"ratelimit:{self.name}:{identity}"
+        args = (self.capacity, self.rate, cost, debt)
+        async with get_redis_client() as rs:
+            try:
+                return await rs.evalsha(TOKEN_BUCKET_SHA, 1, key, *args)
+            except NoScriptError:
+                return await rs.eval(TOKEN_BUCKET_LUA, 1, key, *args)
+        return None
+
+    async def hit(self, identity: str, cost: int = 1) -> Tuple[bool, float]:
+        """
+        检查并消耗令牌
+        :param identity: 调用方（IP、用户 ID、路由等）
+        :param cost: 消耗令牌数
+        :return: (是否放行, 需等待的秒数)
+        """
+        now = time.monotonic()
+        entry = self._local.get(identity)
+        if (entry is not None and now - entry[2] < LOCAL_TTL and entry[1] + cost <= self.local_budget
+                and entry[0] - entry[1] - cost >= self.capacity / 2):
+            entry[1] += cost
+            self._checks["local"].inc()
+            return True, 0
+        debt = entry[1] if entry is not None else 0
+        result = await self._eval(identity, cost, debt)
+        if result is None:
+            self._checks["error"].inc()
+            return True, 0
+        allowed, remaining, wait = bool(int(result[0])), float(result[1]), float(result[2])
+        if self.local_budget:
+            # 等待 Redis 期间其他请求可能已记入新的欠账，只减去本次扣减的部分
+            entry = self._local.get(identity)
+            if entry is None:
+                if len(self._local) >= MAX_LOCAL_KEYS:
+                    self._local.pop(next(iter(self._local)))
+                self._local[identity] = [remaining, 0, now]
+            else:
+                entry[0], entry[1], entry[2] = remaining, max(entry[1] - debt, 0), now
+        self._checks["allowed" if allowed else "rejected"].inc()
+        return allowed, wait
+
+
+def client_ip(conn: HTTPConnection) -> str:
+    """
+    客户端 IP（反向代理后的真实地址由 uvicorn 按 X-Forwarded-For 解析，需配置 --forwarded-allow-ips）
+    :param conn: Request / WebSocket
+    :return:
+    """
+    return conn.client.host if conn.client else "unknown"
+
+
+def by_user(conn: HTTPConnection) -> str:
+    """
+    按用户限流：路径参数 user_id（示例项目无登录态），缺省时按 IP
+    :param conn:
+    :return:
+    """
+    user_id = conn.path_params.get("user_id")
+    return f"user:{user_id}" if user_id is not None else client_ip(conn)
+
+
+def by_route(conn: HTTPConnection) -> str:
+    """
+    按路由限流：同一路由的所有调用方共享一个令牌桶
+    :param conn:
+    :return:
+    """
+    route = conn.scope.get("route")
+    return getattr(route, "path", conn.url.path)
+
+
+def _retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+class RateLimit:
+    """
+    限流路由依赖，超出限制返回 429 + Retry-After
+    用法：@router.post("/", dependencies=[Depends(RateLimit("create_user", "20/minute"))])
+    """
+
+    def __init__(self, name: str, spec: str, key: Callable[[HTTPConnection], str] = client_ip, cost: int = 1):
+        """
+        :param name: 规则名称（Redis 键前缀及指标标签）
+        :param spec: "次数/周期"
+        :param key: 调用方标识：client_ip（默认）/ by_user / by_route 或自定义函数
+        :param cost: 每个请求消耗的令牌数
+        """
+        self.limiter = RateLimiter(name, spec)
+        self.key = key
+        self.cost = cost
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        allowed, wait = await self.limiter.hit(self.key(request), self.cost)
+        if not allowed:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests",
+                                headers={"Retry-After": _retry_after(wait)})
+
+
+class RateLimitMiddleware:
+    """
+    按客户端 IP 限制 /api/ 下所有 HTTP 请求的 ASGI 中间件（RATE_LIMIT_ENABLED=true 且 RATE_LIMIT_DEFAULT 非空时注册）
+    """
+
+    def __init__(self, app, spec: str = settings.RATE_LIMIT_DEFAULT):
+        self.app = app
+        self.limiter = RateLimiter("default", spec)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+        client = scope.get("client")
+        allowed, wait = await self.limiter.hit(client[0] if client else "unknown")
+        if allowed:
+            return await self.app(scope, receive, send)
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({"type": "http.response.start", "status": status.HTTP_429_TOO_MANY_REQUESTS,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"retry-after", _retry_after(wait).encode())]})
+        await send({"type": "http.response.body", "body": body})
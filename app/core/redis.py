@@ -1,40 +1,89 @@
 import asyncio
 import contextlib
 import time
+import weakref
 
 import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
 
 from app import settings
-from app.core.logger import LOG
+from app.core.instrumentation import record_redis
+from app.core.logger import get_logger
 
 
 # ========================================
 # 说明: Redis 通用工具方法
-#    * Redis Client 接口
+#    * Redis Client 接口（命令次数及耗时计入当前请求统计，见 app.core.instrumentation）
 #    * Redis 锁
 # ========================================
 
+# 具名 logger：高频日志（如锁重试）可通过 LOG_SAMPLING="app.core.redis:0.1" 抽样
+LOG = get_logger(__name__)
 
-@contextlib.asynccontextmanager
-async def get_redis_client() -> aioredis.Redis:
+
+class InstrumentedPipeline(Pipeline):
+
+    async def execute(self, raise_on_error: bool = True):
+        count, start = len(self.command_stack), time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            record_redis(count, time.perf_counter() - start)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """
+    统计命令次数及耗时的 Redis 客户端
     """
-    基于异步上下文管理器获取和关闭 Redis 客户端
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record_redis(1, time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# 每个事件循环一个连接池：连接绑定创建它的事件循环，不能跨循环复用；循环被回收后连接池随之释放
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.ConnectionPool]" = weakref.WeakKeyDictionary()
+
+
+def get_redis_pool() -> aioredis.ConnectionPool:
+    """
+    获取当前事件循环对应的 Redis 连接池，不存在则创建
     :return:
     """
-    rs = None
-    try:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
         # 异步 Redis 连接池，并设置 decode_responses=True：自动解码 Redis 响应为字符串（默认为字节）
         # max_connections=5000：连接池允许的最大连接数
         pool = aioredis.ConnectionPool.from_url(settings.BASE_REDIS,
                                                 max_connections=5000,
                                                 decode_responses=True)
-        rs = aioredis.Redis(connection_pool=pool)
+        _pools[loop] = pool
+    return pool
+
+
+@contextlib.asynccontextmanager
+async def get_redis_client() -> aioredis.Redis:
+    """
+    基于异步上下文管理器获取和关闭 Redis 客户端，客户端共享当前事件循环的连接池
+    :return:
+    """
+    rs = None
+    try:
+        rs = InstrumentedRedis(connection_pool=get_redis_pool())
         yield rs
     except aioredis.RedisError as e:
         LOG.error(f"Failed to connect to Redis: {e}")
     finally:
         if rs:
-            await rs.close()
+            # 连接池由外部传入，aclose 不会关闭共享连接池
+            await rs.aclose()
 
 
 async def acquire_lock(lock_key: str, timeout: int = 10) -> bool:
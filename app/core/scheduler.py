@@ -0,0 +1,225 @@
+import asyncio
+import collections
+import os
+import socket
+import statistics
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+from app.core.utils import SingletonMeta, run_celery_task
+
+if TYPE_CHECKING:
+    from celery.schedules import crontab
+
+
+# ========================================
+# 说明: 进程内分布式定时调度
+#    * 轻量定时任务直接在 FastAPI Worker 的事件循环中执行，不再经过 beat -> Broker -> Celery Worker
+#    * 所有 Worker / 主机通过 Redis 租约选举唯一 Leader，只有 Leader 触发任务；Leader 退出后租约过期，其他实例接管
+#    * 重量级任务（celery 任务）仍可由 Leader 投递到 Celery
+#    * 记录每次触发的延迟（实际触发时间 - 计划时间），用于观察调度抖动
+# ========================================
+
+# 仅当租约仍属于自己时续期
+RENEW_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+else
+    return 0
+end
+"""
+
+# 仅当租约仍属于自己时释放
+RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+"""
+
+
+class ScheduledJob:
+    """
+    定时任务：interval（秒）或 cron（celery.schedules.crontab）二选一；
+    func 为协程函数（事件循环中执行）或 Celery 任务（投递到 Celery 执行）；
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: Optional[float] = None,
+                 cron: Optional["crontab"] = None):
+        if (interval is None) == (cron is None):
+            raise ValueError("Exactly one of interval or cron is required")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = cron
+        self.running: Optional[asyncio.Task] = None
+        # 最近 1000 次触发延迟（毫秒）
+        self.lateness: Deque[float] = collections.deque(maxlen=1000)
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+
+    @property
+    def is_celery_task(self) -> bool:
+        return hasattr(self.func, "apply_async")
+
+    def next_delay(self) -> float:
+        """
+        距离下一次触发的秒数
+        :return:
+        """
+        if self.interval is not None:
+            return self.interval
+        return max(self.cron.remaining_estimate(self.cron.now()).total_seconds(), 0)
+
+    def report(self) -> Dict[str, Any]:
+        lateness = sorted(self.lateness)
+        return {
+            "interval": self.interval,
+            "cron": str(self.cron) if self.cron else None,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "lateness_ms": {
+                "mean": round(statistics.fmean(lateness), 3),
+                "p50": round(lateness[len(lateness) // 2], 3),
+                "p99": round(lateness[min(int(len(lateness) * 0.99), len(lateness) - 1)], 3),
+                "max": round(lateness[-1], 3),
+                "jitter": round(statistics.pstdev(lateness), 3),
+            } if lateness else None,
+        }
+
+
+class Scheduler(metaclass=SingletonMeta):
+    """
+    进程内调度器（单例），在应用 lifespan 中启动/停止
+    """
+
+    def __init__(self, lease: float = settings.SCHEDULER_LEASE, elect: bool = True):
+        self.lease = lease
+        self.elect = elect
+        self.lease_key = "scheduler:leader"
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = not elect
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def job(self, interval: Optional[float] = None, cron: Optional["crontab"] = None, name: Optional[str] = None):
+        """
+        注册定时任务装饰器：
+
+            @scheduler.job(interval=5)
+            async def example_job():
+                ...
+
+        :param interval: 间隔（秒）
+        :param cron: crontab 表达式
+        :param name: 任务名称，默认为函数名
+        :return:
+        """
+
+        def decorator(func):
+            job_name = name or getattr(func, "name", None) or func.__name__
+            self.jobs[job_name] = ScheduledJob(job_name, func, interval=interval, cron=cron)
+            return func
+
+        return decorator
+
+    async def _elect(self) -> None:
+        """
+        租约选举：非 Leader 尝试 SET NX PX 抢占，Leader 按 lease/3 周期续期，续期失败即失去 Leader 身份
+        :return:
+        """
+        lease_ms = int(self.lease * 1000)
+        while True:
+            leader = False
+            try:
+                async with get_redis_client() as rs:
+                    if self.is_leader:
+                        leader = bool(await rs.eval(RENEW_LUA, 1, self.lease_key, self.instance_id, lease_ms))
+                    else:
+                        leader = bool(await rs.set(self.lease_key, self.instance_id, px=lease_ms, nx=True))
+            except Exception as e:
+                LOG.error(f"Scheduler leader election failed: {e!r}")
+            if leader != self.is_leader:
+                LOG.info(f"Scheduler leadership {'acquired' if leader else 'lost'}: {self.instance_id}")
+            self.is_leader = leader
+            await asyncio.sleep(self.lease / 3)
+
+    def _fire(self, job: ScheduledJob) -> None:
+        if job.is_celery_task:
+            run_celery_task(job.func)
+            return
+        if job.running is not None and not job.running.done():
+            # 上一次执行尚未结束：跳过本次，避免同一任务并发堆积
+            job.skipped += 1
+            LOG.warning(f"Scheduled job still running, skipped: {job.name}")
+            return
+        job.running = asyncio.create_task(job.func())
+        job.running.add_done_callback(lambda t: self._on_done(job, t))
+
+    @staticmethod
+    def _on_done(job: ScheduledJob, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            job.failures += 1
+            LOG.error(f"Scheduled job failed: {job.name}, {task.exception()!r}")
+
+    async def _run_job(self, job: ScheduledJob) -> None:
+        loop = asyncio.get_running_loop()
+        due = loop.time() + job.next_delay()
+        while True:
+            await asyncio.sleep(max(due - loop.time(), 0))
+            now = loop.time()
+            if self.is_leader:
+                job.lateness.append((now - due) * 1000)
+                job.runs += 1
+                try:
+                    self._fire(job)
+                except Exception as e:
+                    job.failures += 1
+                    LOG.error(f"Scheduled job dispatch failed: {job.name}, {e!r}")
+            if job.interval is not None:
+                # 以计划时间为基准累加，避免误差累积；落后超过一个周期时跳过错过的触发
+                due += job.interval
+                if due <= now:
+                    due = now + job.interval
+            else:
+                due = loop.time() + job.next_delay()
+
+    def start(self) -> None:
+        """
+        启动选举及全部任务（应用 lifespan 启动时调用）
+        :return:
+        """
+        if self._tasks:
+            return
+        if self.elect:
+            self._tasks.append(asyncio.create_task(self._elect()))
+        self._tasks.extend(asyncio.create_task(self._run_job(job)) for job in self.jobs.values())
+
+    async def stop(self) -> None:
+        """
+        停止调度并主动释放租约，其他实例无需等待租约过期即可接管（应用 lifespan 关闭时调用）
+        :return:
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.elect and self.is_leader:
+            async with get_redis_client() as rs:
+                await rs.eval(RELEASE_LUA, 1, self.lease_key, self.instance_id)
+            self.is_leader = False
+
+    def report(self) -> Dict[str, Any]:
+        return {"instance_id": self.instance_id,
+                "is_leader": self.is_leader,
+                "jobs": {name: job.report() for name, job in self.jobs.items()}}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,89 @@
+import uuid
+from typing import Dict, Optional
+
+from app import settings
+from app.core.logger import LOG
+from app.core.redis import get_redis_client
+from app.core.utils import run_celery_task
+
+
+# ========================================
+# 说明: Celery 任务幂等提交及去重
+#    * 提交端：幂等键通过 SET NX EX 写入 Redis，有效期内的重复提交合并为首次提交的任务 ID
+#    * Worker 端：任务执行成功后写入完成标记，相同幂等键的任务再次被消费时直接跳过
+#    * 命中次数记录在 Redis Hash 中（所有进程汇总）
+# ========================================
+
+IDEMPOTENCY_HEADER = "idempotency_key"
+SUBMIT_KEY = "task:idem:{}"
+DONE_KEY = "task:idem:done:{}"
+METRICS_KEY = "task:idem:metrics"
+
+
+async def run_celery_task_once(task, *args, idempotency_key: Optional[str] = None,
+                               idempotency_ttl: int = settings.TASK_IDEMPOTENCY_TTL, **kwargs):
+    """
+    幂等提交 Celery 任务：有效期内相同 idempotency_key 的重复提交不再投递，返回首次提交的任务;
+    未指定 idempotency_key 时等同于 run_celery_task;
+    :param task: Celery 任务
+    :param idempotency_key: 幂等键，如 f"sync_user:{user_id}"
+    :param idempotency_ttl: 幂等键有效期（秒）
+    :return: AsyncResult
+    """
+    if not idempotency_key:
+        return run_celery_task(task, *args, **kwargs)
+    task_id = str(uuid.uuid4())
+    submit_key = SUBMIT_KEY.format(idempotency_key)
+    first_id = None
+    async with get_redis_client() as rs:
+        if not await rs.set(submit_key, task_id, ex=idempotency_ttl, nx=True):
+            first_id = await rs.get(submit_key)
+        await rs.hincrby(METRICS_KEY, "submit_duplicate" if first_id else "submit_accepted", 1)
+    if first_id:
+        LOG.info(f"Duplicate task submission collapsed: {idempotency_key} -> {first_id}")
+        return task.AsyncResult(first_id)
+    try:
+        return run_celery_task(task, *args, task_id=task_id,
+                               headers={IDEMPOTENCY_HEADER: idempotency_key}, **kwargs)
+    except Exception:
+        # 投递失败：释放幂等键，允许调用方重试
+        async with get_redis_client() as rs:
+            await rs.delete(submit_key)
+        raise
+
+
+async def is_task_done(idempotency_key: str) -> bool:
+    """
+    Worker 端：幂等键对应的任务是否已成功执行（命中时计数）
+    :param idempotency_key:
+    :return:
+    """
+    async with get_redis_client() as rs:
+        if await rs.exists(DONE_KEY.format(idempotency_key)):
+            await rs.hincrby(METRICS_KEY, "worker_skipped", 1)
+            return True
+    return False
+
+
+async def mark_task_done(idempotency_key: str, ttl: int = settings.TASK_IDEMPOTENCY_TTL) -> None:
+    """
+    Worker 端：写入任务完成标记
+    :param idempotency_key:
+    :param ttl: 完成标记有效期（秒）
+    :return:
+    """
+    async with get_redis_client() as rs:
+        await rs.set(DONE_KEY.format(idempotency_key), 1, ex=ttl)
+
+
+async def get_task_idempotency_metrics() -> Dict[str, int]:
+    """
+    幂等命中统计：submit_accepted（首次提交）、submit_duplicate（重复提交被合并）、worker_skipped（Worker 跳过已完成任务）
+    :return:
+    """
+    metrics = {}
+    async with get_redis_client() as rs:
+        metrics = await rs.hgetall(METRICS_KEY)
+    return {name: int(metrics.get(name, 0))
+            for name in ("submit_accepted", "submit_duplicate", "worker_skipped")}
+
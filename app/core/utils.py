@@ -1,7 +1,15 @@
 import asyncio
+import concurrent.futures
+import functools
+import os
 import threading
+import weakref
+from typing import Optional
+
+from tortoise import Tortoise, connections
 
 from app import settings
+from app.core.metrics import CELERY_TASKS_DISPATCHED
 
 
 # ========================================
@@ -9,12 +17,19 @@ from app import settings
 # ========================================
 
 def run_celery_task(task, *args, **kwargs):
-    # kwargs里的eta和expires参数用于celery，其他参数用于task
+    # kwargs里的eta、countdown、expires、task_id和headers参数用于celery，其他参数用于task
     eta = kwargs.pop("eta", None)
+    countdown = kwargs.pop("countdown", None)
     expires = kwargs.pop("expires", None)
+    task_id = kwargs.pop("task_id", None)
+    headers = kwargs.pop("headers", None)
+    CELERY_TASKS_DISPATCHED.labels(task.name).inc()
+    # 延迟加载项目 Celery App（Broker 等配置），否则 shared_task 在 Web 进程中使用未配置的默认 App 投递
+    from app.core import celery  # noqa: F401
     if settings.TEST:
         return task(*args, **kwargs)
-    return task.apply_async(args, kwargs, eta=eta, expires=expires)
+    return task.apply_async(args, kwargs, eta=eta, countdown=countdown, expires=expires,
+                            task_id=task_id, headers=headers)
 
 
 class SingletonMeta(type):
@@ -40,36 +55,153 @@ class AsyncLoopCreator:
     """
     创建单独的线程并运行一个独立的事件循环；
 
-    创建事件循环：确保在程序中只有一个事件循环实例。
-    线程安全：通过线程锁防止 race condition，确保事件循环的创建和访问是线程安全的。
+    创建事件循环：确保在程序（每个 Worker 进程）中只有一个事件循环实例。
+    线程安全：通过类级别线程锁防止 race condition，确保事件循环的创建和访问是线程安全的。
     独立运行：事件循环在单独的守护线程中运行，确保主线程的退出不会影响事件循环的运行。
+    进程隔离：prefork 模式下子进程不会继承父进程的事件循环线程，检测到 PID 变化时重新创建。
     多线程环境中，尤其是在使用 Celery 等非异步框架的环境中，异步代码可以正常运行而不会遇到事件循环关闭的错误 (RuntimeError: Event loop is closed)。
     """
     loop = None
+    _pid = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_loop(cls):
-        if cls.loop is None:
-            with threading.Lock():
-                if not cls.loop:
+        if cls.loop is None or cls._pid != os.getpid():
+            with cls._lock:
+                if cls.loop is None or cls._pid != os.getpid():
                     # 创建事件循环
-                    cls.loop = asyncio.new_event_loop()
+                    loop = asyncio.new_event_loop()
+                    started = threading.Event()
                     # 创建线程运行事件循环:target 指定线程运行函数，args 指定传递标函数参数
-                    thread = threading.Thread(target=cls.run_event_loop, args=(cls.loop,))
+                    thread = threading.Thread(target=cls.run_event_loop, args=(loop, started))
                     # 守护线程:主线程退出，该线程自动退出
                     thread.daemon = True
-                    # 启动线程，运行 run_event_loop 方法
+                    # 启动线程，运行 run_event_loop 方法，等待事件循环开始运行后再对外提供
                     thread.start()
-                return cls.loop
+                    started.wait()
+                    cls.loop, cls._pid = loop, os.getpid()
         return cls.loop
 
     @staticmethod
-    def run_event_loop(loop):
+    def run_event_loop(loop, started=None):
         # 设置当前线程的事件循环为传递进来的 loop
         asyncio.set_event_loop(loop)
+        if started is not None:
+            loop.call_soon(started.set)
         try:
             # 运行事件循环，直到调用 loop.stop() 停止它
             loop.run_forever()
         finally:
             # 确保事件循环能被正确关闭。
             loop.close()
+
+    @classmethod
+    def run(cls, coro, timeout: Optional[float] = None):
+        """
+        在共享事件循环中执行协程，并同步等待结果：返回值、异常均原样传递给调用方;
+        :param coro: 协程对象
+        :param timeout: 超时时间（秒），超时后取消协程并抛出 TimeoutError，None 表示不限制
+        :return: 协程返回值
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Coroutine did not finish within {timeout}s")
+
+    @classmethod
+    def shutdown(cls, timeout: float = 10) -> None:
+        """
+        关闭共享事件循环：先关闭 Tortoise 数据库连接，再停止事件循环（Worker 退出时调用）
+        :param timeout:
+        :return:
+        """
+        if cls.loop is None or cls._pid != os.getpid():
+            return
+        if Tortoise._inited:
+            try:
+                cls.run(_close_tortoise(), timeout=timeout)
+            except Exception:
+                pass
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.loop = None
+
+
+# 每个事件循环一把初始化锁（asyncio.Lock 绑定首次使用它的事件循环，不能跨循环共用）
+_tortoise_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+# 由 _ensure_tortoise 初始化 Tortoise 的 (进程号, 事件循环)
+_tortoise_owner: Optional[tuple] = None
+# Tortoise 在其他事件循环上初始化时，各事件循环独立的连接（连接配置共用，连接池在首次查询时于本循环创建）
+_loop_connections: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+async def _ensure_tortoise() -> None:
+    """
+    在共享事件循环中按需初始化 Tortoise ORM（每个 Worker 进程仅一次），后续任务复用同一个 asyncpg 连接池;
+    Tortoise 已在其他事件循环上初始化时（Web 进程中同步执行任务：lifespan 在 uvicorn 事件循环上初始化；
+    fork 前父进程已初始化），原连接池绑定其他事件循环，当前任务改用本事件循环独立的连接
+    :return:
+    """
+    global _tortoise_owner
+    loop = asyncio.get_running_loop()
+    owner = (os.getpid(), loop)
+    if not Tortoise._inited:
+        async with _tortoise_locks.setdefault(loop, asyncio.Lock()):
+            if not Tortoise._inited:
+                await Tortoise.init(config=settings.TORTOISE_ORM)
+                _tortoise_owner = owner
+    if _tortoise_owner != owner:
+        # 连接存储为 ContextVar，仅对当前任务生效
+        connections._set_storage(_loop_connections.setdefault(loop, {}))
+
+
+async def _close_tortoise() -> None:
+    """
+    关闭当前事件循环上的 Tortoise 连接
+    :return:
+    """
+    loop = asyncio.get_running_loop()
+    storage = _loop_connections.pop(loop, None)
+    if storage is not None:
+        connections._set_storage(storage)
+        await connections.close_all()
+    elif _tortoise_owner == (os.getpid(), loop):
+        await Tortoise.close_connections()
+
+
+def async_task(*task_args, timeout: Optional[float] = settings.CELERY_ASYNC_TASK_TIMEOUT,
+               orm: bool = True, **task_kwargs):
+    """
+    Celery 异步任务装饰器：将协程函数注册为 Celery 任务，在每个 Worker 进程唯一的共享事件循环中执行;
+    任务结果及异常传递给 Celery，超时后取消协程并抛出 TimeoutError;
+    Redis 连接池（按事件循环缓存）与 Tortoise 连接池在同一个 Worker 进程的任务之间复用;
+
+    用法：
+        @async_task()
+        async def example_task(...):
+            ...
+
+    :param task_args: 透传给 shared_task 的参数
+    :param timeout: 超时时间（秒），None 或 0 表示不限制
+    :param orm: 是否在执行前确保 Tortoise ORM 已初始化
+    :param task_kwargs: 透传给 shared_task 的参数
+    :return:
+    """
+    # 延迟导入 Celery：Web 进程只有在首次注册/投递任务时才加载 Celery
+    from celery import shared_task
+
+    def decorator(func):
+        async def _run(*args, **kwargs):
+            if orm:
+                await _ensure_tortoise()
+            return await func(*args, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return AsyncLoopCreator.run(_run(*args, **kwargs), timeout=timeout or None)
+
+        return shared_task(*task_args, **task_kwargs)(wrapper)
+
+    return decorator
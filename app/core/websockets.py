@@ -3,8 +3,12 @@ import json
 from typing import Dict, List, Any, Type
 
 import redis.asyncio as aioredis
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket, WebSocketDisconnect, status
 
+from app import settings
+from app.core.logger import LOG
+from app.core.metrics import PUBSUB_MESSAGES, RATE_LIMIT_CHECKS, WEBSOCKET_CHANNELS, WEBSOCKET_CONNECTIONS
+from app.core.rate_limit import TokenBucket
 from app.core.redis import get_redis_client
 from app.core.utils import SingletonMeta
 
@@ -22,8 +26,7 @@ class RedisPubSubManager:
     def __init__(self, *args, **kwargs):
         self.pubsub = None
 
-    @staticmethod
-    async def _publish(channel: str, message: Any) -> None:
+    async def _publish(self, channel: str, message: Any) -> None:
         """
         消息发布到指定的 Redis 频道（channel）
         :param channel: 消息频道名称
@@ -32,6 +35,7 @@ class RedisPubSubManager:
         """
         async with get_redis_client() as rs:
             await rs.publish(channel, message)
+        PUBSUB_MESSAGES.labels(type(self).__name__, "out").inc()
 
     async def connect(self) -> None:
         """
@@ -87,9 +91,25 @@ class WebSocketManager(RedisPubSubManager, metaclass=SingletonMeta):
             #  获取来自 Redis 的消息，如果有新消息，解析消息并将其发送到相应channel内的所有 WebSocket 连接
             message = await pubsub_subscriber.get_message(ignore_subscribe_messages=True)
             if message is not None:
-                all_sockets = self.channels[message['channel']]
-                for socket in all_sockets:
-                    await socket.send_text(message['data'])
+                PUBSUB_MESSAGES.labels(type(self).__name__, "in").inc()
+                await self.send_local(message['channel'], message['data'])
+
+    async def send_local(self, channel: str, message: str) -> int:
+        """
+        发送到本进程内频道（channel）中的所有 WebSocket 连接（不经过 Redis，如各进程各自监听到的数据变更）
+        :param channel: 消息频道名称
+        :param message: 消息内容
+        :return: 发送成功的连接数
+        """
+        sent = 0
+        for socket in list(self.channels.get(channel, ())):
+            try:
+                await socket.send_text(message)
+                sent += 1
+            except Exception as e:
+                # 连接已断开：由 WebsocketConsumer 收到断开事件后移除，不影响其他连接
+                LOG.debug(f"Failed to send to websocket in {channel}: {e!r}")
+        return sent
 
     async def add_to_channel(self, channel: str, websocket: WebSocket) -> None:
         """
@@ -99,6 +119,7 @@ class WebSocketManager(RedisPubSubManager, metaclass=SingletonMeta):
         :return:
         """
         await websocket.accept()
+        WEBSOCKET_CONNECTIONS.labels(type(self).__name__).inc()
         if channel in self.channels:
             self.channels[channel].append(websocket)
         else:
@@ -108,6 +129,7 @@ class WebSocketManager(RedisPubSubManager, metaclass=SingletonMeta):
             # 创建一个任务，异步执行 _pubsub_data_reader()
             # _pubsub_data_reader() 可以在后台持续监听 Redis 消息，而不阻塞 WebSocket 连接的处理;
             asyncio.create_task(self._pubsub_data_reader(pubsub_subscriber))
+            WEBSOCKET_CHANNELS.labels(type(self).__name__).set(len(self.channels))
 
     async def broadcast_to_channel(self, channel: str, message: Any) -> None:
         """
@@ -126,8 +148,10 @@ class WebSocketManager(RedisPubSubManager, metaclass=SingletonMeta):
         :return:
         """
         self.channels[channel].remove(websocket)
+        WEBSOCKET_CONNECTIONS.labels(type(self).__name__).dec()
         if len(self.channels[channel]) == 0:
             del self.channels[channel]
+            WEBSOCKET_CHANNELS.labels(type(self).__name__).set(len(self.channels))
             await self.unsubscribe(channel)
 
 
@@ -140,19 +164,32 @@ class WebsocketConsumer:
 
     async def connect(self, websocket: WebSocket, channel: str = None) -> None:
         """
-        建立对应 Websocket 消息订阅
+        建立对应 Websocket 消息订阅；入站消息按连接限流（RATE_LIMIT_WEBSOCKET）：
+        超出限制的消息丢弃，连续丢弃的消息数达到桶容量（持续超限）时以 1008 关闭连接
         :param websocket:
         :param channel:
         :return:
         """
         channel = channel or self.websocket_manager.channel
+        bucket = TokenBucket(settings.RATE_LIMIT_WEBSOCKET) \
+            if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_WEBSOCKET else None
+        dropped = 0
         await self.websocket_manager.add_to_channel(channel, websocket)
         try:
             while True:
                 data = await websocket.receive_text()
+                if bucket is not None and not bucket.consume():
+                    dropped += 1
+                    RATE_LIMIT_CHECKS.labels("websocket", "rejected").inc()
+                    if dropped >= bucket.capacity:
+                        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Rate limit exceeded")
+                        break
+                    continue
+                dropped = 0
                 await self.websocket_manager.broadcast_to_channel(channel, data)
         except WebSocketDisconnect:
-            await self.websocket_manager.remove_from_channel(channel, websocket)
+            pass
+        await self.websocket_manager.remove_from_channel(channel, websocket)
 
 
 # TODO：================= 自定义 Webocket =======================#
@@ -182,3 +219,10 @@ class ExampleUserWebsocket(WebSocketManager):
             'data': message
         }
         await self._publish(channel, json.dumps(data, ensure_ascii=False))
+
+
+class ExampleGroupWebsocket(WebSocketManager):
+    """
+    TODO 示例：自定义 Group WebSocket 示例（用户组及组内用户的数据变更推送，见 app.core.change_feed）
+    """
+    channel = "ws_example_group_channel_{}"
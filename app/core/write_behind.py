@@ -0,0 +1,150 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from tortoise import Model, connections
+
+from app import settings
+from app.core.logger import LOG
+
+# ========================================
+# 说明: 高频字段延迟写入（write-behind），如 ExampleUser.last_login
+#    * update(pk, field=value) 只写入进程内缓冲区，同一主键的多次更新合并为最后一次的值
+#    * 后台任务每 WRITE_BEHIND_INTERVAL 秒（或缓冲条数达到 WRITE_BEHIND_MAX_PENDING 时）批量写入：
+#      UPDATE ... FROM (VALUES ...) 每条语句最多 WRITE_BEHIND_BATCH_SIZE 行，替代每个事件一条 UPDATE，减少行锁竞争及 WAL
+#    * 读取时通过 apply() 将缓冲中的值覆盖到查询结果上（本进程内读己之写；其他 Worker 最多延迟一个写入周期）
+#    * 写入失败时放回缓冲区（不覆盖更新的值），下个周期重试；应用关闭时（lifespan）写入剩余数据
+#    * 仅支持 PostgreSQL
+# ========================================
+
+_buffers: List["WriteBehindBuffer"] = []
+
+
+class WriteBehindBuffer:
+    """
+    按主键合并的延迟写入缓冲区（单事件循环内使用）
+    """
+
+    def __init__(self, model: Type[Model], fields: Iterable[str],
+                 max_pending: int = settings.WRITE_BEHIND_MAX_PENDING,
+                 batch_size: int = settings.WRITE_BEHIND_BATCH_SIZE):
+        self.model = model
+        self.fields = tuple(fields)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        # 正在写入的数据（写入完成前读取仍需可见）
+        self._flushing: Dict[Any, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        _buffers.append(self)
+
+    def update(self, pk: Any, **values: Any) -> None:
+        """
+        写入缓冲区
+        :param pk: 主键
+        :param values: 字段值（须在 fields 中）
+        :return:
+        """
+        unknown = set(values) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Fields not buffered for {self.model.__name__}: {', '.join(sorted(unknown))}")
+        self._pending.setdefault(pk, {}).update(values)
+        if len(self._pending) >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def get(self, pk: Any) -> Dict[str, Any]:
+        """
+        主键对应的缓冲值（未写入数据库）
+        :param pk:
+        :return:
+        """
+        return {**self._flushing.get(pk, {}), **self._pending.get(pk, {})}
+
+    def apply(self, *objs: Optional[Model]) -> None:
+        """
+        将缓冲值覆盖到模型实例上
+        :param objs:
+        :return:
+        """
+        if not self._pending and not self._flushing:
+            return
+        for obj in objs:
+            if obj is not None:
+                for field, value in self.get(obj.pk).items():
+                    setattr(obj, field, value)
+
+    def _statement(self, fields: Tuple[str, ...], rows: int) -> str:
+        """
+        UPDATE t SET f = v.f FROM (VALUES ($1::pk_type, $2::f_type), ...) AS v(pk, f) WHERE t.pk = v.pk
+        :param fields: 更新的字段
+        :param rows: 行数
+        :return:
+        """
+        meta = self.model._meta
+        names = (meta.pk_attr, *fields)
+        columns = [f'"{meta.fields_map[name].source_field or name}"' for name in names]
+        types = [meta.fields_map[name].get_for_dialect("postgres", "SQL_TYPE") for name in names]
+        width = len(names)
+        values = ", ".join("(" + ", ".join(f"${row * width + i + 1}::{types[i]}" for i in range(width)) + ")"
+                           for row in range(rows))
+        assignments = ", ".join(f"{column} = v.{column}" for column in columns[1:])
+        return (f'UPDATE "{meta.db_table}" AS t SET {assignments} FROM (VALUES {values}) '
+                f'AS v({", ".join(columns)}) WHERE t.{columns[0]} = v.{columns[0]}')
+
+    async def flush(self) -> int:
+        """
+        批量写入缓冲区数据
+        :return: 写入行数
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            # 按更新的字段组合分组，每组一条（或多条分块）UPDATE
+            groups: Dict[Tuple[str, ...], List[Tuple[Any, Dict[str, Any]]]] = {}
+            for pk, values in self._flushing.items():
+                groups.setdefault(tuple(sorted(values)), []).append((pk, values))
+            conn = connections.get(self.model._meta.default_connection)
+            written = 0
+            try:
+                for fields, items in groups.items():
+                    for i in range(0, len(items), self.batch_size):
+                        chunk = items[i:i + self.batch_size]
+                        args = [arg for pk, values in chunk for arg in (pk, *(values[f] for f in fields))]
+                        await conn.execute_query(self._statement(fields, len(chunk)), args)
+                        written += len(chunk)
+                        for pk, _ in chunk:
+                            self._flushing.pop(pk)
+            except BaseException as e:
+                LOG.error(f"Write-behind flush failed for {self.model.__name__}: {e!r}, "
+                          f"{len(self._flushing)} rows kept for retry")
+                # 放回缓冲区，期间产生的新值优先；任务被取消（如应用关闭）时同样保留，由 flush_all 写入
+                for pk, values in self._flushing.items():
+                    self._pending[pk] = {**values, **self._pending.get(pk, {})}
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                self._flushing = {}
+            return written
+
+
+async def flush_all() -> int:
+    """
+    写入所有缓冲区（应用关闭时调用）
+    :return: 写入行数
+    """
+    return sum([await buffer.flush() for buffer in _buffers])
+
+
+async def run_write_behind_flusher(interval: float = settings.WRITE_BEHIND_INTERVAL) -> None:
+    """
+    周期写入所有缓冲区（应用 lifespan 中以后台任务运行，每个 Worker 写入各自的缓冲区）
+    :param interval: 写入周期（秒）
+    :return:
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_all()
+        except Exception as e:
+            LOG.error(f"Failed to flush write-behind buffers: {e!r}")
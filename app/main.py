@@ -1,39 +1,94 @@
-from fastapi import FastAPI, HTTPException, status
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse
 
 from app import settings
 from app.api.v1.api import api_router
-from app.core.celery import do_health_check
-from app.core.redis import get_redis_client
-from app.core.utils import run_celery_task
-from tortoise.contrib.fastapi import register_tortoise
+from app.core.change_feed import ChangeFeedListener
+from app.core.concurrency import ConcurrencyLimitMiddleware
+from app.core.db import REPLICA_ALIASES, DBRoutingMiddleware, warm_up_pools
+from app.core.health import HealthProber
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.instrumentation import RequestTimingMiddleware
+from app.core.logger import LOG
+from app.core.metrics import MetricsMiddleware, mark_process_dead, metrics, run_pool_gauge_refresher
+from app.core.passwords import PasswordHasher, PasswordHasherBusy
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.scheduler import scheduler
+from app.core.write_behind import flush_all, run_write_behind_flusher
+from app.tasks import jobs  # noqa: F401 注册进程内定时任务
+from tortoise.contrib.fastapi import RegisterTortoise
 
 
 # ========================================
 # 说明: 入口
 # 开发阶段启动命令：uvicorn app.main:app --host 0.0.0.0 --port <端口> --reload
+# 生产环境启动命令：python -m app.server --port <端口>（预加载应用后 fork 多个 Worker，见 app/server.py）
 # register_tortoise 是一个便捷函数，用于快速将 Tortoise-ORM 注册到 FastAPI 应用中。它在应用启动时初始化数据库连接，并在应用关闭时关闭连接。
 # RegisterTortoise 是一个类，提供了更灵活和面向对象的方式来管理数据库连接。它允许你更精细地控制数据库初始化和关闭操作。
+# 当前使用 lifespan + RegisterTortoise：数据库连接建立之后再启动后台任务（如健康探测），关闭时按相反顺序释放。
+# ========================================
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-#     # app startup
-#     async with RegisterTortoise(
-#         app,
-#         db_url="sqlite://:memory:",
-#         modules={"models": ["models"]},
-#         generate_schemas=True,
-#         add_exception_handlers=True,
-#         use_tz=False,
-#         timezone="Asia/Shanghai",
-#     ):
-#         # db connected
-#         yield
-#         # app teardown
-#     # db connections closed
-
-# app = FastAPI(title="Tortoise ORM FastAPI example", lifespan=lifespan)
 
-# ========================================
+async def cancel_task(task: asyncio.Task) -> None:
+    """
+    取消后台任务并等待其结束（进行中的写入 / 刷新完成取消后才继续关闭数据库连接）
+    :param task:
+    :return:
+    """
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    应用生命周期：启动时初始化数据库连接（预热连接池）、密码哈希进程池、后台健康探测、数据变更监听、进程内定时调度、连接池指标刷新及延迟写入，
+    关闭时按相反顺序停止（延迟写入缓冲区在数据库连接关闭前写入）
+    :param application:
+    :return:
+    """
+    async with application.state.orm:
+        # db connected：预热连接池，失败时不阻止启动（由就绪检查反映数据库状态）
+        try:
+            await warm_up_pools()
+        except Exception as e:
+            LOG.error(f"Failed to warm up database pools: {e!r}")
+        hasher = PasswordHasher()
+        await hasher.start()
+        prober = HealthProber()
+        prober.start()
+        change_feed = ChangeFeedListener()
+        if settings.CHANGE_FEED_ENABLED:
+            change_feed.start()
+        if settings.SCHEDULER_ENABLED:
+            scheduler.start()
+        refresher = asyncio.create_task(run_pool_gauge_refresher())
+        flusher = asyncio.create_task(run_write_behind_flusher())
+        yield
+        # app teardown：写入延迟写入缓冲区的剩余数据（数据库连接关闭之前）
+        await cancel_task(flusher)
+        await flush_all()
+        await cancel_task(refresher)
+        await scheduler.stop()
+        await change_feed.stop()
+        await prober.stop()
+        await hasher.stop()
+        mark_process_dead()
+    # db connections closed
+
+
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy) -> JSONResponse:
+    # 密码哈希进程池繁忙：返回 503，客户端稍后重试
+    return JSONResponse({"detail": "Password hasher busy, retry later"},
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={"Retry-After": str(exc.retry_after)})
 
 
 def get_application() -> FastAPI:
@@ -55,26 +110,58 @@ def get_application() -> FastAPI:
         description=settings.PROJECT_DESCRIPTION,
         version=settings.VERSION,
         debug=settings.DEBUG,
+        lifespan=lifespan,
         openapi_tags=[
             {"name": "CRUD | PostgreSQL | Redis | WebSocket", "description": "示例"},
         ],
     )
 
     """
-    使用 register_tortoise 函数将 Tortoise ORM 注册到 FastAPI 应用中;
-    (1) application: 传递 FastAPI 应用实例;
+    使用 RegisterTortoise 将 Tortoise ORM 注册到 FastAPI 应用中，在 lifespan 中初始化/关闭数据库连接;
+    (1) application: 传递 FastAPI 应用实例（异常处理器需在应用启动前注册，因此在此处实例化）;
     (2) config=settings.TORTOISE_ORM: 从 settings.TORTOISE_ORM 中获取 ORM 的配置（如数据库连接信息等）;
-    (3) generate_schemas=True: 自动生成数据库表结构。通常在开发阶段使用，但在生产环境中最好禁用;
+    (3) generate_schemas: 自动生成数据库表结构。通常在开发阶段使用，生产环境（ENV=PROD）默认禁用，避免每个 Worker 启动时执行 DDL;
     (4) add_exception_handlers=True: 添加异常处理器，以便处理数据库相关的错误
     """
-    register_tortoise(application, config=settings.TORTOISE_ORM,
-                      generate_schemas=True, add_exception_handlers=True)
+    application.state.orm = RegisterTortoise(application, config=settings.TORTOISE_ORM,
+                                             generate_schemas=settings.DB_GENERATE_SCHEMAS,
+                                             add_exception_handlers=True)
     """
     添加路由 (include_router): 将一个路由器 api_router 添加到 FastAPI 应用中;
     (1) api_router: 通常是定义了多个 API 端点的路由器实例;
     (2) prefix: 路由的前缀，所有包含在 api_router 中的路由都会以此前缀开始;
     """
+    application.add_exception_handler(PasswordHasherBusy, password_hasher_busy_handler)
     application.include_router(api_router, prefix=f"/api/{settings.VERSION}/examples")
+    if REPLICA_ALIASES:
+        # 配置只读副本时：写请求及写后粘滞窗口内的读请求使用主库
+        application.add_middleware(DBRoutingMiddleware)
+    if settings.PROFILER_ENABLED:
+        # 按需采样分析：仅启用时导入及注册，关闭时无任何开销
+        from app.core import profiler
+        application.add_middleware(profiler.ProfilerMiddleware)
+        application.add_api_route("/debug/profile", profiler.profile_window, methods=["POST"],
+                                  summary="采样分析", description="采样当前 Worker 一段时间内的调用栈",
+                                  tags=["内置"])
+        application.add_api_route("/debug/profiles", profiler.list_profiles, summary="采样结果列表",
+                                  tags=["内置"])
+        application.add_api_route("/debug/profiles/{filename}", profiler.get_profile, summary="下载采样结果",
+                                  tags=["内置"])
+    if settings.CONCURRENCY_ENABLED:
+        # 自适应并发限制：位于指标、耗时统计之内，被拒绝的请求同样计入指标及请求日志
+        application.add_middleware(ConcurrencyLimitMiddleware)
+    # 幂等请求：位于并发限制之外，重复请求直接返回缓存响应，不占用并发名额
+    application.add_middleware(IdempotencyMiddleware)
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_DEFAULT:
+        # 按 IP 限流：位于幂等、并发限制之外，超出限制的请求不占用并发名额，同样计入指标及请求日志
+        application.add_middleware(RateLimitMiddleware)
+    # 请求耗时统计：最后添加即最外层，统计包含其他中间件耗时
+    application.add_middleware(MetricsMiddleware)
+    application.add_middleware(RequestTimingMiddleware)
+    # Prometheus 指标
+    application.add_api_route("/metrics", metrics, summary="Prometheus 指标",
+                              description="HTTP、连接池、WebSocket、Celery 指标（多进程部署时汇总所有 Worker）",
+                              tags=["内置"], include_in_schema=False)
     return application
 
 
@@ -82,18 +169,39 @@ def get_application() -> FastAPI:
 app = get_application()
 
 
+@app.get("/health/live", summary="存活检查",
+         description="进程存活探针，常数时间返回，不访问任何依赖服务",
+         status_code=status.HTTP_200_OK,
+         tags=["内置"])
+async def health_live():
+    # 内置：存活检查
+    return {"status": "ok"}
+
+
 @app.get("/health/", summary="健康检查",
-         description="Redis、Celery 服务检查",
+         description="Redis、PostgreSQL、Celery 服务检查（读取后台探测缓存结果）",
+         status_code=status.HTTP_200_OK,
+         tags=["内置"])
+@app.get("/health/ready", summary="就绪检查",
+         description="就绪探针，读取后台探测缓存结果，任一依赖异常时返回 503",
          status_code=status.HTTP_200_OK,
          tags=["内置"])
 async def health():
     # 内置：服务健康检查
-    try:
-        async with get_redis_client() as rs:
-            # Ping Redis 服务器，检查连接状态
-            if not await rs.ping():
-                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Redis health check failed")
-            run_celery_task(do_health_check)
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Health check failed")
+    prober = HealthProber()
+    if not prober.ready:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail={name: r["status"] for name, r in prober.report().items()} or "Health check pending")
     return {"status": "ok"}
+
+
+@app.get("/health/verbose", summary="健康检查详情",
+         description="各依赖服务最近一次探测状态及延迟",
+         status_code=status.HTTP_200_OK,
+         tags=["内置"])
+async def health_verbose():
+    # 内置：健康检查详情
+    prober = HealthProber()
+    return {"status": "ok" if prober.ready else "error",
+            "interval": prober.interval,
+            "checks": prober.report()}
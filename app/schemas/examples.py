@@ -36,6 +36,12 @@ class UserUpdate(UserIn):
     group_id: Optional[int] = None
 
 
+class UserLogin(BaseModel):
+    # TODO 示例：用户登录
+    username: str
+    password: str
+
+
 class UserOut(BaseUser):
     # TODO 示例：用户详情
     id: int
@@ -48,6 +54,12 @@ class UserOut(BaseUser):
     )
 
 
+class UserSearchOut(BaseModel):
+    # TODO 示例：用户检索结果
+    items: list[UserOut]
+    next_cursor: Optional[str] = None
+
+
 # TODO：================= 用户组 =======================#
 class GroupIn(BaseModel):
     # TODO 示例：创建用户组
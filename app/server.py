@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import gc
+import importlib
+import importlib.util
+import math
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app import settings
+from app.core.logger import LOG, flush_logs
+
+
+# ========================================
+# 说明: 生产环境服务入口（替代 uvicorn app.main:app --workers N）
+#    * 事件循环 / HTTP 解析：已安装 uvloop、httptools 时使用，否则回退 asyncio、h11
+#    * 预加载：主进程导入应用（app.main）后 gc.freeze()，再 fork 出 Worker（uvicorn --workers 以 spawn 方式启动，
+#      每个 Worker 各自导入）。Worker 共享导入后的内存页，冻结的对象不参与 GC 扫描，避免 GC 修改对象头导致共享页被复制；
+#      lifespan（数据库连接池、后台任务等）在每个 Worker 中各自启动
+#    * Worker 数：默认 cgroup CPU 配额（容器 --cpus），未限制时为可用 CPU 数
+#    * Worker 回收：处理 SERVER_MAX_REQUESTS（+ 随机抖动）个请求或常驻内存超过 SERVER_MAX_RSS_MB 后，先通知主进程启动替代 Worker，
+#      自身停止接受新连接（监听 socket 由其他 Worker 继续接受），等待 WebSocket 连接断开（至多 SERVER_DRAIN_TIMEOUT 秒，
+#      剩余连接以 1012 Service Restart 关闭，客户端重连到其他 Worker）后退出
+#    * 主进程：Worker 异常退出时重新启动（尚未启动完成即退出时整体退出，避免反复 fork），SIGTERM / SIGINT 时通知所有 Worker 优雅退出
+#    * 预加载及各 Worker 启动耗时见日志，Worker 内存见 /metrics（process_memory_bytes），对比测试见 benchmarks/server.py
+#
+# 运行：python -m app.server --port 9000 [--workers 4]
+# ========================================
+
+APP = "app.main:app"
+
+
+def cpu_quota() -> int:
+    """
+    可用 CPU 数：cgroup v2（cpu.max）/ v1（cpu.cfs_quota_us）配额向上取整，未限制时为进程可调度的 CPU 数
+    :return:
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    for quota_file, period_file in (("/sys/fs/cgroup/cpu.max", None),
+                                    ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us")):
+        try:
+            with open(quota_file) as f:
+                values = f.read().split()
+            if period_file:
+                with open(period_file) as f:
+                    values.append(f.read().strip())
+            quota, period = values[0], values[1]
+        except (OSError, IndexError):
+            continue
+        if quota == "max" or int(quota) <= 0:
+            break
+        return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+    return cpus
+
+
+def _available(module: str, fallback: str) -> str:
+    return module if importlib.util.find_spec(module) else fallback
+
+
+def _current_rss() -> int:
+    # /proc/self/statm 第二列：常驻页数（开销远小于 smaps_rollup，每秒检查一次）
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Worker 内的 uvicorn 服务：按请求数 / 常驻内存回收，回收时先通知主进程，排空 WebSocket 连接后退出
+    """
+
+    def __init__(self, config: uvicorn.Config, notify: Connection, started_at: float):
+        super().__init__(config)
+        self.notify = notify
+        self.started_at = started_at
+        self.max_requests = settings.SERVER_MAX_REQUESTS and (
+                settings.SERVER_MAX_REQUESTS + random.randint(0, settings.SERVER_MAX_REQUESTS_JITTER))
+        self.max_rss = settings.SERVER_MAX_RSS_MB * 1024 * 1024
+        self.recycling = False
+
+    def _send(self, *message) -> None:
+        try:
+            self.notify.send(message)
+        except OSError:
+            pass
+
+    async def on_tick(self, counter: int) -> bool:
+        if counter == 0 and not self.recycling:
+            # 首次 tick：lifespan 启动完成，开始接受连接
+            elapsed = time.perf_counter() - self.started_at
+            LOG.info(f"Worker started: pid={os.getpid()}, startup={elapsed:.3f}s")
+            self._send("started", elapsed)
+        if not (self.should_exit or self.recycling):
+            if self.max_requests and self.server_state.total_requests >= self.max_requests:
+                self.recycle(f"requests={self.server_state.total_requests}")
+            elif self.max_rss and counter % 10 == 0 and (rss := _current_rss()) > self.max_rss:
+                self.recycle(f"rss={rss // 1024 // 1024}MB")
+        return await super().on_tick(counter)
+
+    def recycle(self, reason: str) -> None:
+        """
+        回收当前 Worker：通知主进程启动替代 Worker，并退出服务循环
+        :param reason:
+        :return:
+        """
+        LOG.info(f"Worker recycling: pid={os.getpid()}, {reason}")
+        self.recycling = True
+        self.should_exit = True
+        self._send("recycle", reason)
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        if self.recycling and not self.force_exit:
+            await self.drain(sockets)
+        await super().shutdown(sockets)
+
+    async def drain(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        """
+        停止接受新连接，HTTP 连接处理完当前请求后关闭，等待 WebSocket 连接由客户端断开
+        :param sockets:
+        :return:
+        """
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+        ws_protocol = self.config.ws_protocol_class
+        for connection in list(self.server_state.connections):
+            if not (ws_protocol and isinstance(connection, ws_protocol)):
+                connection.shutdown()
+        deadline = time.monotonic() + settings.SERVER_DRAIN_TIMEOUT
+        while self.server_state.connections and not self.force_exit and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.server_state.connections:
+            LOG.info(f"Worker closing {len(self.server_state.connections)} connection(s) after drain timeout")
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket, notify: Connection) -> None:
+    """
+    Worker 进程入口（fork 后执行）
+    :param config:
+    :param sock: 主进程绑定的监听 socket
+    :param notify: 向主进程发送启动完成 / 回收通知
+    :return:
+    """
+    started_at = time.perf_counter()
+    # 主进程的信号处理由 uvicorn 接管（SIGINT / SIGTERM 优雅退出）
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)
+    gc.enable()
+    server = WorkerServer(config, notify, started_at)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        flush_logs()
+    if not server.started:
+        sys.exit(3)
+
+
+class Supervisor:
+    """
+    主进程：预加载应用，启动、回收、重启 Worker
+    """
+
+    def __init__(self, config: uvicorn.Config, workers: int, preload: bool = settings.SERVER_PRELOAD,
+                 gc_freeze: bool = settings.SERVER_GC_FREEZE):
+        self.config = config
+        self.workers = workers
+        self.preload = preload
+        self.gc_freeze = gc_freeze
+        self.context = multiprocessing.get_context("fork")
+        # Worker 进程 -> 通知管道（主进程读取端）
+        self.processes: Dict[multiprocessing.Process, Connection] = {}
+        self.started = set()
+        self.retiring = set()
+        # 首批 Worker 是否均已启动完成
+        self.booted = False
+        self.should_exit = False
+        self.exit_code = 0
+
+    def handle_exit(self, sig: int, frame) -> None:
+        self.should_exit = True
+
+    def spawn(self, sock: socket.socket) -> None:
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=run_worker, args=(self.config, sock, writer), daemon=False)
+        process.start()
+        writer.close()
+        self.processes[process] = reader
+
+    def run(self) -> int:
+        start = time.perf_counter()
+        sock = self.config.bind_socket()
+        if self.preload:
+            # 导入期间关闭 GC，减少内存碎片（空洞被后续分配写入时触发写时复制）
+            gc.disable()
+            importlib.import_module(APP.partition(":")[0])
+            LOG.info(f"Application preloaded in {time.perf_counter() - start:.3f}s")
+        if self.gc_freeze:
+            gc.collect()
+            gc.freeze()
+        gc.enable()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_exit)
+        LOG.info(f"Starting {self.workers} worker(s): loop={self.config.loop}, http={self.config.http}, "
+                 f"preload={self.preload}, gc_freeze={self.gc_freeze}")
+        for _ in range(self.workers):
+            self.spawn(sock)
+        try:
+            while not self.should_exit:
+                self.supervise(sock, start)
+        finally:
+            self.stop()
+            sock.close()
+        return self.exit_code
+
+    def supervise(self, sock: socket.socket, start: float) -> None:
+        """
+        等待 Worker 通知或退出（至多 1 秒），处理后返回
+        :param sock:
+        :param start: 主进程启动时间，用于统计所有 Worker 启动完成的耗时
+        :return:
+        """
+        pipes = {reader: process for process, reader in self.processes.items()}
+        ready = wait(list(pipes) + [process.sentinel for process in self.processes], timeout=1)
+        for reader in (r for r in ready if r in pipes):
+            process = pipes[reader]
+            try:
+                kind, value = reader.recv()
+            except (EOFError, OSError):
+                continue
+            if kind == "started":
+                self.started.add(process)
+                if len(self.started) == self.workers and not self.booted:
+                    self.booted = True
+                    LOG.info(f"All {self.workers} worker(s) started in {time.perf_counter() - start:.3f}s")
+            elif kind == "recycle" and process not in self.retiring:
+                self.retiring.add(process)
+                self.started.discard(process)
+                self.spawn(sock)
+        for process in [p for p in self.processes if p.exitcode is not None]:
+            self.reap(process, sock)
+
+    def reap(self, process: multiprocessing.Process, sock: socket.socket) -> None:
+        from app.core.metrics import mark_process_dead
+
+        self.processes.pop(process).close()
+        mark_process_dead(process.pid)
+        if process in self.retiring:
+            self.retiring.discard(process)
+            LOG.info(f"Worker recycled: pid={process.pid}")
+            return
+        if self.should_exit:
+            return
+        if process not in self.started:
+            LOG.error(f"Worker failed to start: pid={process.pid}, exitcode={process.exitcode}")
+            self.should_exit = True
+            self.exit_code = 3
+            return
+        self.started.discard(process)
+        LOG.warning(f"Worker exited unexpectedly: pid={process.pid}, exitcode={process.exitcode}, restarting")
+        self.spawn(sock)
+
+    def stop(self) -> None:
+        """
+        通知所有 Worker 优雅退出（处理中请求 + lifespan 关闭），超时后强制结束
+        :return:
+        """
+        for process in self.processes:
+            if process.exitcode is None:
+                process.terminate()
+        deadline = time.monotonic() + self.config.timeout_graceful_shutdown * 2
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.exitcode is None:
+                LOG.warning(f"Worker did not exit in time, killing: pid={process.pid}")
+                process.kill()
+                process.join()
+        LOG.info("All workers stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务进程（预加载应用 + 多 Worker）")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 按 cgroup CPU 配额")
+    args = parser.parse_args()
+    config = uvicorn.Config(APP, host=args.host, port=args.port,
+                            loop=_available("uvloop", "asyncio"), http=_available("httptools", "h11"),
+                            timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT)
+    sys.exit(Supervisor(config, args.workers or cpu_quota()).run())
+
+
+if __name__ == '__main__':
+    main()
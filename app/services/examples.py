@@ -1,7 +1,17 @@
 import asyncio
+import base64
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Optional, Tuple, Type
 
+from tortoise import Model
+from tortoise.queryset import QuerySet
+
+from app.core.bloom import RedisBloomFilter
+from app.core.db import force_primary
 from app.core.logger import LOG
+from app.core.passwords import PasswordHasher
 from app.core.redis import acquire_lock, acquire_lock_with_retry, release_lock
+from app.core.write_behind import WriteBehindBuffer
 from app.models.examples import ExampleUser, ExampleGroup
 from app.schemas.examples import UserIn, GroupIn
 
@@ -10,22 +20,224 @@ from app.schemas.examples import UserIn, GroupIn
 # 说明: Service 层，封装复杂业务逻辑
 # ========================================
 
+# 用户活跃字段延迟批量写入（读取用户时通过 user_activity.apply 覆盖缓冲值）
+user_activity = WriteBehindBuffer(ExampleUser, ("last_login",))
+
+# 用户名/用户组名布隆过滤器（可用性检查），创建/改名时增量添加，删除后需全量重建
+username_filter = RedisBloomFilter("example_user:username")
+group_name_filter = RedisBloomFilter("example_group:name")
+
+
+async def scan_column(model: Type[Model], field: str, chunk_size: int = 10000) -> AsyncIterator[List[str]]:
+    """
+    按主键分页流式扫描表中某一列（keyset 分页，不一次加载全表），读主库（副本可能尚未同步最新写入）
+    :param model:
+    :param field:
+    :param chunk_size: 每页条数
+    :return:
+    """
+    last_id = 0
+    while True:
+        with force_primary():
+            rows = await model.filter(id__gt=last_id).order_by("id").limit(chunk_size).values_list("id", field)
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [value for _, value in rows]
+
+
+async def check_available(bloom: RedisBloomFilter, value: str, queryset: QuerySet) -> bool:
+    """
+    可用性检查：布隆过滤器判断一定不存在时直接返回，可能存在（或过滤器不可用）时查询数据库确认
+    :param bloom:
+    :param value:
+    :param queryset: 按值过滤的查询
+    :return: 可用（不存在）返回 True
+    """
+    maybe = await bloom.might_contain(value)
+    if maybe is False:
+        return True
+    exists = await queryset.exists()
+    if maybe and not exists:
+        await bloom.record_false_positive()
+    return not exists
+
+
+# 用户检索：模糊匹配的列（pg_trgm GIN 索引，见迁移 2_*_user_search_indexes）
+USER_SEARCH_COLUMNS = ("username", "nickname", "email")
+# 是否已安装 pg_trgm 扩展（按进程缓存；未安装时模糊匹配退化为 ILIKE 子串匹配）
+_trgm_installed: Optional[bool] = None
+
+
+def encode_cursor(created_at: datetime, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{user_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析分页游标
+    :param cursor: encode_cursor 生成的游标
+    :return: (created_at, id)
+    """
+    try:
+        created_at, _, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(user_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def build_user_search_query(q: Optional[str] = None, group_id: Optional[int] = None,
+                            is_active: Optional[bool] = None, is_superuser: Optional[bool] = None,
+                            created_after: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 50,
+                            trigram: bool = True) -> Tuple[str, List[Any]]:
+    """
+    用户检索 SQL（参数化）：
+        * 过滤条件：group_id / is_active / is_superuser / created_at 范围，
+          按 created_at DESC, id DESC 排序，游标（上一页最后一行）分页，对应复合索引 (group_id, created_at DESC, id DESC) 等；
+        * 模糊匹配（q）：用户名/昵称/邮箱 word_similarity（q <% 列，容错拼写）或子串匹配（ILIKE），均可使用 pg_trgm GIN 索引，
+          按相似度排序，返回前 limit 条（不分页）
+    :param q: 模糊匹配关键字
+    :param group_id:
+    :param is_active:
+    :param is_superuser:
+    :param created_after: 创建时间下限（包含）
+    :param created_before: 创建时间上限（不包含）
+    :param cursor: 分页游标（仅过滤模式）
+    :param limit: 返回条数
+    :param trigram: 是否使用 pg_trgm 运算符（未安装扩展时为 False）
+    :return: (sql, args)
+    """
+    args: List[Any] = []
+
+    def arg(value: Any, cast: str) -> str:
+        args.append(value)
+        return f"${len(args)}::{cast}"
+
+    conditions = []
+    if group_id is not None:
+        conditions.append(f'"group_id" = {arg(group_id, "BIGINT")}')
+    if is_active is not None:
+        conditions.append(f'"is_active" = {arg(is_active, "BOOL")}')
+    if is_superuser is not None:
+        conditions.append(f'"is_superuser" = {arg(is_superuser, "BOOL")}')
+    if created_after is not None:
+        conditions.append(f'"created_at" >= {arg(created_after, "TIMESTAMPTZ")}')
+    if created_before is not None:
+        conditions.append(f'"created_at" < {arg(created_before, "TIMESTAMPTZ")}')
+    rank = ""
+    if q:
+        keyword = arg(q, "TEXT")
+        pattern = arg("%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%", "TEXT")
+        matches = [f'"{column}" ILIKE {pattern}' for column in USER_SEARCH_COLUMNS]
+        if trigram:
+            matches += [f'{keyword} <% "{column}"' for column in USER_SEARCH_COLUMNS]
+            # GREATEST 忽略 NULL（昵称/邮箱为空）
+            scores = ", ".join(f'word_similarity({keyword}, "{column}")' for column in USER_SEARCH_COLUMNS)
+            rank = f"GREATEST({scores}) DESC, "
+        conditions.append("(" + " OR ".join(matches) + ")")
+        order = f'{rank}"id" DESC'
+    else:
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            conditions.append(f'("created_at", "id") < ({arg(created_at, "TIMESTAMPTZ")}, {arg(last_id, "BIGINT")})')
+        order = '"created_at" DESC, "id" DESC'
+    where = f' WHERE {" AND ".join(conditions)}' if conditions else ""
+    return f'SELECT * FROM "example_user"{where} ORDER BY {order} LIMIT {arg(limit, "INT")}', args
+
+
 # TODO：================= 用户 & 用户组 =======================#
 class UserService:
     # TODO 示例：用户 Service
 
     @staticmethod
     async def create_user(user: UserIn):
-        user_obj = await ExampleUser.create(**user.dict())
+        data = user.dict()
+        if data.get("password"):
+            data["password"] = await PasswordHasher().hash(data["password"])
+        user_obj = await ExampleUser.create(**data)
+        await username_filter.add(user_obj.username)
         return user_obj
 
+    @staticmethod
+    async def delete_user(user: ExampleUser):
+        await user.delete()
+        await username_filter.record_delete()
+
+    @staticmethod
+    async def is_username_available(username: str) -> bool:
+        return await check_available(username_filter, username, ExampleUser.filter(username=username))
+
+    @staticmethod
+    async def rebuild_username_filter():
+        return await username_filter.rebuild(scan_column(ExampleUser, "username"))
+
+    @staticmethod
+    async def authenticate(username: str, password: str):
+        """
+        校验用户名密码，工作因子变更（或历史明文密码）时透明更新密码哈希
+        :param username:
+        :param password:
+        :return: 校验通过返回用户，否则返回 None
+        """
+        hasher = PasswordHasher()
+        user = await ExampleUser.filter(username=username).first()
+        if not user:
+            # 用户不存在时同样计算一次哈希，避免通过响应耗时判断用户名是否存在
+            await hasher.hash(password)
+            return None
+        ok, new_hash = await hasher.verify(password, user.password)
+        if not ok:
+            return None
+        if new_hash:
+            user.password = new_hash
+            await user.save(update_fields=["password"])
+        # 登录时间延迟批量写入
+        user.last_login = datetime.now(timezone.utc)
+        user_activity.update(user.id, last_login=user.last_login)
+        return user
+
     @staticmethod
     async def get_user(user_id: int):
-        return await ExampleUser.filter(id=user_id).first()
+        user = await ExampleUser.filter(id=user_id).first()
+        user_activity.apply(user)
+        return user
 
     @staticmethod
     async def get_users():
-        return await ExampleUser.all()
+        users = await ExampleUser.all()
+        user_activity.apply(*users)
+        return users
+
+    @staticmethod
+    async def search_users(q: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50,
+                           **filters: Any) -> Tuple[List[ExampleUser], Optional[str]]:
+        """
+        用户检索（过滤 + 模糊匹配），见 build_user_search_query
+        :param q: 模糊匹配关键字
+        :param cursor: 分页游标
+        :param limit: 返回条数
+        :param filters: group_id / is_active / is_superuser / created_after / created_before
+        :return: (用户列表, 下一页游标)；模糊匹配或已无更多数据时游标为 None
+        """
+        global _trgm_installed
+        db = ExampleUser._choose_db()
+        if q and _trgm_installed is None:
+            _, rows = await db.execute_query("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trgm_installed = bool(rows)
+            if not _trgm_installed:
+                LOG.warning("pg_trgm not installed, user search falls back to ILIKE (run init_data.py)")
+        # 多取一条判断是否还有下一页
+        sql, args = build_user_search_query(q, cursor=cursor, limit=limit + 1, trigram=bool(_trgm_installed),
+                                            **filters)
+        users = [ExampleUser._init_from_db(**row) for row in await db.execute_query_dict(sql, args)]
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            if not q:
+                next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+        user_activity.apply(*users)
+        return users, next_cursor
 
     @staticmethod
     async def update_user1(user_id: int):
@@ -60,4 +272,26 @@ class GroupService:
     @staticmethod
     async def create_group(group: GroupIn):
         group_obj = await ExampleGroup.create(**group.dict())
+        await group_name_filter.add(group_obj.name)
         return group_obj
+
+    @staticmethod
+    async def delete_group(group: ExampleGroup):
+        await group.delete()
+        await group_name_filter.record_delete()
+
+    @staticmethod
+    async def is_group_name_available(name: str) -> bool:
+        return await check_available(group_name_filter, name, ExampleGroup.filter(name=name))
+
+    @staticmethod
+    async def rebuild_group_name_filter():
+        return await group_name_filter.rebuild(scan_column(ExampleGroup, "name"))
+
+    @staticmethod
+    async def get_group(group_id: int):
+        return await ExampleGroup.filter(id=group_id).first()
+
+    @staticmethod
+    async def get_groups():
+        return await ExampleGroup.all()
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+from fastapi import HTTPException, Query, status
+
+from app.models.examples import ExampleGroup, ExampleUser
+from app.services.examples import user_activity
+
+# ========================================
+# 说明: DataLoader 批量查询（请求级）
+#    * 同一事件循环轮次内发起的多个 load(id) 合并为一次 WHERE id IN (...) 查询，结果按 id 分发
+#    * 请求内按 id 缓存结果（同一 id 只查询一次），Loaders 作为 FastAPI 依赖，每个请求一个实例，不跨请求共享
+#    * 单次查询最多 max_batch_size 个 id，超出时拆分为多次查询并发执行
+# ========================================
+
+# 批量查询接口单次最多 id 数
+MAX_BATCH_IDS = 500
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    批量加载器：batch_load_fn 接收 id 列表，返回 id -> 对象（不存在的 id 不返回）
+    """
+
+    def __init__(self, batch_load_fn: Callable[[List[K]], Awaitable[Dict[K, V]]], max_batch_size: int = 500):
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self._tasks = set()
+
+    def _schedule(self, key: K) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                # 当前轮次结束后统一发起查询
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for i in range(0, len(keys), self.max_batch_size):
+            task = asyncio.create_task(self._load_batch(keys[i:i + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, keys: List[K]) -> None:
+        try:
+            values = await self.batch_load_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # 查询失败不缓存，后续 load 重新查询
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(values.get(key))
+
+    async def load(self, key: K) -> Optional[V]:
+        """
+        按 id 加载，不存在时返回 None
+        :param key:
+        :return:
+        """
+        return await self._schedule(key)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        """
+        按 id 批量加载，结果顺序与 keys 一致，不存在的 id 对应 None
+        :param keys:
+        :return:
+        """
+        return list(await asyncio.gather(*(self._schedule(key) for key in keys)))
+
+
+async def load_users(ids: List[int]) -> Dict[int, ExampleUser]:
+    users = await ExampleUser.filter(id__in=ids)
+    user_activity.apply(*users)
+    return {user.id: user for user in users}
+
+
+async def load_groups(ids: List[int]) -> Dict[int, ExampleGroup]:
+    return {group.id: group for group in await ExampleGroup.filter(id__in=ids)}
+
+
+class Loaders:
+    """
+    请求级加载器集合，作为 FastAPI 依赖注入：loaders: Loaders = Depends()
+    """
+
+    def __init__(self):
+        self.users: DataLoader[int, ExampleUser] = DataLoader(load_users)
+        self.groups: DataLoader[int, ExampleGroup] = DataLoader(load_groups)
+
+
+def batch_ids(ids: str = Query(..., description=f"ID 列表，逗号分隔，最多 {MAX_BATCH_IDS} 个",
+                               examples=["1,2,3"])) -> List[int]:
+    """
+    批量查询接口参数：ids=1,2,3（FastAPI 依赖）
+    :param ids:
+    :return:
+    """
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids 须为逗号分隔的整数")
+    if not values or len(values) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"ids 数量须为 1 ~ {MAX_BATCH_IDS}")
+    return values
@@ -0,0 +1,19 @@
+import datetime
+
+from app.core.scheduler import scheduler
+from app.core.websockets import ExampleWebsocket
+
+
+# ========================================
+# 说明: 进程内定时任务（@scheduler.job）
+#    由 FastAPI Worker 中选举出的 Leader 直接在事件循环中执行，不依赖 Celery（Web 进程启动时无需加载 Celery）
+# ========================================
+
+
+@scheduler.job(interval=5)
+async def push_websocket_data():
+    """
+    # TODO 示例：定时推送 Websocket 消息（每 5 秒）
+    """
+    await ExampleWebsocket().broadcast_to_channel(ExampleWebsocket.channel,
+                                                  f"TODO 示例：当前时间（周期任务）: {datetime.datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
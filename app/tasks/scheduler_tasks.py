@@ -1,14 +1,13 @@
-import asyncio
 import datetime
 
 from celery import shared_task
 
-from app.core.utils import AsyncLoopCreator
-from app.core.websockets import ExampleWebsocket
+from app.core.utils import async_task
+from app.tasks import jobs
 
 
 # ========================================
-# 说明: Celery 周期性任务
+# 说明: Celery 周期性任务（beat_schedule 见 app.core.celery_config；进程内定时任务见 app.tasks.jobs）
 # ========================================
 
 
@@ -20,12 +19,5 @@ def get_current_time():
     print(f"TODO 示例：当前时间（周期任务）: {datetime.datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
 
 
-@shared_task()
-def push_websocket_data():
-    """
-    # TODO 示例：定时推送 Websocket 消息
-    """
-    asyncio.run_coroutine_threadsafe(
-        ExampleWebsocket().broadcast_to_channel(ExampleWebsocket.channel,
-                                                f"TODO 示例：当前时间（周期任务）: {datetime.datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}"),
-        AsyncLoopCreator.get_loop())
\ No newline at end of file
+# TODO 示例：定时推送 Websocket 消息，由进程内调度执行（见 app.tasks.jobs），同时注册为 Celery 协程任务，可按需投递
+push_websocket_data = async_task(orm=False, name="app.tasks.scheduler_tasks.push_websocket_data")(jobs.push_websocket_data)
@@ -1,5 +1,9 @@
+from typing import Optional
+
 from celery import shared_task
 
+from app.core.batch import batch_task
+
 
 # ========================================
 # 说明: Celery 异步任务
@@ -11,3 +15,16 @@ def eg_task():
     # TODO 示例：异步任务
     """
     print('TODO 示例：异步任务')
+
+
+@batch_task(size=500, max_wait=1.0)
+async def eg_batch_task(items: list) -> Optional[dict]:
+    """
+    # TODO 示例：批量任务，高频事件按 500 条或 1 秒聚合后批量处理，返回失败条目（索引 -> 错误）
+    """
+    failures = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            failures[index] = ValueError("Invalid item")
+    print(f'TODO 示例：批量任务，处理事件 {len(items)} 条，失败 {len(failures)} 条')
+    return failures
@@ -0,0 +1,11 @@
+# ========================================
+# 说明: HTTP 接口基准测试套件（/api/v1/examples/ 下的 CRUD、Redis、Celery 示例接口）
+#    * inprocess：httpx ASGITransport 直接调用 ASGI 应用（同 tests/conftest.py），不经过网络
+#    * uvicorn：启动 uvicorn 子进程（benchmarks.api.server），通过本地 TCP 请求
+#    * 依赖替身见 benchmarks.api.standins（SQLite / 本地 PostgreSQL、fakeredis、Celery eager）
+#    * 每个接口输出 req/s、p50 / p95 / p99 延迟及每请求内存分配（inprocess 模式，tracemalloc），
+#      与基线（baseline.json）比较，吞吐下降或延迟/内存分配上升超过 --tolerance 时返回非 0
+#
+# 运行：python -m benchmarks.api --requests 500 --concurrency 10
+#      python -m benchmarks.api --update-baseline   # 在基准机器上更新基线
+# ========================================
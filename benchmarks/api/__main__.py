@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.api import standins
+from benchmarks.api.scenarios import SCENARIOS, Scenario, setup
+
+BASELINE = Path(__file__).with_name("baseline.json")
+# 参与基线比较的指标：(字段, 越大越好)
+COMPARED = (("rps", True), ("p95_ms", False), ("alloc_kib", False))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+async def _request(client: httpx.AsyncClient, scenario: Scenario, index: int, ctx: Dict[str, Any]) -> httpx.Response:
+    path, body = scenario.render(index, ctx)
+    return await client.request(scenario.method, path, json=body)
+
+
+async def measure(client: httpx.AsyncClient, scenario: Scenario, ctx: Dict[str, Any], requests: int,
+                  concurrency: int, warmup: int) -> Dict[str, Any]:
+    """
+    预热后由 concurrency 个协程共发送 requests 个请求（闭环），统计吞吐及延迟分位数
+    """
+    for i in range(warmup):
+        await _request(client, scenario, i, ctx)
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while (index := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await _request(client, scenario, warmup + index, ctx)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+    }
+
+
+async def measure_allocations(client: httpx.AsyncClient, scenario: Scenario, ctx: Dict[str, Any],
+                              requests: int) -> Dict[str, Any]:
+    """
+    顺序发送请求，tracemalloc 统计每个请求期间的内存分配峰值（含 httpx 客户端）及请求结束后仍未释放的内存
+    """
+    tracemalloc.start()
+    try:
+        peaks = []
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(requests):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await _request(client, scenario, 10 ** 6 + i, ctx)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {"alloc_kib": round(sum(peaks) / len(peaks) / 1024, 2),
+            "retained_kib": round(retained / requests / 1024, 3)}
+
+
+async def run_scenarios(client: httpx.AsyncClient, mode: str, args, postgres: bool) -> List[Dict[str, Any]]:
+    ctx = await setup(client, f"{mode[0]}{int(time.time()) % 10 ** 6}")
+    results = []
+    for scenario in SCENARIOS:
+        if args.only and scenario.name not in args.only:
+            continue
+        if scenario.postgres_only and not postgres:
+            continue
+        requests = max(int(args.requests * scenario.weight), args.concurrency)
+        result = {"mode": mode, "endpoint": scenario.name,
+                  **await measure(client, scenario, ctx, requests, args.concurrency, args.warmup)}
+        if mode == "inprocess" and args.alloc_requests:
+            result.update(await measure_allocations(client, scenario, ctx,
+                                                    max(int(args.alloc_requests * scenario.weight), 1)))
+        results.append(result)
+    return results
+
+
+async def run_inprocess(args, db_url: str) -> List[Dict[str, Any]]:
+    standins.install(db_url)
+
+    from asgi_lifespan import LifespanManager
+
+    from app.main import app
+
+    async with LifespanManager(app, startup_timeout=60, shutdown_timeout=60):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_scenarios(client, "inprocess", args, standins.is_postgres(db_url))
+
+
+async def run_uvicorn(args, db_url: str) -> List[Dict[str, Any]]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.api.server", "--db-url", db_url, "--port", str(port)],
+                            stdout=subprocess.DEVNULL)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            deadline = time.perf_counter() + 60
+            while True:
+                try:
+                    if (await client.get("/health/live")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if proc.poll() is not None or time.perf_counter() > deadline:
+                        raise RuntimeError("uvicorn server did not start")
+                    await asyncio.sleep(0.1)
+            return await run_scenarios(client, "uvicorn", args, standins.is_postgres(db_url))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线比较，返回回归项
+    """
+    regressions = []
+    for result in results:
+        key = f"{result['mode']}/{result['endpoint']}"
+        if result["errors"]:
+            regressions.append(f"{key}: {result['errors']} error responses")
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        for field, higher_is_better in COMPARED:
+            value, expected = result.get(field), base.get(field)
+            if value is None or not expected:
+                continue
+            change = value / expected - 1
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{key}: {field} {expected} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 接口基准测试套件")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "all"], default="all")
+    parser.add_argument("--db-url", help="默认每种模式使用一个新的 SQLite 临时库；可指定本地 PostgreSQL")
+    parser.add_argument("--requests", type=int, default=500, help="每个接口的请求数（按接口 weight 缩放）")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-requests", type=int, default=50, help="内存分配统计的请求数，0 不统计")
+    parser.add_argument("--only", nargs="*", help="只测试指定接口（scenario 名称）")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="允许的相对退化比例（单核机器上 p95 波动可达 30%%）")
+    parser.add_argument("--update-baseline", action="store_true", help="将本次结果写入基线")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    modes = ["inprocess", "uvicorn"] if args.mode == "all" else [args.mode]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            db_url = args.db_url or f"sqlite://{os.path.join(tmp, mode + '.sqlite3')}"
+            runner = run_inprocess if mode == "inprocess" else run_uvicorn
+            results += asyncio.run(runner(args, db_url))
+
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+        baseline["meta"] = {"python": platform.python_version(), "machine": platform.machine(),
+                            "cpus": os.cpu_count(), "requests": args.requests, "concurrency": args.concurrency,
+                            "db": "postgres" if args.db_url and standins.is_postgres(args.db_url) else "sqlite"}
+        baseline["results"].update({f"{r['mode']}/{r['endpoint']}": {field: r.get(field) for field, _ in COMPARED}
+                                    for r in results})
+        args.baseline.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n")
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline first")
+        return
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
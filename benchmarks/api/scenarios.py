@@ -0,0 +1,97 @@
+import itertools
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Union
+
+from httpx import AsyncClient
+
+# ========================================
+# 说明: 被测接口（/api/v1/examples/ 下的 CRUD、Redis、Celery 示例接口及 /health/live）
+#    * 路径及请求体可为函数（参数：序号、上下文），保证创建类接口每次请求的用户名/组名唯一
+#    * weight：请求数相对 --requests 的比例（密码哈希等 CPU 密集接口按比例减少请求数）
+#    * postgres_only：仅在 PostgreSQL 下测试（pg_trgm 检索、延迟写入的 UPDATE ... FROM VALUES）
+#    * 不包含 Redis 锁示例（固定 sleep 15 / 30 秒）
+# ========================================
+
+PREFIX = "/api/v1/examples"
+# 预置数据：用户数（创建时计算密码哈希，数量不宜过大）
+SETUP_USERS = 20
+PASSWORD = "Passw0rd@123"
+
+Template = Union[str, Callable[[int, Dict[str, Any]], Any]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Template
+    body: Optional[Template] = None
+    weight: float = 1.0
+    postgres_only: bool = False
+
+    def render(self, index: int, ctx: Dict[str, Any]):
+        path = self.path(index, ctx) if callable(self.path) else self.path
+        body = self.body(index, ctx) if callable(self.body) else self.body
+        return path, body
+
+
+def _user_id(index: int, ctx: Dict[str, Any]) -> int:
+    return ctx["user_ids"][index % len(ctx["user_ids"])]
+
+
+def _unique(prefix: str, ctx: Dict[str, Any]) -> str:
+    # 同一次运行内唯一（预热与正式请求、进程内与 uvicorn 模式共用计数）
+    return f"{prefix}{ctx['run']}-{next(ctx['counter'])}"
+
+
+SCENARIOS = [
+    Scenario("health_live", "GET", "/health/live"),
+    Scenario("users_list", "GET", f"{PREFIX}/users/"),
+    Scenario("users_get", "GET", lambda i, ctx: f"{PREFIX}/users/{_user_id(i, ctx)}"),
+    Scenario("users_batch", "GET", lambda i, ctx: f"{PREFIX}/users/batch?ids=" + ",".join(map(str, ctx["user_ids"]))),
+    Scenario("users_availability", "GET",
+             lambda i, ctx: f"{PREFIX}/users/availability?username={ctx['usernames'][i % len(ctx['usernames'])]}"),
+    Scenario("users_search", "GET", lambda i, ctx: f"{PREFIX}/users/search?group_id={ctx['group_id']}&q=bench",
+             postgres_only=True),
+    Scenario("users_create", "POST", f"{PREFIX}/users/",
+             lambda i, ctx: {"username": _unique("c", ctx)[:20], "password": PASSWORD, "group_id": ctx["group_id"]},
+             weight=0.2),
+    Scenario("users_update", "PUT", lambda i, ctx: f"{PREFIX}/users/{_user_id(i, ctx)}",
+             lambda i, ctx: {"nickname": f"bench-{i}"}),
+    Scenario("users_login", "POST", f"{PREFIX}/users/login",
+             lambda i, ctx: {"username": ctx["usernames"][i % len(ctx["usernames"])], "password": PASSWORD},
+             weight=0.2, postgres_only=True),
+    Scenario("groups_list", "GET", f"{PREFIX}/groups/"),
+    Scenario("groups_get", "GET", lambda i, ctx: f"{PREFIX}/groups/{ctx['group_id']}"),
+    Scenario("groups_create", "POST", f"{PREFIX}/groups/", lambda i, ctx: {"name": _unique("bench-g", ctx)}),
+    Scenario("redis_cache", "GET", f"{PREFIX}/others/redis/cache"),
+    # fakeredis 的 BITCOUNT 为纯 Python 实现（1.2MB 位图），耗时远高于 Redis
+    Scenario("redis_bloom_stats", "GET", f"{PREFIX}/others/redis/bloom/stats", weight=0.2),
+    Scenario("celery_task", "GET", f"{PREFIX}/others/tasks"),
+    Scenario("celery_task_idempotent", "GET", lambda i, ctx: f"{PREFIX}/others/tasks?idempotency_key=k{i % 10}"),
+    Scenario("celery_batch_task", "GET", f"{PREFIX}/others/tasks/batch"),
+    Scenario("ws_push", "GET", f"{PREFIX}/others/ws/push"),
+]
+
+
+async def setup(client: AsyncClient, run: str) -> Dict[str, Any]:
+    """
+    预置数据：1 个用户组、SETUP_USERS 个用户（经由接口创建），并重建布隆过滤器
+    :param client:
+    :param run: 运行标识（用户名/组名前缀，重复运行时避免冲突）
+    :return: 上下文
+    """
+    response = await client.post(f"{PREFIX}/groups/", json={"name": f"bench-{run}"})
+    response.raise_for_status()
+    group_id = response.json()["id"]
+    user_ids, usernames = [], []
+    for i in range(SETUP_USERS):
+        username = f"b{run}-{i}"[:20]
+        response = await client.post(f"{PREFIX}/users/", json={"username": username, "nickname": f"bench {i}",
+                                                               "password": PASSWORD, "group_id": group_id})
+        response.raise_for_status()
+        user_ids.append(response.json()["id"])
+        usernames.append(username)
+    (await client.post(f"{PREFIX}/others/redis/bloom/rebuild")).raise_for_status()
+    return {"run": run, "group_id": group_id, "user_ids": user_ids, "usernames": usernames,
+            "counter": itertools.count()}
@@ -0,0 +1,27 @@
+import argparse
+
+from benchmarks.api import standins
+
+
+# ========================================
+# 说明: 基准测试 uvicorn 服务进程（由 python -m benchmarks.api --mode uvicorn 启动）
+#    安装依赖替身后再导入应用，单 Worker，HTTP / 事件循环实现由 uvicorn 自动选择
+# ========================================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基准测试 uvicorn 服务进程")
+    parser.add_argument("--db-url", required=True)
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+    standins.install(args.db_url)
+
+    import uvicorn
+
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
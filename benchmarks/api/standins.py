@@ -0,0 +1,78 @@
+import os
+
+# ========================================
+# 说明: 基准测试依赖替身（须在导入 app.main 之前调用 install）
+#    * 数据库：SQLite 文件库（默认）或本地 PostgreSQL（--db-url postgres://...，使用项目 asyncpg 引擎及连接池配置），启动时生成表结构
+#    * Redis：fakeredis 内存实现（含 Lua），所有事件循环共享同一份数据
+#    * Celery：task_always_eager，任务在请求内同步执行，不需要 Broker / Worker
+#    * 关闭与被测接口无关的后台任务（进程内定时调度、健康探测、请求日志），减少干扰
+#    * 关闭限流（压测请求均来自同一 IP，限流开销见 benchmarks/rate_limit.py）
+# ========================================
+
+ENVIRONMENT = {
+    "DB_GENERATE_SCHEMAS": "true",
+    "CELERY_TASK_ALWAYS_EAGER": "true",
+    "SCHEDULER_ENABLED": "false",
+    "HEALTH_CHECK_INTERVAL": "3600",
+    "REQUEST_TIMING_LOG": "false",
+    "PROFILER_ENABLED": "false",
+    "RATE_LIMIT_ENABLED": "false",
+}
+
+
+def is_postgres(db_url: str) -> bool:
+    return db_url.startswith(("postgres://", "asyncpg://"))
+
+
+def install(db_url: str) -> None:
+    """
+    配置环境变量、数据库连接及内存 Redis
+    :param db_url: SQLite / PostgreSQL 连接地址
+    :return:
+    """
+    os.environ.update(ENVIRONMENT)
+    if not is_postgres(db_url):
+        # LISTEN/NOTIFY 仅支持 PostgreSQL
+        os.environ["CHANGE_FEED_ENABLED"] = "false"
+
+    from tortoise.backends.base.config_generator import expand_db_url
+
+    from app import settings
+
+    connections = settings.TORTOISE_ORM["connections"]
+    if is_postgres(db_url):
+        # 沿用项目引擎（连接池指标）及连接池参数，仅替换地址
+        credentials = {**connections["default"]["credentials"], **expand_db_url(db_url)["credentials"]}
+        config = {"engine": "app.core.db", "credentials": credentials}
+    else:
+        config = expand_db_url(db_url)
+    connections.clear()
+    connections["default"] = config
+    settings.TORTOISE_ORM["routers"] = []
+    install_fake_redis()
+
+
+def install_fake_redis() -> None:
+    """
+    Redis 连接池替换为 fakeredis（每个事件循环一个连接池，共享同一个 FakeServer）
+    :return:
+    """
+    import asyncio
+
+    import redis.asyncio as aioredis
+    from fakeredis import FakeServer
+    from fakeredis.aioredis import FakeConnection
+
+    from app.core import redis
+
+    server = FakeServer()
+
+    def get_redis_pool() -> aioredis.ConnectionPool:
+        loop = asyncio.get_running_loop()
+        pool = redis._pools.get(loop)
+        if pool is None:
+            pool = redis._pools[loop] = aioredis.ConnectionPool(connection_class=FakeConnection, server=server,
+                                                                max_connections=5000, decode_responses=True)
+        return pool
+
+    redis.get_redis_pool = get_redis_pool
@@ -0,0 +1,105 @@
+import os
+
+# eventlet 需要在导入其他模块之前打补丁，由主进程通过环境变量控制
+if os.environ.get("BENCH_POOL") == "eventlet":
+    import eventlet
+
+    eventlet.monkey_patch()
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+from app.core.redis import get_redis_client
+from app.core.utils import AsyncLoopCreator
+
+
+# ========================================
+# 说明: Celery 协程任务吞吐量基准测试
+#    对比两种执行方式（任务体直接调用，不经过 Broker，只衡量 Worker 侧开销）：
+#    * asyncio.run：每个任务新建并销毁一个事件循环（以及其中的 Redis 连接池）
+#    * shared-loop：async_task 使用的 AsyncLoopCreator 共享事件循环 + 按循环缓存的连接池
+#    分别在 prefork（多进程，进程内串行）与 eventlet（单进程，协程并发）模式下运行
+#
+# 运行：python -m benchmarks.async_tasks --tasks 2000 --concurrency 50 [--redis]
+# ========================================
+
+
+async def _work(use_redis: bool) -> None:
+    """
+    模拟任务体：一次 Redis PING（--redis）或 1ms I/O 等待
+    """
+    if use_redis:
+        async with get_redis_client() as rs:
+            await rs.ping()
+    else:
+        await asyncio.sleep(0.001)
+
+
+def _run_tasks(mode: str, n: int, use_redis: bool) -> int:
+    """
+    串行执行 n 个任务，返回失败数（eventlet 下并发 asyncio.run 会报 "cannot be called from a running event loop"）
+    """
+    errors = 0
+    for _ in range(n):
+        try:
+            if mode == "asyncio.run":
+                asyncio.run(_work(use_redis))
+            else:
+                AsyncLoopCreator.run(_work(use_redis), timeout=30)
+        except Exception:
+            errors += 1
+    return errors
+
+
+def _bench_prefork(mode: str, tasks: int, concurrency: int, use_redis: bool) -> tuple:
+    per_proc = tasks // concurrency
+    with Pool(concurrency) as pool:
+        # 预热：创建子进程
+        pool.starmap(_run_tasks, [(mode, 1, use_redis)] * concurrency)
+        start = time.perf_counter()
+        errors = sum(pool.starmap(_run_tasks, [(mode, per_proc, use_redis)] * concurrency))
+        return per_proc * concurrency / (time.perf_counter() - start), errors
+
+
+def _bench_eventlet(mode: str, tasks: int, concurrency: int, use_redis: bool) -> tuple:
+    import eventlet
+
+    _run_tasks(mode, 1, use_redis)
+    pool = eventlet.GreenPool(concurrency)
+    start = time.perf_counter()
+    errors = sum(pool.imap(lambda _: _run_tasks(mode, 1, use_redis), range(tasks)))
+    return tasks / (time.perf_counter() - start), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery 协程任务吞吐量基准测试")
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="任务体执行真实 Redis PING")
+    parser.add_argument("--pool", choices=["prefork", "eventlet"], default=None)
+    args = parser.parse_args()
+
+    if args.pool is None:
+        # 每种 pool 在独立子进程中运行，避免 eventlet 补丁影响 prefork 测试
+        for pool in ("prefork", "eventlet"):
+            cmd = [sys.executable, "-m", "benchmarks.async_tasks", "--pool", pool,
+                   "--tasks", str(args.tasks), "--concurrency", str(args.concurrency)]
+            if args.redis:
+                cmd.append("--redis")
+            subprocess.run(cmd, check=True, env={**os.environ, "BENCH_POOL": pool})
+        return
+
+    bench = _bench_prefork if args.pool == "prefork" else _bench_eventlet
+    for mode in ("asyncio.run", "shared-loop"):
+        rate, errors = bench(mode, args.tasks, args.concurrency, args.redis)
+        print(json.dumps({"pool": args.pool, "mode": mode, "tasks": args.tasks, "concurrency": args.concurrency,
+                          "tasks_per_s": round(rate, 1), "errors": errors}))
+
+
+if __name__ == '__main__':
+    main()
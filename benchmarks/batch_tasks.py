@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+
+from app.core.utils import AsyncLoopCreator
+from app.tasks import tasks
+
+
+# ========================================
+# 说明: 批量任务 vs 单事件单任务 基准测试（需要本地 Redis，作为 Broker 及批量队列）
+#    * 生产者：单事件单任务（apply_async 投递 N 条消息） vs 批量任务（N 次 enqueue，约 N/size 条消息）
+#    * Worker：N 次任务执行（apply，包含 Celery 单任务调度开销） vs flush 分块处理，统计 CPU 时间
+#
+# 运行：python -m benchmarks.batch_tasks --events 20000
+# ========================================
+
+
+def _measure(func):
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - wall, time.process_time() - cpu, result
+
+
+def bench_per_event(events: int) -> dict:
+    publish_wall, publish_cpu, _ = _measure(lambda: [tasks.eg_task.apply_async() for _ in range(events)])
+    work_wall, work_cpu, _ = _measure(lambda: [tasks.eg_task.apply() for _ in range(events)])
+    return {"mode": "per-event", "events": events, "broker_messages": events,
+            "events_per_s": round(events / publish_wall, 1), "producer_cpu_s": round(publish_cpu, 3),
+            "worker_cpu_s": round(work_cpu, 3), "worker_events_per_s": round(events / work_wall, 1)}
+
+
+def bench_batched(events: int) -> dict:
+    batch = tasks.eg_batch_task
+    published = []
+    # 统计实际投递的 flush 消息数，不真正投递（由下方 flush 在本进程内处理）
+    batch.flush_task.apply_async = lambda *args, **kwargs: published.append(kwargs)
+
+    async def produce():
+        for i in range(events):
+            await batch.enqueue({"event": "bench", "id": i})
+
+    publish_wall, publish_cpu, _ = _measure(lambda: AsyncLoopCreator.run(produce()))
+    work_wall, work_cpu, stats = _measure(lambda: AsyncLoopCreator.run(batch.flush()))
+    return {"mode": "batched", "events": events, "broker_messages": len(published),
+            "events_per_s": round(events / publish_wall, 1), "producer_cpu_s": round(publish_cpu, 3),
+            "worker_cpu_s": round(work_cpu, 3), "worker_events_per_s": round(events / work_wall, 1),
+            "flush": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量任务 vs 单事件单任务 基准测试")
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+    for bench in (bench_per_event, bench_batched):
+        print(json.dumps(bench(args.events), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
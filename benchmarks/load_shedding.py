@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import time
+
+
+# ========================================
+# 说明: 自适应并发限制（过载保护）饱和基准测试
+#    * 直接调用 ASGI 应用（不经过网络）；处理函数占用容量为 --pool 的"连接池"（Semaphore）并执行 --service-ms 毫秒，
+#      模拟数据库变慢时请求堆积在连接池上
+#    * 客户端按 --rate 开环发送请求（超过服务能力 pool / service-ms），等待 --client-timeout 秒后放弃，
+#      并通过请求头 X-Request-Timeout 告知服务端；客户端放弃后服务端处理函数仍继续运行（与真实断连一致）
+#    * 对比有无 ConcurrencyLimitMiddleware：有效吞吐（客户端超时前收到 200）、成功请求延迟、
+#      被拒绝（503/504）请求数、客户端已放弃但服务端仍完成的无效处理数
+#
+# 运行：python -m benchmarks.load_shedding --rate 1500 --duration 5 --pool 20 --service-ms 20
+# ========================================
+
+
+def build(with_limit: bool, pool: int, service_ms: float, stats: dict):
+    from fastapi import FastAPI
+
+    from app import settings
+    from app.core.concurrency import ConcurrencyLimitMiddleware
+
+    application = FastAPI()
+    connections = asyncio.Semaphore(pool)
+
+    @application.get(f"/api/{settings.VERSION}/examples/users/{{user_id}}")
+    async def get_user(user_id: int):
+        async with connections:
+            await asyncio.sleep(service_ms / 1000)
+        stats["handled"] += 1
+        return {"id": user_id}
+
+    if with_limit:
+        application.add_middleware(ConcurrencyLimitMiddleware)
+    return application
+
+
+_servers = set()
+
+
+async def _request(app, path: str, client_timeout: float) -> int:
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [(b"x-request-timeout", str(client_timeout).encode())],
+             "scheme": "http", "server": ("testserver", 80), "http_version": "1.1", "client": ("127.0.0.1", 12345)}
+    status = asyncio.get_running_loop().create_future()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and not status.done():
+            status.set_result(message["status"])
+
+    # 客户端超时放弃时不取消服务端任务
+    server = asyncio.create_task(app(scope, receive, send))
+    _servers.add(server)
+    server.add_done_callback(_servers.discard)
+    try:
+        return await asyncio.wait_for(status, client_timeout)
+    except asyncio.TimeoutError:
+        return 0
+
+
+async def run(with_limit: bool, rate: float, duration: float, pool: int, service_ms: float,
+              client_timeout: float) -> dict:
+    from app import settings
+    from app.core import concurrency
+
+    concurrency._limiters.clear()
+    stats = {"handled": 0}
+    app = build(with_limit, pool, service_ms, stats)
+    path = f"/api/{settings.VERSION}/examples/users/1"
+    results = []
+
+    async def client():
+        start = time.perf_counter()
+        code = await _request(app, path, client_timeout)
+        results.append((code, time.perf_counter() - start))
+
+    clients = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        clients.append(asyncio.create_task(client()))
+    await asyncio.gather(*clients)
+    # 等待客户端已放弃的服务端处理完成
+    await asyncio.gather(*_servers)
+    ok = sorted(elapsed for code, elapsed in results if code == 200)
+    succeeded = len(ok)
+    return {
+        "mode": "limited" if with_limit else "unlimited",
+        "sent": len(results),
+        "goodput_rps": round(succeeded / duration, 1),
+        "ok": succeeded,
+        "rejected_503": sum(1 for code, _ in results if code == 503),
+        "cancelled_504": sum(1 for code, _ in results if code == 504),
+        "client_timeout": sum(1 for code, _ in results if code == 0),
+        "wasted_handlers": stats["handled"] - succeeded,
+        "ok_p50_ms": round(ok[len(ok) // 2] * 1000, 1) if ok else None,
+        "ok_p99_ms": round(ok[int(len(ok) * 0.99)] * 1000, 1) if ok else None,
+        "final_limit": round(concurrency._limiters["users"].limit, 1) if with_limit else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应并发限制（过载保护）饱和基准测试")
+    parser.add_argument("--rate", type=float, default=1500, help="每秒请求数")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--pool", type=int, default=20, help="连接池容量")
+    parser.add_argument("--service-ms", type=float, default=20, help="单次查询耗时（毫秒）")
+    parser.add_argument("--client-timeout", type=float, default=1, help="客户端等待时长（秒）")
+    args = parser.parse_args()
+    print(f"capacity ~ {args.pool / args.service_ms * 1000:.0f} rps, offered {args.rate:.0f} rps")
+    for with_limit in (False, True):
+        print(json.dumps(asyncio.run(run(with_limit, args.rate, args.duration, args.pool, args.service_ms,
+                                         args.client_timeout))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# ========================================
+# 说明: 日志管道对事件循环延迟的影响基准测试
+#    * sync：原方案，根 logger 直接挂载 StreamHandler，在事件循环线程中格式化并写入
+#    * queue：app.core.logger 方案，事件循环线程只入队，后台线程格式化并写入
+#    多个协程持续高频写日志，同时探测协程每 1ms 唤醒一次，统计唤醒延迟（事件循环延迟）；
+#    --slow-write-ms 模拟 stdout 写入阻塞（如容器日志驱动背压）
+#
+# 运行：python -m benchmarks.log_pipeline --duration 5 --writers 20 --slow-write-ms 0.2
+# ========================================
+
+
+class SlowSink:
+    """
+    写入 /dev/null，每次写入阻塞 delay 秒
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+        self._null = open(os.devnull, "w")
+
+    def write(self, data: str) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += 1
+        self._null.write(data)
+
+    def flush(self) -> None:
+        self._null.flush()
+
+
+def setup(mode: str, sink: SlowSink) -> logging.Logger:
+    if mode == "sync":
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(process)d - %(module)s - %(funcName)s - line:%(lineno)d - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        return root
+    from app.core import logger
+    logger.stream_handler.setStream(sink)
+    return logger.LOG
+
+
+async def run(mode: str, duration: float, writers: int, slow_write_ms: float) -> dict:
+    sink = SlowSink(slow_write_ms / 1000)
+    log = setup(mode, sink)
+    stop = time.perf_counter() + duration
+    emitted = 0
+
+    async def writer(index: int):
+        nonlocal emitted
+        while time.perf_counter() < stop:
+            log.info(f"writer={index} emitted={emitted} payload={'x' * 64}")
+            emitted += 1
+            await asyncio.sleep(0)
+
+    lags = []
+
+    async def probe():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    await asyncio.gather(probe(), *(writer(i) for i in range(writers)))
+    lags.sort()
+    return {
+        "mode": mode,
+        "slow_write_ms": slow_write_ms,
+        "emitted": emitted,
+        "written": sink.lines,
+        # 队列满时丢弃的条数（仅 queue 方案）
+        "dropped": sys.modules["app.core.logger"].AsyncQueueHandler.dropped if mode == "queue" else 0,
+        "loop_lag_ms": {
+            "p50": round(lags[len(lags) // 2], 3),
+            "p99": round(lags[int(len(lags) * 0.99)], 3),
+            "max": round(lags[-1], 3),
+            "mean": round(statistics.fmean(lags), 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志管道对事件循环延迟的影响基准测试")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--slow-write-ms", type=float, default=0.2)
+    parser.add_argument("--mode", choices=["sync", "queue"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(asyncio.run(run(args.mode, args.duration, args.writers, args.slow_write_ms))))
+        return
+    # 每种方案在独立子进程中运行（日志配置在导入时生效）；关闭限流以对比相同日志量
+    for mode in ("sync", "queue"):
+        subprocess.run([sys.executable, "-m", "benchmarks.log_pipeline", "--mode", mode,
+                        "--duration", str(args.duration), "--writers", str(args.writers),
+                        "--slow-write-ms", str(args.slow_write_ms)],
+                       env={**os.environ, "LOG_RATE_LIMIT": "0"}, check=True)
+
+
+if __name__ == '__main__':
+    main()
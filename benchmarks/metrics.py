@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# ========================================
+# 说明: Prometheus 指标记录开销基准测试
+#    * 直接调用 ASGI 应用（不经过网络），对比有无 MetricsMiddleware 时单个请求的耗时，差值即每请求开销
+#    * 分别在单进程模式与多进程模式（PROMETHEUS_MULTIPROC_DIR，指标写入 mmap 文件）下运行
+#
+# 运行：python -m benchmarks.metrics --requests 20000
+# ========================================
+
+
+async def _measure(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/items/1", "raw_path": b"/items/1", "root_path": "",
+             "query_string": b"", "headers": [], "scheme": "http", "server": ("testserver", 80),
+             "http_version": "1.1", "client": ("127.0.0.1", 12345)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(min(requests, 1000)):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def run(requests: int) -> dict:
+    from fastapi import FastAPI
+
+    from app.core.metrics import MULTIPROCESS, MetricsMiddleware
+
+    def build(with_metrics: bool) -> FastAPI:
+        application = FastAPI()
+
+        @application.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        if with_metrics:
+            application.add_middleware(MetricsMiddleware)
+        return application
+
+    baseline = asyncio.run(_measure(build(False), requests))
+    instrumented = asyncio.run(_measure(build(True), requests))
+    return {"multiprocess": MULTIPROCESS, "requests": requests,
+            "baseline_us": round(baseline, 2), "with_metrics_us": round(instrumented, 2),
+            "overhead_us": round(instrumented - baseline, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prometheus 指标记录开销基准测试")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run(args.requests)))
+        return
+    # 多进程模式需在导入 prometheus_client 之前设置环境变量，因此每种模式在独立子进程中运行
+    with tempfile.TemporaryDirectory() as directory:
+        for env in ({}, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+            subprocess.run([sys.executable, "-m", "benchmarks.metrics", "--child", "--requests", str(args.requests)],
+                           env={**os.environ, **env}, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+
+# ========================================
+# 说明: 密码哈希对 HTTP 延迟的影响基准测试
+#    * 通过 httpx ASGITransport 在进程内调用应用：--hashers 个客户端持续请求哈希接口（模拟注册/登录），
+#      --pingers 个客户端持续请求普通接口，统计普通接口延迟 p50/p99 及哈希吞吐、哈希接口 p99
+#    * inline：在事件循环中直接计算（未使用进程池时的效果）
+#    * pool：PasswordHasher 进程池（PASSWORD_HASH_WORKERS 个进程，有界排队，繁忙时返回 503）
+#
+# 运行：python -m benchmarks.password_hashing --duration 5 --hashers 8 --pingers 8
+# ========================================
+
+
+def build(mode: str):
+    from fastapi import FastAPI, HTTPException
+
+    from app.core.passwords import PasswordHasher, PasswordHasherBusy, hash_password
+
+    application = FastAPI()
+
+    @application.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @application.post("/hash")
+    async def hash_endpoint():
+        if mode == "inline":
+            return {"hash": hash_password("Passw0rd@123")}
+        try:
+            return {"hash": await PasswordHasher().hash("Passw0rd@123")}
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503)
+
+    return application
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(int(len(values) * q), len(values) - 1)] * 1000, 2) if values else 0
+
+
+async def run(mode: str, duration: float, hashers: int, pingers: int) -> dict:
+    import httpx
+
+    from app.core.passwords import PasswordHasher
+
+    hasher = PasswordHasher()
+    if mode == "pool":
+        await hasher.start()
+    app = build(mode)
+    ping_latency, hash_latency, busy = [], [], 0
+    stop = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def hash_client():
+            nonlocal busy
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                response = await client.post("/hash")
+                if response.status_code == 200:
+                    hash_latency.append(time.perf_counter() - start)
+                else:
+                    busy += 1
+                # ASGITransport 不经过网络 I/O，主动让出事件循环
+                await asyncio.sleep(0)
+
+        async def ping_client():
+            # 按固定间隔（5ms）计划发送，延迟从计划发送时刻计算，包含等待事件循环的时间
+            scheduled = time.perf_counter()
+            while scheduled < stop:
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/ping")
+                ping_latency.append(time.perf_counter() - scheduled)
+                scheduled = max(scheduled + 0.005, time.perf_counter())
+
+        await asyncio.gather(*(hash_client() for _ in range(hashers)), *(ping_client() for _ in range(pingers)))
+    await hasher.stop()
+    return {
+        "mode": mode,
+        "workers": hasher.workers if mode == "pool" else 0,
+        "hashes_per_s": round(len(hash_latency) / duration, 1),
+        "hash_p99_ms": _percentile(hash_latency, 0.99),
+        "busy_503": busy,
+        "ping_requests": len(ping_latency),
+        "ping_p50_ms": _percentile(ping_latency, 0.5),
+        "ping_p99_ms": _percentile(ping_latency, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="密码哈希对 HTTP 延迟的影响基准测试")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--hashers", type=int, default=8, help="并发哈希客户端数")
+    parser.add_argument("--pingers", type=int, default=8, help="并发普通请求客户端数")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    for mode in ("inline", "pool"):
+        print(json.dumps(asyncio.run(run(mode, args.duration, args.hashers, args.pingers))))
+
+
+if __name__ == '__main__':
+    main()
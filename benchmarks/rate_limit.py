@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+
+
+# ========================================
+# 说明: 限流开销基准测试（需要 Redis，或 --fake-redis 使用 fakeredis 内存实现，Lua 脚本解释执行，耗时远高于 Redis）
+#    * check：--concurrency 个协程对 --callers 个调用方循环调用 RateLimiter.hit()，调用方均未超限
+#      - redis：每次检查执行一次 Lua 脚本（RATE_LIMIT_LOCAL_FRACTION=0）
+#      - prefilter：进程内预过滤（--local-fraction），统计访问 Redis 的比例
+#      - over_limit：单个调用方持续超限（每次检查均访问 Redis 并被拒绝）
+#    * middleware：直接调用 ASGI 中间件（下游为常数时间返回的应用），对比不限流 / redis / prefilter 的每请求耗时
+#    * websocket：每个连接的进程内令牌桶 TokenBucket.consume() 耗时
+#
+# 运行：python -m benchmarks.rate_limit --checks 20000 --concurrency 50 --callers 1000
+# ========================================
+
+
+def _summary(latencies: list, elapsed: float) -> dict:
+    latencies.sort()
+    return {"ops": len(latencies), "ops_per_s": round(len(latencies) / elapsed, 1),
+            "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+            "p99_us": round(latencies[max(math.ceil(0.99 * len(latencies)) - 1, 0)] * 1e6, 1)}
+
+
+async def _measure(fn, total: int, concurrency: int) -> dict:
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await fn(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summary(latencies, time.perf_counter() - start)
+
+
+def _redis_calls(limiter) -> int:
+    return int(sum(limiter._checks[result]._value.get() for result in ("allowed", "rejected")))
+
+
+async def run(args) -> list:
+    from app.core.rate_limit import RateLimiter, RateLimitMiddleware, TokenBucket
+
+    run_id = time.time_ns() % 10 ** 8
+    # 调用方未超限：容量足够大（按总检查次数），预过滤以容量的 --local-fraction 为本地预算
+    spec = f"{args.checks}/second"
+    results = []
+    for mode, fraction, callers, limit in (("redis", 0, args.callers, spec),
+                                           ("prefilter", args.local_fraction, args.callers, spec),
+                                           ("over_limit", args.local_fraction, 1, "10/minute")):
+        limiter = RateLimiter(f"bench{run_id}{mode}", limit, local_fraction=fraction)
+        rejected = 0
+
+        async def check(i):
+            nonlocal rejected
+            allowed, _ = await limiter.hit(str(i % callers))
+            rejected += not allowed
+
+        result = await _measure(check, args.checks, args.concurrency)
+        results.append({"bench": "check", "mode": mode, **result, "rejected": rejected,
+                        "redis_calls": _redis_calls(limiter)})
+
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def send(message):
+        pass
+
+    for mode, fraction in (("none", None), ("redis", 0), ("prefilter", args.local_fraction)):
+        app = ok
+        if fraction is not None:
+            app = RateLimitMiddleware(ok, spec)
+            app.limiter = RateLimiter(f"bench{run_id}mw{mode}", spec, local_fraction=fraction)
+
+        async def request(i):
+            scope = {"type": "http", "method": "GET", "path": "/api/v1/examples/users/",
+                     "client": (f"10.0.{i % args.callers // 256}.{i % 256}", 50000)}
+            await app(scope, None, send)
+
+        results.append({"bench": "middleware", "mode": mode, **await _measure(request, args.checks, args.concurrency)})
+
+    bucket = TokenBucket("1000000/second")
+    start = time.perf_counter()
+    for _ in range(args.checks):
+        bucket.consume()
+    elapsed = time.perf_counter() - start
+    results.append({"bench": "websocket", "mode": "token_bucket", "ops": args.checks,
+                    "per_message_us": round(elapsed / args.checks * 1e6, 3)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="限流开销基准测试")
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--callers", type=int, default=1000, help="调用方（IP）数")
+    parser.add_argument("--local-fraction", type=float, default=0.1, help="预过滤本地预算占容量的比例")
+    parser.add_argument("--fake-redis", action="store_true", help="使用 fakeredis 内存实现（无 Redis 时）")
+    args = parser.parse_args()
+    if args.fake_redis:
+        from benchmarks.api.standins import install_fake_redis
+        install_fake_redis()
+    for result in asyncio.run(run(args)):
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List
+
+from app.core.metrics import process_memory
+
+
+# ========================================
+# 说明: 服务进程（python -m app.server）启动耗时及 Worker 内存基准测试
+#    * preload：主进程预加载应用 + gc.freeze() 后 fork（默认配置）
+#    * preload_no_freeze：预加载，不冻结 GC
+#    * no_preload：每个 Worker fork 后各自导入应用（同 uvicorn --workers）
+#    输出：预加载耗时、启动到所有 Worker 就绪的耗时、Worker 启动耗时中位数、请求后各 Worker 的 rss / pss / uss 均值（MiB）
+#    及主进程 + Worker 的 pss 合计（实际占用的物理内存；不含各 Worker 的密码哈希进程池）
+#    默认不连接数据库 / Redis（连接失败不影响 /health/live），关闭数据变更监听及进程内定时调度
+#
+# 运行：python -m benchmarks.server --workers 4 --requests 2000
+# ========================================
+
+VARIANTS = {
+    "preload": {"SERVER_PRELOAD": "true", "SERVER_GC_FREEZE": "true"},
+    "preload_no_freeze": {"SERVER_PRELOAD": "true", "SERVER_GC_FREEZE": "false"},
+    "no_preload": {"SERVER_PRELOAD": "false", "SERVER_GC_FREEZE": "false"},
+}
+ENVIRONMENT = {
+    "DB_GENERATE_SCHEMAS": "false",
+    "CHANGE_FEED_ENABLED": "false",
+    "SCHEDULER_ENABLED": "false",
+    "HEALTH_CHECK_INTERVAL": "3600",
+    "REQUEST_TIMING_LOG": "false",
+    "LOG_FORMAT": "json",
+}
+MIB = 1024 * 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # 第 4 列为父进程号（进程名可能包含空格，从最后一个右括号之后解析）
+                if int(f.read().rpartition(")")[2].split()[1]) == pid:
+                    children.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return children
+
+
+def run_variant(name: str, workers: int, requests: int, timeout: float = 120) -> Dict:
+    port = _free_port()
+    env = {**os.environ, **ENVIRONMENT, **VARIANTS[name]}
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+                             "--workers", str(workers)], env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+    messages, ready = [], threading.Event()
+
+    def read_logs():
+        for line in proc.stdout:
+            if not line.startswith("{"):
+                continue
+            message = json.loads(line).get("message", "")
+            messages.append(message)
+            if message.startswith("All ") and "started" in message:
+                ready.set()
+
+    threading.Thread(target=read_logs, daemon=True).start()
+    try:
+        if not ready.wait(timeout):
+            raise TimeoutError("Workers did not start")
+        ready_s = time.perf_counter() - start
+        for _ in range(requests):
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live", timeout=5) as resp:
+                resp.read()
+        time.sleep(1)
+        master = process_memory(proc.pid)
+        memory = [process_memory(pid) for pid in _children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+    preload = [float(m.split(" in ")[1].rstrip("s")) for m in messages if m.startswith("Application preloaded")]
+    startup = [float(m.split("startup=")[1].rstrip("s")) for m in messages if m.startswith("Worker started")]
+    return {
+        "variant": name,
+        "workers": len(memory),
+        "preload_s": round(preload[0], 3) if preload else 0,
+        "ready_s": round(ready_s, 3),
+        "worker_startup_s": round(statistics.median(startup), 3),
+        **{f"worker_{kind}_mib": round(statistics.mean(m[kind] for m in memory) / MIB, 1)
+           for kind in ("rss", "pss", "uss")},
+        "total_pss_mib": round((master["pss"] + sum(m["pss"] for m in memory)) / MIB, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务进程启动耗时及 Worker 内存基准测试")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000, help="测量内存前发送的 /health/live 请求数")
+    parser.add_argument("--variants", nargs="*", choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+    for name in args.variants:
+        print(json.dumps(run_variant(name, args.workers, args.requests)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+# ========================================
+# 说明: Web Worker 启动耗时基准测试
+#    * import：全新解释器中 import app.main 的耗时
+#    * first_request：启动 uvicorn 子进程到 /health/live 首次返回 200 的耗时（包含 lifespan）
+#    默认 DB_GENERATE_SCHEMAS=false（生产模式），--generate-schemas 对比每次启动生成表结构（需要本地 PostgreSQL）
+#
+# 运行：python -m benchmarks.startup --runs 5
+# ========================================
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, timeout: float = 60) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("Server did not become ready")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web Worker 启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--generate-schemas", action="store_true")
+    args = parser.parse_args()
+    env = {**os.environ, "DB_GENERATE_SCHEMAS": "true" if args.generate_schemas else "false"}
+    imports = [measure_import(env) for _ in range(args.runs)]
+    first = [measure_first_request(env) for _ in range(args.runs)]
+    print(json.dumps({"generate_schemas": args.generate_schemas,
+                      "import_s": {"median": round(statistics.median(imports), 3), "max": round(max(imports), 3)},
+                      "first_request_s": {"median": round(statistics.median(first), 3), "max": round(max(first), 3)}}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+
+# ========================================
+# 说明: 用户检索（GET /users/search）索引使用及延迟基准测试（需要 PostgreSQL，已执行迁移 2_*_user_search_indexes）
+#    * 数据：先导入百万级压测数据（python seed_data.py --groups 1000 --users 3000000 --drop-indexes），
+#      或通过 --seed-users 在测试前导入
+#    * 每个用例使用接口相同的 SQL（app.services.examples.build_user_search_query），
+#      EXPLAIN (ANALYZE, BUFFERS) 输出使用的索引、是否存在 example_user 顺序扫描，再执行 --runs 次统计 p50 / p95 延迟
+#    * --require-index：任一用例出现顺序扫描时返回非 0（用于验证索引变更）
+#
+# 运行：python -m benchmarks.user_search --runs 50 --require-index
+# ========================================
+
+PAGE_SIZE = 50
+
+
+def walk_plan(node: dict, indexes: set, seq_scans: list) -> None:
+    if node.get("Index Name"):
+        indexes.add(node["Index Name"])
+    if node.get("Node Type") == "Seq Scan":
+        seq_scans.append(node.get("Relation Name"))
+    for child in node.get("Plans", ()):
+        walk_plan(child, indexes, seq_scans)
+
+
+async def run(db_url: str, runs: int) -> list:
+    import asyncpg
+
+    from app.services.examples import build_user_search_query, encode_cursor
+
+    conn = await asyncpg.connect(db_url)
+    try:
+        total = await conn.fetchval('SELECT reltuples::BIGINT FROM pg_class WHERE relname = \'example_user\'')
+        sample = await conn.fetchrow('SELECT "id", "username", "email", "group_id" FROM "example_user" '
+                                     'ORDER BY "id" DESC LIMIT 1')
+        if sample is None:
+            raise SystemExit("example_user is empty, run seed_data.py first")
+        sql, args = build_user_search_query(limit=PAGE_SIZE)
+        page = await conn.fetch(sql, *args)
+        cursor = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+        month = (datetime(2023, 6, 1, tzinfo=timezone.utc), datetime(2023, 7, 1, tzinfo=timezone.utc))
+        cases = [
+            ("latest", {}),
+            ("latest_page_2", {"cursor": cursor}),
+            ("group", {"group_id": sample["group_id"]}),
+            ("group_active_month", {"group_id": sample["group_id"], "is_active": True,
+                                    "created_after": month[0], "created_before": month[1]}),
+            ("superuser", {"is_superuser": True}),
+            ("month", {"created_after": month[0], "created_before": month[1]}),
+            ("fuzzy_username", {"q": sample["username"][:-1]}),
+            ("fuzzy_email_typo", {"q": sample["email"].split("@")[0].replace(".", "", 1)}),
+            ("fuzzy_group", {"q": sample["username"][-4:], "group_id": sample["group_id"]}),
+        ]
+        results = []
+        for name, params in cases:
+            sql, args = build_user_search_query(limit=PAGE_SIZE + 1, **params)
+            plan = json.loads(await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *args))[0]
+            indexes, seq_scans = set(), []
+            walk_plan(plan["Plan"], indexes, seq_scans)
+            latencies = []
+            rows = 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                rows = len(await conn.fetch(sql, *args))
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            results.append({
+                "case": name,
+                "table_rows": total,
+                "rows": rows,
+                "indexes": sorted(indexes),
+                "seq_scan": "example_user" in seq_scans,
+                "shared_hit": plan["Plan"].get("Shared Hit Blocks"),
+                "shared_read": plan["Plan"].get("Shared Read Blocks"),
+                "explain_ms": round(plan["Execution Time"], 3),
+                "p50_ms": round(latencies[len(latencies) // 2], 3),
+                "p95_ms": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+            })
+    finally:
+        await conn.close()
+    return results
+
+
+def main():
+    from app import settings
+
+    parser = argparse.ArgumentParser(description="用户检索索引使用及延迟基准测试")
+    parser.add_argument("--db-url", default=settings.BASE_POSTGRES)
+    parser.add_argument("--runs", type=int, default=50, help="每个用例执行次数")
+    parser.add_argument("--seed-users", type=int, default=0, help="测试前导入的用户数（seed_data.py，0 不导入）")
+    parser.add_argument("--seed-groups", type=int, default=1000)
+    parser.add_argument("--require-index", action="store_true", help="存在 example_user 顺序扫描时返回非 0")
+    args = parser.parse_args()
+    if args.seed_users:
+        import seed_data
+        seed_data.main(["--groups", str(args.seed_groups), "--users", str(args.seed_users), "--drop-indexes"])
+    results = asyncio.run(run(args.db_url, args.runs))
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    if args.require_index and any(result["seq_scan"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
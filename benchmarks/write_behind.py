@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+
+# ========================================
+# 说明: 高频字段延迟写入（write-behind）吞吐量基准测试（需要 PostgreSQL）
+#    * --concurrency 个协程持续产生登录事件，用户从 --hot-users 个热点用户中随机选取（热点行锁竞争）
+#    * direct：每个事件一条 UPDATE "example_user" SET "last_login" = $1 WHERE "id" = $2
+#    * write-behind：事件写入 WriteBehindBuffer，每 --interval 秒批量 UPDATE ... FROM (VALUES ...)
+#    * 统计事件吞吐（events/s）及执行的 UPDATE 语句数
+#
+# 运行：python -m benchmarks.write_behind --duration 5 --concurrency 50 --hot-users 100
+# ========================================
+
+
+async def run(db_url: str, duration: float, concurrency: int, hot_users: int, interval: float) -> list:
+    from tortoise import Tortoise, connections
+
+    from app.core.write_behind import WriteBehindBuffer
+    from app.models.examples import ExampleGroup, ExampleUser
+
+    await Tortoise.init(db_url=db_url, modules={"models": ["app.models.examples"]})
+    await Tortoise.generate_schemas(safe=True)
+    prefix = f"wb{time.time_ns() % 10 ** 8}-"
+    group = await ExampleGroup.create(name=f"{prefix}group")
+    await ExampleUser.bulk_create([ExampleUser(username=f"{prefix}{i}", password="-", group=group)
+                                   for i in range(hot_users)])
+    ids = [user_id for user_id, in await ExampleUser.filter(group=group).values_list("id")]
+    conn = connections.get("default")
+
+    async def direct():
+        statements = 0
+
+        async def record(user_id):
+            nonlocal statements
+            statements += 1
+            await conn.execute_query('UPDATE "example_user" SET "last_login" = $1 WHERE "id" = $2',
+                                     [datetime.now(timezone.utc), user_id])
+
+        async def finish():
+            return statements
+
+        return record, finish
+
+    async def write_behind():
+        buffer = WriteBehindBuffer(ExampleUser, ("last_login",))
+        statements = 0
+        flush = buffer.flush
+
+        async def counted_flush():
+            nonlocal statements
+            rows = await flush()
+            statements += -(-rows // buffer.batch_size)
+            return rows
+
+        buffer.flush = counted_flush
+
+        async def flusher():
+            while True:
+                await asyncio.sleep(interval)
+                await buffer.flush()
+
+        task = asyncio.create_task(flusher())
+
+        async def record(user_id):
+            buffer.update(user_id, last_login=datetime.now(timezone.utc))
+            # 与 direct 一致：每个事件让出一次事件循环
+            await asyncio.sleep(0)
+
+        async def finish():
+            task.cancel()
+            await buffer.flush()
+            return statements
+
+        return record, finish
+
+    results = []
+    try:
+        for name, setup in (("direct", direct), ("write-behind", write_behind)):
+            record, finish = await setup()
+            events = 0
+            stop = time.perf_counter() + duration
+            rng = random.Random(42)
+
+            async def producer():
+                nonlocal events
+                while time.perf_counter() < stop:
+                    await record(rng.choice(ids))
+                    events += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(producer() for _ in range(concurrency)))
+            statements = await finish()
+            elapsed = time.perf_counter() - start
+            results.append({"mode": name, "events": events, "events_per_s": round(events / elapsed, 1),
+                            "update_statements": statements})
+    finally:
+        await ExampleUser.filter(group=group).delete()
+        await group.delete()
+        await Tortoise.close_connections()
+    return results
+
+
+def main():
+    from app import settings
+
+    parser = argparse.ArgumentParser(description="高频字段延迟写入（write-behind）吞吐量基准测试")
+    parser.add_argument("--db-url", default=settings.BASE_POSTGRES)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hot-users", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=1, help="write-behind 写入周期（秒）")
+    args = parser.parse_args()
+    for result in asyncio.run(run(args.db_url, args.duration, args.concurrency, args.hot_users, args.interval)):
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,30 @@
-import subprocess
+import argparse
+import asyncio
 import sys
 import time
+import zlib
+
+import asyncpg
+from aerich import Command
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
 
 from app.config import TORTOISE_ORM
-from app.models.examples import ExampleGroup, ExampleUser
-from tortoise import Tortoise, run_async
+from app.core.logger import LOG
+from app.core.passwords import hash_password
+from app.services.examples import group_name_filter, username_filter
+
+# ========================================
+# 说明: 数据库迁移及数据初始化
+#    * 进程内执行 aerich 迁移，并在同一个 PostgreSQL 会话级 advisory lock 下完成迁移与初始化，
+#      多个副本同时启动时只有一个副本执行，其他副本等待锁释放（迁移已完成，直接跳过）或使用 --skip-if-locked 直接退出
+#    * 连接数据库失败时异步指数退避重试
+#    * 内置数据通过 INSERT ... ON CONFLICT DO NOTHING 在同一事务中写入，可重复执行；写入后删除对应的布隆过滤器（直接 SQL 绕过服务层）
+#    * 输出各阶段耗时
+# ========================================
+
+# advisory lock 键（所有副本一致）
+MIGRATION_LOCK_KEY = zlib.crc32(b"fastapi-common-tmpl:init_data")
 
 # 内置 Group
 BUILT_IN_GROUP = {
@@ -19,81 +39,124 @@ BUILT_IN_USER = {
 }
 
 
-async def run_aerich_upgrade(retries: int = 3, delay: int = 5):
+async def connect_with_retry(retries: int = 5, delay: float = 1.0) -> asyncpg.Connection:
     """
-    运行 `aerich upgrade` 进行数据库迁移, 默认尝试 3 次，间隔 5s
+    建立用于持有 advisory lock 的数据库连接，失败时指数退避重试（delay, 2*delay, 4*delay ...）
     :param retries: 最大重试次数
-    :param delay: 每次重试之间的等待时间（秒）
+    :param delay: 首次重试等待时间（秒）
     :return:
     """
+    credentials = TORTOISE_ORM["connections"]["default"]["credentials"]
     for attempt in range(1, retries + 1):
         try:
-            subprocess.run(["aerich", "upgrade"], check=True)
-            print("数据库迁移完成: aerich upgrade")
-            break  # 如果成功，退出循环
-        except subprocess.CalledProcessError as e:
-            print(f"数据库迁移失败: {e}")
-            if attempt < retries:
-                print(f"将在 {delay} 秒后重试... (尝试 {attempt}/{retries})")
-                time.sleep(delay)  # 等待一段时间后重试
-            else:
-                print("已达到最大重试次数，退出程序。")
-                sys.exit(1)
-
-
-async def init_group():
+            return await asyncpg.connect(host=credentials["host"], port=credentials["port"],
+                                         user=credentials["user"], password=credentials["password"],
+                                         database=credentials["database"])
+        except (OSError, asyncpg.PostgresError) as e:
+            if attempt == retries:
+                raise
+            wait = delay * 2 ** (attempt - 1)
+            LOG.warning(f"数据库连接失败: {e!r}，将在 {wait:.1f} 秒后重试... (尝试 {attempt}/{retries})")
+            await asyncio.sleep(wait)
+
+
+async def acquire_migration_lock(conn: asyncpg.Connection, skip_if_locked: bool, timeout: float) -> bool:
+    """
+    获取迁移 advisory lock（会话级，连接关闭时自动释放）
+    :param conn: 持有锁的连接
+    :param skip_if_locked: 锁被其他副本持有时不等待，直接返回 False
+    :param timeout: 等待锁的最长时间（秒）
+    :return: 是否获取成功
     """
-    初始化：内置用户组
+    if skip_if_locked:
+        return await conn.fetchval("SELECT pg_try_advisory_lock($1)", MIGRATION_LOCK_KEY)
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY, timeout=timeout)
+    return True
+
+
+async def run_aerich_upgrade():
+    """
+    进程内执行数据库迁移（等同于 `aerich upgrade`），每个迁移文件在独立事务中执行
     :return:
     """
-    try:
-        if await ExampleGroup.filter(name=BUILT_IN_GROUP["name"]).exists():
-            print(f"内置用户组已经存在: {BUILT_IN_GROUP['name']}")
-        else:
-            group = await ExampleGroup.create(**BUILT_IN_GROUP)
-            print(f"内置用户组初始化成功: {group.name}")
-    except Exception as e:
-        raise e
+    command = Command(tortoise_config=TORTOISE_ORM, app="models", location="./migrations")
+    await command.init()
+    migrated = await command.upgrade(run_in_transaction=True)
+    if migrated:
+        for version_file in migrated:
+            LOG.info(f"数据库迁移完成: {version_file}")
+    else:
+        LOG.info("数据库已是最新版本，无需迁移")
 
 
-async def init_user():
+async def init_built_in_data():
     """
-    初始化：内置用户
+    初始化：内置用户组及内置用户（同一事务，已存在则跳过）
     :return:
     """
-    try:
-        if await ExampleUser.filter(username=BUILT_IN_USER["username"]).exists():
-            print(f"内置系统管理员已经存在: {BUILT_IN_USER['username']}")
-        else:
-            BUILT_IN_USER["group"] = await ExampleGroup.get(name=BUILT_IN_GROUP["name"])
-            user = await ExampleUser.create(**BUILT_IN_USER)
-            print(f"内置管理员初始化成功: {user.username}")
-    except Exception as e:
-        raise e
+    async with in_transaction() as conn:
+        _, groups = await conn.execute_query(
+            'INSERT INTO "example_group" ("name", "description") VALUES ($1, $2) '
+            'ON CONFLICT ("name") DO NOTHING RETURNING "id"',
+            [BUILT_IN_GROUP["name"], BUILT_IN_GROUP["description"]])
+        _, users = await conn.execute_query(
+            'INSERT INTO "example_user" ("username", "password", "group_id") '
+            'SELECT $1, $2, "id" FROM "example_group" WHERE "name" = $3 '
+            'ON CONFLICT ("username") DO NOTHING RETURNING "id"',
+            [BUILT_IN_USER["username"], hash_password(BUILT_IN_USER["password"]), BUILT_IN_GROUP["name"]])
+    if groups:
+        await group_name_filter.invalidate()
+    if users:
+        await username_filter.invalidate()
+    LOG.info(f"内置用户组{'初始化成功' if groups else '已经存在'}: {BUILT_IN_GROUP['name']}")
+    LOG.info(f"内置系统管理员{'初始化成功' if users else '已经存在'}: {BUILT_IN_USER['username']}")
+
+
+async def init_data(skip_if_locked: bool = False, lock_timeout: float = 600) -> int:
+    LOG.info("开始数据库初始化... ...")
+    timings = {}
+    start = phase_start = time.perf_counter()
 
+    def phase(name: str):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[name] = (now - phase_start) * 1000
+        phase_start = now
 
-async def init_data():
-    print("开始数据库初始化... ...")
-    # 运行数据库迁移
-    await run_aerich_upgrade()
-    # 初始化数据库连接，使用从FastAPI应用配置中获取的信息
+    lock_conn = None
     try:
-        await Tortoise.init(config=TORTOISE_ORM)
-        await Tortoise.generate_schemas()
-        # 执行数据初始化操作
-        await init_group()
-        await init_user()
+        lock_conn = await connect_with_retry()
+        phase("connect")
+        if not await acquire_migration_lock(lock_conn, skip_if_locked, lock_timeout):
+            LOG.info("其他副本正在执行数据库初始化，跳过")
+            return 0
+        phase("lock_wait")
+        await run_aerich_upgrade()
+        phase("migrate")
+        await init_built_in_data()
+        phase("seed")
     except Exception as e:
-        print(f"数据库初始化失败: {e}")
-        sys.exit(1)
+        LOG.error(f"数据库初始化失败: {e!r}")
+        return 1
     finally:
-        await Tortoise.close_connections()
-    print("数据库初始化完成")
-    sys.exit(0)
+        if Tortoise._inited:
+            await Tortoise.close_connections()
+        if lock_conn is not None:
+            # 关闭连接即释放 advisory lock
+            await lock_conn.close()
+        timings["total"] = (time.perf_counter() - start) * 1000
+        LOG.info("数据库初始化耗时: " + ", ".join(f"{name}={cost:.1f}ms" for name, cost in timings.items()))
+    LOG.info("数据库初始化完成")
+    return 0
 
 
 def main():
-    run_async(init_data())
+    parser = argparse.ArgumentParser(description="数据库迁移及内置数据初始化")
+    parser.add_argument("--skip-if-locked", action="store_true",
+                        help="其他副本正在执行初始化时直接退出，而不是等待其完成")
+    parser.add_argument("--lock-timeout", type=float, default=600, help="等待迁移锁的最长时间（秒）")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(init_data(args.skip_if_locked, args.lock_timeout)))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,48 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 数据变更通知（LISTEN/NOTIFY，见 app.core.change_feed）：example_user / example_group 增删改时向 example_changes 频道发送通知
+# 负载为变更后的行（不含 password）；超出 NOTIFY 8000 字节上限时只发送主键，由监听方查询
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE OR REPLACE FUNCTION "example_notify_change"() RETURNS TRIGGER AS $$
+DECLARE
+    "row" JSONB;
+    "old_group_id" JSONB;
+    "payload" TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        "row" := to_jsonb(OLD) - 'password';
+    ELSE
+        IF TG_OP = 'UPDATE' AND OLD IS NOT DISTINCT FROM NEW THEN
+            RETURN NULL;
+        END IF;
+        "row" := to_jsonb(NEW) - 'password';
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        "old_group_id" := to_jsonb(OLD) -> 'group_id';
+    END IF;
+    "payload" := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', "row" -> 'id',
+                                    'group_id', "row" -> 'group_id', 'old_group_id', "old_group_id",
+                                    'row', "row")::TEXT;
+    IF octet_length("payload") > 7900 THEN
+        "payload" := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', "row" -> 'id',
+                                        'group_id', "row" -> 'group_id', 'old_group_id', "old_group_id")::TEXT;
+    END IF;
+    PERFORM pg_notify('example_changes', "payload");
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS "example_user_notify_change" ON "example_user";
+CREATE TRIGGER "example_user_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "example_user"
+    FOR EACH ROW EXECUTE FUNCTION "example_notify_change"();
+DROP TRIGGER IF EXISTS "example_group_notify_change" ON "example_group";
+CREATE TRIGGER "example_group_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "example_group"
+    FOR EACH ROW EXECUTE FUNCTION "example_notify_change"();"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TRIGGER IF EXISTS "example_group_notify_change" ON "example_group";
+DROP TRIGGER IF EXISTS "example_user_notify_change" ON "example_user";
+DROP FUNCTION IF EXISTS "example_notify_change"();"""
@@ -0,0 +1,26 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 用户检索索引（见 app.services.examples.build_user_search_query）：
+#   * 复合索引：按用户组 / 全表 / 管理员（部分索引）过滤，并按 created_at DESC, id DESC 排序及游标分页
+#   * pg_trgm GIN 索引：用户名/昵称/邮箱模糊匹配（<% 及 ILIKE '%...%'）
+# 迁移在事务中执行，建索引期间阻塞写入；已有大量数据时可先手动执行 CREATE INDEX CONCURRENTLY（IF NOT EXISTS 跳过已存在的索引）
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS "idx_example_user_group_created" ON "example_user" ("group_id", "created_at" DESC, "id" DESC);
+CREATE INDEX IF NOT EXISTS "idx_example_user_created" ON "example_user" ("created_at" DESC, "id" DESC);
+CREATE INDEX IF NOT EXISTS "idx_example_user_superuser_created" ON "example_user" ("created_at" DESC, "id" DESC) WHERE "is_superuser";
+CREATE INDEX IF NOT EXISTS "idx_example_user_username_trgm" ON "example_user" USING GIN ("username" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_example_user_nickname_trgm" ON "example_user" USING GIN ("nickname" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_example_user_email_trgm" ON "example_user" USING GIN ("email" gin_trgm_ops);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_example_user_email_trgm";
+DROP INDEX IF EXISTS "idx_example_user_nickname_trgm";
+DROP INDEX IF EXISTS "idx_example_user_username_trgm";
+DROP INDEX IF EXISTS "idx_example_user_superuser_created";
+DROP INDEX IF EXISTS "idx_example_user_created";
+DROP INDEX IF EXISTS "idx_example_user_group_created";"""
@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.logger import LOG
+from app.core.passwords import hash_password
+from app.schemas.examples import GroupIn, UserIn
+from app.services.examples import group_name_filter, username_filter
+from init_data import connect_with_retry
+
+# ========================================
+# 说明: 压测数据批量生成及导入
+#    * 按固定随机种子生成用户组及用户数据，每行按 (种子, 序号) 独立播种，生成结果与分块大小、起始序号无关
+#    * 通过 asyncpg COPY 分块写入 PostgreSQL，可选导入前删除二级索引/唯一约束、导入后重建（要求写入的表为空）；导入期间禁用数据变更通知触发器
+#    * 导入后删除用户名/用户组名布隆过滤器（COPY 绕过服务层，导入的值不在过滤器中），需要时通过 POST /redis/bloom/rebuild 重建
+#    * 也可输出为 NDJSON 文件（仅包含创建接口 GroupIn / UserIn 的字段，密码为明文、由创建接口哈希，
+#      用户的 group_id 替换为用户组名称 group），供导入链路使用
+#    * 输出每个分块及整体的写入速率（rows/s）
+#
+#    python seed_data.py --groups 1000 --users 1000000 --seed 42 --drop-indexes
+#    python seed_data.py --groups 1000 --users 1000000 --seed 42 --ndjson ./seed
+# ========================================
+
+GROUP_COLUMNS = ("name", "description", "created_at", "updated_at")
+USER_COLUMNS = ("username", "nickname", "email", "password", "last_login", "is_active", "is_superuser",
+                "is_confirmed", "avatar", "group_id", "created_at", "updated_at")
+
+DEPARTMENTS = ["研发", "测试", "运维", "产品", "设计", "市场", "销售", "客服", "财务", "人事", "法务", "采购"]
+SURNAMES = ["zhang", "wang", "li", "zhao", "liu", "chen", "yang", "huang", "zhou", "wu", "xu", "sun", "ma", "zhu"]
+GIVEN_NAMES = ["wei", "fang", "na", "min", "jing", "li", "qiang", "lei", "jun", "yang", "yong", "yan", "jie", "tao"]
+DOMAINS = ["example.com", "example.org", "example.net", "mail.example.com"]
+# 统一的压测账号密码
+DEFAULT_PASSWORD = "Passw0rd@123"
+# 生成数据的时间基准（固定值，保证同一种子生成的数据一致）
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def chunk_ranges(start: int, count: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    for chunk_start in range(start, start + count, chunk_size):
+        yield chunk_start, min(chunk_start + chunk_size, start + count)
+
+
+def row_seed(seed: int, table: int, index: int) -> int:
+    # 种子、表、序号组合为整数种子（整数播种开销最低）
+    return (seed << 41) | (index << 1) | table
+
+
+def group_name(index: int) -> str:
+    return f"{DEPARTMENTS[index % len(DEPARTMENTS)]}-{index:06d}"
+
+
+def generate_groups(seed: int, start: int, end: int) -> List[tuple]:
+    """
+    生成用户组记录，字段顺序同 GROUP_COLUMNS
+    :param seed: 随机种子
+    :param start: 起始序号（包含）
+    :param end: 结束序号（不包含）
+    :return:
+    """
+    rng, records = random.Random(), []
+    for index in range(start, end):
+        rng.seed(row_seed(seed, 0, index))
+        created_at = BASE_TIME - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        records.append((group_name(index), f"{DEPARTMENTS[index % len(DEPARTMENTS)]}部门用户组 {index}",
+                        created_at, created_at + timedelta(seconds=rng.randrange(30 * 86400))))
+    return records
+
+
+def generate_users(seed: int, start: int, end: int, group_count: int) -> List[tuple]:
+    """
+    生成用户记录，字段顺序同 USER_COLUMNS，group_id 位置为用户组序号（0 ~ group_count-1）
+    :param seed: 随机种子
+    :param start: 起始序号（包含）
+    :param end: 结束序号（不包含）
+    :param group_count: 用户组数量
+    :return:
+    """
+    rng, records = random.Random(), []
+    for index in range(start, end):
+        rng.seed(row_seed(seed, 1, index))
+        username = f"u{index:09d}"
+        surname, given = rng.choice(SURNAMES), rng.choice(GIVEN_NAMES)
+        created_at = BASE_TIME - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        last_login = None if rng.random() < 0.3 else BASE_TIME - timedelta(seconds=rng.randrange(90 * 86400))
+        records.append((
+            username,
+            f"{surname.capitalize()} {given.capitalize()}",
+            f"{surname}.{given}.{index}@{rng.choice(DOMAINS)}",
+            DEFAULT_PASSWORD,
+            last_login,
+            rng.random() < 0.95,
+            rng.random() < 0.01,
+            rng.random() < 0.8,
+            f"https://avatar.example.com/{username}.png" if rng.random() < 0.5 else None,
+            rng.randrange(group_count),
+            created_at,
+            created_at + timedelta(seconds=rng.randrange(30 * 86400)),
+        ))
+    return records
+
+
+# TODO：================= 二级索引 =======================#
+
+async def drop_secondary_indexes(conn: asyncpg.Connection, table: str, rebuild: List[str]) -> None:
+    """
+    删除表上除主键外的索引（唯一约束通过 DROP CONSTRAINT 删除）
+    :param conn:
+    :param table: 表名
+    :param rebuild: 每删除一个索引即追加重建所需的 DDL（中途失败时已删除的索引仍会被重建）
+    :return:
+    """
+    rows = await conn.fetch(
+        """
+        SELECT i.indexrelid::regclass::text AS index_name, pg_get_indexdef(i.indexrelid) AS index_def,
+               c.conname, pg_get_constraintdef(c.oid) AS constraint_def
+        FROM pg_index i
+        LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid AND c.contype IN ('u', 'x')
+        WHERE i.indrelid = $1::regclass AND NOT i.indisprimary
+        """, table)
+    for row in rows:
+        if row["conname"]:
+            await conn.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{row["conname"]}"')
+            rebuild.append(f'ALTER TABLE "{table}" ADD CONSTRAINT "{row["conname"]}" {row["constraint_def"]}')
+        else:
+            await conn.execute(f"DROP INDEX {row['index_name']}")
+            rebuild.append(row["index_def"])
+        LOG.info(f"Dropped index: {table}.{row['index_name']}")
+
+
+async def set_notify_triggers(conn: asyncpg.Connection, enabled: bool) -> None:
+    """
+    启用/禁用数据变更通知触发器（见 app.core.change_feed）：批量导入时禁用，避免逐行 NOTIFY
+    :param conn:
+    :param enabled:
+    :return:
+    """
+    rows = await conn.fetch("SELECT tgrelid::regclass::text AS table_name, tgname FROM pg_trigger "
+                            "WHERE tgname IN ('example_user_notify_change', 'example_group_notify_change')")
+    for row in rows:
+        await conn.execute(f'ALTER TABLE {row["table_name"]} {"ENABLE" if enabled else "DISABLE"} '
+                           f'TRIGGER "{row["tgname"]}"')
+        LOG.info(f"{'Enabled' if enabled else 'Disabled'} trigger: {row['table_name']}.{row['tgname']}")
+
+
+async def rebuild_indexes(conn: asyncpg.Connection, statements: List[str]) -> List[str]:
+    """
+    逐条重建索引/约束，单条失败（如导入了重复数据导致唯一约束无法建立）记录日志后继续执行其余语句
+    :param conn:
+    :param statements: 重建所需的 DDL
+    :return: 执行失败的 DDL
+    """
+    failed = []
+    for statement in statements:
+        start = time.perf_counter()
+        try:
+            await conn.execute(statement)
+        except asyncpg.PostgresError as e:
+            LOG.error(f"Failed to rebuild index: {statement}, error={e!r}")
+            failed.append(statement)
+            continue
+        LOG.info(f"Rebuilt index: {statement}, cost={time.perf_counter() - start:.1f}s")
+    return failed
+
+
+async def ensure_empty(conn: asyncpg.Connection, tables: List[str]) -> None:
+    """
+    删除唯一约束后导入前检查目标表为空：已有数据时导入的重复值（如重复执行生成相同的用户组名）将导致约束无法重建
+    :param conn:
+    :param tables: 将要写入的表
+    :return:
+    """
+    for table in tables:
+        if await conn.fetchval(f'SELECT EXISTS (SELECT 1 FROM "{table}")'):
+            raise ValueError(f"--drop-indexes requires empty tables, {table} already has rows")
+
+
+# TODO：================= 导入 =======================#
+
+async def copy_chunks(conn: asyncpg.Connection, table: str, columns: tuple, chunks: Iterator[List[tuple]],
+                      total: int) -> float:
+    """
+    逐块 COPY 写入（每个分块单独提交）
+    :return: 写入速率 rows/s
+    """
+    done, start = 0, time.perf_counter()
+    for records in chunks:
+        await conn.copy_records_to_table(table, records=records, columns=columns)
+        done += len(records)
+        elapsed = time.perf_counter() - start
+        LOG.info(f"COPY {table}: {done}/{total} rows, {done / elapsed:.0f} rows/s")
+    elapsed = time.perf_counter() - start
+    return done / elapsed if elapsed else 0
+
+
+async def load_postgres(seed: int, groups: int, users: int, start: int, chunk_size: int,
+                        drop_indexes: bool) -> None:
+    conn = await connect_with_retry()
+    rebuild, failed = [], []
+    try:
+        if drop_indexes:
+            await ensure_empty(conn, [table for table, count in (("example_group", groups), ("example_user", users))
+                                      if count])
+        await set_notify_triggers(conn, False)
+        if drop_indexes:
+            await drop_secondary_indexes(conn, "example_user", rebuild)
+            await drop_secondary_indexes(conn, "example_group", rebuild)
+        if groups:
+            rate = await copy_chunks(conn, "example_group", GROUP_COLUMNS,
+                                     (generate_groups(seed, s, e) for s, e in chunk_ranges(0, groups, chunk_size)),
+                                     groups)
+            LOG.info(f"example_group: {groups} rows, {rate:.0f} rows/s")
+            names = [group_name(index) for index in range(groups)]
+            ids = dict(await conn.fetch('SELECT "name", "id" FROM "example_group" WHERE "name" = ANY($1::text[])',
+                                        names))
+            group_ids = [ids[name] for name in names]
+        else:
+            # 不生成用户组：用户关联到已存在的用户组
+            group_ids = [row["id"] for row in await conn.fetch('SELECT "id" FROM "example_group" ORDER BY "id"')]
+        if users:
+            if not group_ids:
+                raise ValueError("No groups available for users")
+
+            # 所有用户共用同一个密码哈希（盐由种子派生，结果可复现），避免逐行计算 scrypt
+            password_hash = hash_password(DEFAULT_PASSWORD, salt=row_seed(seed, 1, 0).to_bytes(16, "big"))
+
+            def user_chunks():
+                for s, e in chunk_ranges(start, users, chunk_size):
+                    records = generate_users(seed, s, e, len(group_ids))
+                    yield [(*record[:3], password_hash, *record[4:9], group_ids[record[9]], *record[10:])
+                           for record in records]
+
+            rate = await copy_chunks(conn, "example_user", USER_COLUMNS, user_chunks(), users)
+            LOG.info(f"example_user: {users} rows, {rate:.0f} rows/s")
+    finally:
+        try:
+            await set_notify_triggers(conn, True)
+            failed = await rebuild_indexes(conn, rebuild)
+            await conn.execute('ANALYZE "example_group"; ANALYZE "example_user"')
+        finally:
+            await conn.close()
+            for bloom in (username_filter, group_name_filter):
+                await bloom.invalidate()
+    if failed:
+        raise RuntimeError(f"Failed to rebuild {len(failed)} index(es): {failed}")
+
+
+def write_ndjson(directory: Path, seed: int, groups: int, users: int, start: int, chunk_size: int) -> None:
+    """
+    输出 example_group.ndjson / example_user.ndjson：仅 GroupIn / UserIn 的字段（不含 created_at 等数据库字段），
+    用户的 group_id 替换为用户组名称 group
+    """
+    if users and not groups:
+        raise ValueError("--groups is required when writing users as NDJSON")
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = [("example_group", groups, GROUP_COLUMNS, GroupIn,
+               lambda s, e: generate_groups(seed, s, e), chunk_ranges(0, groups, chunk_size)),
+              ("example_user", users, USER_COLUMNS, UserIn,
+               lambda s, e: generate_users(seed, s, e, groups), chunk_ranges(start, users, chunk_size))]
+    for table, total, columns, schema, generate, ranges in tables:
+        if not total:
+            continue
+        begin = time.perf_counter()
+        with open(directory / f"{table}.ndjson", "w", encoding="utf-8") as f:
+            for s, e in ranges:
+                for record in generate(s, e):
+                    row = {name: value for name, value in zip(columns, record) if name in schema.model_fields}
+                    if table == "example_user":
+                        row["group"] = group_name(row.pop("group_id"))
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        LOG.info(f"{table}.ndjson: {total} rows, {total / (time.perf_counter() - begin):.0f} rows/s")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="压测数据批量生成及导入")
+    parser.add_argument("--groups", type=int, default=100, help="生成的用户组数量，0 表示关联已存在的用户组")
+    parser.add_argument("--users", type=int, default=10000, help="生成的用户数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--start", type=int, default=0, help="用户起始序号（追加导入时避免用户名冲突）")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="每个 COPY 分块的行数")
+    parser.add_argument("--drop-indexes", action="store_true", help="导入前删除二级索引及唯一约束，导入后重建（要求写入的表为空）")
+    parser.add_argument("--ndjson", type=Path, help="输出 NDJSON 到指定目录，不写入数据库")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.ndjson:
+        write_ndjson(args.ndjson, args.seed, args.groups, args.users, args.start, args.chunk_size)
+    else:
+        asyncio.run(load_postgres(args.seed, args.groups, args.users, args.start, args.chunk_size,
+                                  args.drop_indexes))
+    elapsed = time.perf_counter() - start
+    LOG.info(f"Seeded {args.groups} groups and {args.users} users in {elapsed:.1f}s, "
+             f"{(args.groups + args.users) / elapsed:.0f} rows/s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -35,9 +35,10 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
 
 
 @pytest.fixture(autouse=True)
-async def transaction():
+async def transaction(request: pytest.FixtureRequest):
     """
      确保每个测试用例在独立的事务中运行，测试结束后回滚事务，防止脏数据影响其他测试;
+     不使用 client 的测试用例（不依赖数据库的单元测试）不开启事务;
     :return:
 
     备注：
@@ -48,6 +49,9 @@ async def transaction():
                 在 yield 之前的代码会在测试用例执行前运行，yield 之后的代码会在测试用例执行完毕后运行；
     await conn.rollback()：在测试用例执行完毕后，回滚事务。这将撤销在事务中所做的所有数据库操作，从而确保测试数据不会保留在数据库中；
     """
+    if "client" not in request.fixturenames:
+        yield None
+        return
     async with in_transaction() as conn:
         yield conn
         await conn.rollback()
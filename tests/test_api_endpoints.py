@@ -1,7 +1,11 @@
+import asyncio
+import uuid
+
 import pytest
 from httpx import AsyncClient
 
 from app.main import app
+from app.services.examples import GroupService
 
 
 @pytest.mark.anyio
@@ -42,6 +46,20 @@ async def test_user_crud(client: AsyncClient) -> None:
     users = response.json()
     assert len([user for user in users if user.get("username") == "eg_user"]) == 1
 
+    # 批量查询 User（不存在的 ID 返回 null）
+    response = await client.get(app.url_path_for('example_get_users_batch'), params={"ids": f"{user_id},0"})
+    assert response.status_code == 200, response.text
+    users = response.json()
+    assert users[0]["username"] == "eg_user" and users[1] is None
+
+    # 检索 User（过滤 + 模糊匹配）
+    response = await client.get(app.url_path_for('example_search_users'),
+                                params={"group_id": group_id, "is_active": True, "q": "eg_nick"})
+    assert response.status_code == 200, response.text
+    assert [user["id"] for user in response.json()["items"]] == [user_id]
+    response = await client.get(app.url_path_for('example_search_users'), params={"cursor": "invalid"})
+    assert response.status_code == 400, response.text
+
     # 更新 User
     response = await client.put(app.url_path_for('example_update_user', user_id=user_id),
                                 json={"username": "eg_update_user"})
@@ -80,6 +98,12 @@ async def test_group_crud(client: AsyncClient) -> None:
     groups = response.json()
     assert len([group for group in groups if group.get("name") == "eg_group"]) == 1
 
+    # 批量查询 Group（不存在的 ID 返回 null）
+    response = await client.get(app.url_path_for('example_get_groups_batch'), params={"ids": f"0,{group_id}"})
+    assert response.status_code == 200, response.text
+    groups = response.json()
+    assert groups[0] is None and groups[1]["name"] == "eg_group"
+
     # 更新 Group
     data = {"name": "eg_update_group"}
     response = await client.put(app.url_path_for('example_update_group', group_id=group_id), json=data)
@@ -91,3 +115,75 @@ async def test_group_crud(client: AsyncClient) -> None:
     response = await client.delete(app.url_path_for('example_update_group', group_id=group_id))
     assert response.status_code == 200, response.text
     assert "用户组删除成功" in response.text
+
+
+@pytest.mark.anyio
+async def test_health(client: AsyncClient) -> None:
+    # 存活检查
+    response = await client.get(app.url_path_for('health_live'))
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "ok"
+
+    # 健康检查详情
+    response = await client.get(app.url_path_for('health_verbose'))
+    assert response.status_code == 200, response.text
+    assert "checks" in response.json()
+
+
+@pytest.mark.anyio
+async def test_idempotency(client: AsyncClient) -> None:
+    # 幂等键每次运行唯一（缓存的响应保留 IDEMPOTENCY_TTL）
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    data = {"name": "eg_idem_group", "description": "This is description."}
+
+    # 首次请求执行，重复请求返回缓存的响应
+    response = await client.post(app.url_path_for('example_create_group'), json=data, headers=headers)
+    assert response.status_code == 200, response.text
+    assert "idempotent-replayed" not in response.headers
+    group = response.json()
+    response = await client.post(app.url_path_for('example_create_group'), json=data, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["idempotent-replayed"] == "true"
+    assert response.json() == group
+
+    # 同一幂等键、不同请求体
+    response = await client.post(app.url_path_for('example_create_group'), json={"name": "eg_idem_other"},
+                                 headers=headers)
+    assert response.status_code == 422, response.text
+
+    # 并发的重复请求等待首次请求完成，只创建一个 User
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    data = {"username": "eg_idem_user", "password": "123456", "group_id": group["id"]}
+    responses = await asyncio.gather(*(client.post(app.url_path_for('example_create_user'), json=data,
+                                                   headers=headers) for _ in range(3)))
+    assert [response.status_code for response in responses] == [200] * 3, responses[0].text
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert len([response for response in responses if "idempotent-replayed" not in response.headers]) == 1
+    user_id = responses[0].json()["id"]
+    response = await client.delete(app.url_path_for('example_delete_user', user_id=user_id))
+    assert response.status_code == 200, response.text
+
+    response = await client.delete(app.url_path_for('example_delete_group', group_id=group["id"]))
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.anyio
+async def test_idempotency_retry_after_error(client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    data = {"name": "eg_idem_retry_group"}
+    create_group = GroupService.create_group
+
+    async def failing_create_group(group):
+        raise RuntimeError("Database unavailable")
+
+    # 5xx 时释放幂等键，使用同一幂等键重试时重新执行
+    monkeypatch.setattr(GroupService, "create_group", failing_create_group)
+    with pytest.raises(RuntimeError):
+        await client.post(app.url_path_for('example_create_group'), json=data, headers=headers)
+    monkeypatch.setattr(GroupService, "create_group", create_group)
+    response = await client.post(app.url_path_for('example_create_group'), json=data, headers=headers)
+    assert response.status_code == 200, response.text
+    assert "idempotent-replayed" not in response.headers
+
+    response = await client.delete(app.url_path_for('example_delete_group', group_id=response.json()["id"]))
+    assert response.status_code == 200, response.text
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.core.batch import BatchTask
+
+
+@pytest.mark.anyio
+async def test_process_skips_invalid_failure_indexes() -> None:
+    calls = []
+
+    async def handler(items):
+        calls.append(items)
+        return {1: "invalid email", 5: "out of range", -1: "negative", "0": "not an int", 2.0: "float"}
+
+    task = BatchTask(handler, name="test_batch")
+    rs = FakeRedis(server=FakeServer(), decode_responses=True)
+    batch_key = "batch:test_batch:processing:1"
+    raw_items = [json.dumps({"id": i}) for i in range(3)]
+    await rs.rpush(batch_key, *raw_items)
+    await rs.zadd(task.inflight_key, {batch_key: 0})
+
+    # 无效索引记录日志后忽略，批次正常确认（不会超时后重复处理）
+    assert await task._process(rs, batch_key, raw_items) == 1
+    assert len(calls) == 1
+    assert not await rs.exists(batch_key)
+    assert not await rs.zcard(task.inflight_key)
+    failed = [json.loads(value) for value in await rs.lrange(task.failed_key, 0, -1)]
+    assert [(value["item"], value["error"]) for value in failed] == [({"id": 1}, "'invalid email'")]
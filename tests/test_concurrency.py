@@ -0,0 +1,91 @@
+import asyncio
+import random
+
+import pytest
+
+from app.core.concurrency import AdaptiveLimiter, Rejected
+
+
+def _run(limiter: AdaptiveLimiter, samples, saturated: bool = True) -> None:
+    # saturated：并发处理中的请求数保持在上限（每个请求都在上限被用满时释放）
+    for rtt in samples:
+        limiter.in_flight = int(limiter.limit) + 1 if saturated else 1
+        limiter.release(rtt)
+
+
+def test_limit_stable_under_healthy_traffic() -> None:
+    # 耗时正常（对数正态分布，尾部可达中位数的数倍）时上限不收缩
+    rng = random.Random(1)
+    limiter = AdaptiveLimiter("test_healthy", initial=20, min_limit=2, max_limit=200)
+    _run(limiter, (rng.lognormvariate(-4, 1) for _ in range(3000)))
+    assert limiter.limit >= 20
+
+    # 快慢请求混合（2ms / 60ms）
+    limiter = AdaptiveLimiter("test_mixed", initial=20, min_limit=2, max_limit=200)
+    _run(limiter, (0.06 if rng.random() < 0.3 else 0.002 for _ in range(3000)))
+    assert limiter.limit >= 20
+
+
+def test_limit_decreases_when_latency_rises() -> None:
+    limiter = AdaptiveLimiter("test_slow", initial=50, min_limit=2, max_limit=200, window=100)
+    _run(limiter, [0.01] * 500)
+    limit = limiter.limit
+    # 耗时升至基线的 5 倍：每个窗口至多收缩一次
+    _run(limiter, [0.05] * 100, saturated=False)
+    assert limiter.limit == pytest.approx(limit * 0.9)
+    _run(limiter, [0.05] * 300, saturated=False)
+    assert limiter.limit < limit * 0.9
+
+
+def test_limit_decreases_once_per_window_on_drops() -> None:
+    limiter = AdaptiveLimiter("test_dropped", initial=50, min_limit=2, max_limit=200, window=100)
+    for _ in range(50):
+        limiter.in_flight = 1
+        limiter.release(1.0, dropped=True)
+    assert limiter.limit == pytest.approx(45)
+    for _ in range(100):
+        limiter.in_flight = 1
+        limiter.release(1.0, dropped=True)
+    assert limiter.limit == pytest.approx(45 * 0.9)
+
+
+@pytest.mark.anyio
+async def test_queue_full_and_timeout() -> None:
+    limiter = AdaptiveLimiter("test_queue", initial=1, min_limit=1, max_limit=1, queue_size=1)
+    await limiter.acquire(1)
+    waiter = asyncio.create_task(limiter.acquire(1))
+    await asyncio.sleep(0)
+    # 队列已满
+    with pytest.raises(Rejected) as e:
+        await limiter.acquire(1)
+    assert e.value.reason == "queue_full"
+
+    # 释放名额后唤醒排队的请求
+    limiter.release(0.01)
+    await waiter
+    assert limiter.in_flight == 1
+
+    # 排队超时
+    with pytest.raises(Rejected) as e:
+        await limiter.acquire(0.01)
+    assert e.value.reason == "queue_timeout"
+    assert not limiter._waiters
+
+
+@pytest.mark.anyio
+async def test_cancelled_after_wakeup_returns_slot() -> None:
+    limiter = AdaptiveLimiter("test_cancel", initial=1, min_limit=1, max_limit=1, queue_size=2)
+    await limiter.acquire(1)
+    first = asyncio.create_task(limiter.acquire(1))
+    second = asyncio.create_task(limiter.acquire(1))
+    await asyncio.sleep(0)
+
+    # 名额分配给第一个等待的请求后、其恢复执行前被取消（如服务关闭）：名额转给下一个等待的请求
+    limiter.release(0.01)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await second
+    assert limiter.in_flight == 1
+    limiter.release(0.01)
+    assert limiter.in_flight == 0 and not limiter._waiters
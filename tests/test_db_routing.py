@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
+from unittest.mock import Mock
+
+import pytest
+from tortoise.backends.base.client import BaseTransactionWrapper
+
+from app.core import db
+from app.core.db import STICKY_COOKIE, DBRoutingMiddleware, ReplicaRouter, force_primary
+
+
+@pytest.fixture
+def router(monkeypatch: pytest.MonkeyPatch) -> ReplicaRouter:
+    """
+    配置两个只读副本（未建立连接池）的读写路由
+    :return:
+    """
+    replicas = ["replica_0", "replica_1"]
+    monkeypatch.setattr(db, "REPLICA_ALIASES", replicas)
+    monkeypatch.setattr(db.connections, "get", lambda alias: SimpleNamespace(_pool=None))
+    return ReplicaRouter()
+
+
+async def _request(router: ReplicaRouter, method: str = "GET", headers: Optional[List[tuple]] = None,
+                   write: bool = False) -> dict:
+    """
+    经 DBRoutingMiddleware 处理一个请求（独立的 Task，与 uvicorn 一致，ContextVar 不影响调用方）
+    :return: 请求内读取使用的连接（None 为主库）、响应头
+    """
+    result = {}
+
+    async def app(scope, receive, send):
+        result["before_write"] = router.db_for_read(None)
+        if write:
+            router.db_for_write(None)
+        result["read"] = router.db_for_read(None)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["headers"] = message["headers"]
+
+    scope = {"type": "http", "method": method, "path": "/api/v1/examples/users/", "headers": headers or []}
+    await asyncio.create_task(DBRoutingMiddleware(app)(scope, None, send))
+    return result
+
+
+@pytest.mark.anyio
+async def test_reads_outside_requests_use_primary(router: ReplicaRouter) -> None:
+    # 请求之外（迁移、Celery 任务、后台任务）读主库
+    assert router.db_for_read(None) is None
+    assert (await _request(router))["read"] in db.REPLICA_ALIASES
+    assert router.db_for_read(None) is None
+
+
+@pytest.mark.anyio
+async def test_read_primary_header_and_cookie(router: ReplicaRouter) -> None:
+    assert (await _request(router, headers=[(b"x-read-primary", b"1")]))["read"] is None
+    assert (await _request(router, headers=[(b"x-read-primary", b"true")]))["read"] is None
+    assert (await _request(router, headers=[(b"x-read-primary", b"0")]))["read"] in db.REPLICA_ALIASES
+
+    cookie = f"theme=dark; {STICKY_COOKIE}=1".encode()
+    assert (await _request(router, headers=[(b"cookie", cookie)]))["read"] is None
+    # 名称或值中包含粘滞 Cookie 名称的其他 Cookie 不触发读主库
+    for cookie in (f"{STICKY_COOKIE}_other=1", f"theme={STICKY_COOKIE}", f"{STICKY_COOKIE}=0"):
+        assert (await _request(router, headers=[(b"cookie", cookie.encode())]))["read"] in db.REPLICA_ALIASES
+
+
+@pytest.mark.anyio
+async def test_sticky_after_write(router: ReplicaRouter) -> None:
+    # 写请求整个请求读主库，并下发粘滞 Cookie
+    result = await _request(router, method="POST")
+    assert result["before_write"] is None and result["read"] is None
+    cookie = dict(result["headers"])[b"set-cookie"].decode()
+    assert cookie.startswith(f"{STICKY_COOKIE}=1;")
+
+    # 读请求内写入后，粘滞窗口内的读取使用主库
+    result = await _request(router, write=True)
+    assert result["before_write"] in db.REPLICA_ALIASES and result["read"] is None
+
+    # 后续携带粘滞 Cookie 的读请求使用主库
+    assert (await _request(router, headers=[(b"cookie", cookie.split(";")[0].encode())]))["read"] is None
+
+
+@pytest.mark.anyio
+async def test_reads_in_transaction_and_forced_primary(router: ReplicaRouter,
+                                                      monkeypatch: pytest.MonkeyPatch) -> None:
+    async def app(scope, receive, send):
+        with force_primary():
+            reads.append(router.db_for_read(None))
+        # 事务内的读取使用同一个事务连接（主库）
+        monkeypatch.setattr(db.connections, "get", lambda alias: Mock(spec=BaseTransactionWrapper))
+        reads.append(router.db_for_read(None))
+
+    reads = []
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/examples/users/", "headers": []}
+    await asyncio.create_task(DBRoutingMiddleware(app)(scope, None, None))
+    assert reads == [None, None]
@@ -0,0 +1,147 @@
+from typing import List
+
+import pytest
+import redis.asyncio as aioredis
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeConnection
+from fastapi import WebSocketDisconnect, status
+
+from app import settings
+from app.core import rate_limit, redis
+from app.core.rate_limit import RateLimiter, TokenBucket, parse_rate
+from app.core.websockets import WebsocketConsumer
+
+
+@pytest.fixture
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Redis 替换为 fakeredis 内存实现（含 Lua）
+    :return:
+    """
+    server = FakeServer()
+    monkeypatch.setattr(redis, "get_redis_pool", lambda: aioredis.ConnectionPool(
+        connection_class=FakeConnection, server=server, decode_responses=True))
+
+
+def test_parse_rate() -> None:
+    assert parse_rate("20/minute") == (20, 20 / 60)
+    assert parse_rate("5/ second") == (5, 5)
+    # 周期为秒数
+    assert parse_rate("5/10") == (5, 0.5)
+    assert parse_rate("3/0.5") == (3, 6)
+    for spec in ("", "5", "abc/minute", "1.5/second", "0/second", "-1/second", "5/0", "5/-10", "5/fortnight"):
+        with pytest.raises(ValueError):
+            parse_rate(spec)
+
+
+def test_token_bucket(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket("5/second")
+    # 突发：容量内放行，超出拒绝
+    assert [bucket.consume() for _ in range(6)] == [True] * 5 + [False]
+
+    # 按速率补充：0.5 秒补充 2.5 个令牌
+    now[0] += 0.5
+    assert [bucket.consume() for _ in range(3)] == [True, True, False]
+
+    # 补充不超过容量
+    now[0] += 60
+    assert [bucket.consume() for _ in range(6)] == [True] * 5 + [False]
+    now[0] += 1
+    assert bucket.consume(cost=5) and not bucket.consume()
+
+
+@pytest.mark.anyio
+async def test_rate_limiter(fake_redis) -> None:
+    limiter = RateLimiter("test_strict", "5/hour", local_fraction=0)
+    results = [await limiter.hit("10.0.0.1") for _ in range(6)]
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    # 补充 1 个令牌需 720 秒
+    assert results[-1][1] == pytest.approx(720, rel=0.01)
+    # 调用方之间互不影响
+    assert (await limiter.hit("10.0.0.2"))[0]
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_prefilter(fake_redis) -> None:
+    limiter = RateLimiter("test_prefilter", "10/hour", local_fraction=0.5)
+    calls = 0
+    evaluate = limiter._eval
+
+    async def counting_eval(*args):
+        nonlocal calls
+        calls += 1
+        return await evaluate(*args)
+
+    limiter._eval = counting_eval
+    allowed = [(await limiter.hit("10.0.0.1"))[0] for _ in range(15)]
+    # 预过滤放行的请求计为欠账，在下一次访问 Redis 时扣减：全局放行总数不超过容量
+    assert allowed == [True] * 10 + [False] * 5
+    # 第 1 次访问 Redis（剩余 9），随后 4 次本地放行（剩余 - 欠账 >= 容量一半），第 6 次携带欠账 4 访问 Redis
+    assert calls == 11
+    remaining, debt, _ = limiter._local["10.0.0.1"]
+    assert remaining == pytest.approx(0, abs=0.01) and debt == 0
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_redis_unavailable(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 连接被拒绝（端口未监听）
+    monkeypatch.setattr(redis, "get_redis_pool", lambda: aioredis.ConnectionPool.from_url(
+        "redis://127.0.0.1:1", decode_responses=True))
+    limiter = RateLimiter("test_unavailable", "1/hour", local_fraction=0)
+    # Redis 不可用时放行
+    assert [await limiter.hit("10.0.0.1") for _ in range(3)] == [(True, 0)] * 3
+
+
+class FakeWebSocket:
+
+    def __init__(self, messages: List[str]):
+        self.messages = messages
+        self.closed = None
+
+    async def receive_text(self) -> str:
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    async def close(self, code: int, reason: str) -> None:
+        self.closed = (code, reason)
+
+
+class FakeManager:
+    channel = "test_channel"
+
+    def __init__(self):
+        self.broadcast, self.removed = [], []
+
+    async def add_to_channel(self, channel: str, websocket) -> None:
+        pass
+
+    async def broadcast_to_channel(self, channel: str, message: str) -> None:
+        self.broadcast.append(message)
+
+    async def remove_from_channel(self, channel: str, websocket) -> None:
+        self.removed.append(websocket)
+
+
+@pytest.mark.anyio
+async def test_websocket_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_WEBSOCKET", "5/hour")
+
+    # 超出限制的消息丢弃
+    consumer = WebsocketConsumer(FakeManager)
+    websocket = FakeWebSocket([str(i) for i in range(8)])
+    await consumer.connect(websocket)
+    assert consumer.websocket_manager.broadcast == ["0", "1", "2", "3", "4"]
+    assert websocket.closed is None
+    assert consumer.websocket_manager.removed == [websocket]
+
+    # 连续丢弃的消息数达到桶容量时以 1008 关闭连接，并移出频道
+    consumer = WebsocketConsumer(FakeManager)
+    websocket = FakeWebSocket([str(i) for i in range(20)])
+    await consumer.connect(websocket)
+    assert websocket.closed == (status.WS_1008_POLICY_VIOLATION, "Rate limit exceeded")
+    assert len(websocket.messages) == 10
+    assert consumer.websocket_manager.removed == [websocket]